@@ -19,6 +19,11 @@ from diracx.core.config import (
     RegistryConfig,
     UserConfig,
 )
+from diracx.core.config.sources import (
+    DEFAULT_CONFIG_CACHE_FILE,
+    DEFAULT_CONFIG_FILE,
+    dump_config_cache,
+)
 
 from ..utils import AsyncTyper
 
@@ -182,14 +187,16 @@ def add_user(
 
 
 def update_config_and_commit(repo_path: Path, config: Config, message: str):
-    """Update the yaml file in the repo and commit it."""
+    """Update the yaml file, and its JSON rendering, in the repo and commit them."""
     repo = git.Repo(repo_path)
-    yaml_path = repo_path / "default.yml"
+    yaml_path = repo_path / DEFAULT_CONFIG_FILE
+    cache_path = repo_path / DEFAULT_CONFIG_CACHE_FILE
     typer.echo(f"Writing back configuration to {yaml_path}", err=True)
-    yaml_path.write_text(
-        yaml.safe_dump(
-            config.model_dump(exclude_unset=True, mode="json", by_alias=True)
-        )
+    raw = config.model_dump(exclude_unset=True, mode="json", by_alias=True)
+    config_yaml = yaml.safe_dump(raw).encode()
+    yaml_path.write_bytes(config_yaml)
+    cache_path.write_bytes(dump_config_cache(config_yaml, raw))
+    repo.index.add(
+        [yaml_path.relative_to(repo_path), cache_path.relative_to(repo_path)]
     )
-    repo.index.add([yaml_path.relative_to(repo_path)])
     repo.index.commit(message)
@@ -20,6 +20,7 @@ from pydantic import BaseModel, Field
 from typer import Option
 
 from diracx.core.config import Config, SupportInfo
+from diracx.core.config.sources import dump_config_cache
 from diracx.core.extensions import DiracEntryPoint, select_from_extension
 
 from ..utils import AsyncTyper
@@ -51,7 +52,11 @@ class ConversionConfig(BaseModel):
 
 @app.command()
 def cs_sync(old_file: Path, new_file: Path):
-    """Load the old CS and convert it to the new YAML format."""
+    """Load the old CS and convert it to the new YAML format.
+
+    A JSON rendering, which is much faster to load, is written next to it with
+    a .json suffix and should be committed alongside it.
+    """
     if not os.environ.get("DIRAC_COMPAT_ENABLE_CS_CONVERSION"):
         raise RuntimeError(
             "DIRAC_COMPAT_ENABLE_CS_CONVERSION must be set for the conversion to be possible"
@@ -80,11 +85,10 @@ def cs_sync(old_file: Path, new_file: Path):
         group=DiracEntryPoint.CORE, name="config"
     )[0].load()
     config = config_class.model_validate(raw)
-    new_file.write_text(
-        yaml.safe_dump(
-            config.model_dump(by_alias=True, exclude_unset=True, mode="json")
-        )
-    )
+    new_raw = config.model_dump(by_alias=True, exclude_unset=True, mode="json")
+    config_yaml = yaml.safe_dump(new_raw).encode()
+    new_file.write_bytes(config_yaml)
+    new_file.with_suffix(".json").write_bytes(dump_config_cache(config_yaml, new_raw))
 
 
 def _apply_fixes(raw):
@@ -7,6 +7,7 @@ from typer.testing import CliRunner
 
 from diracx.cli import app
 from diracx.core.config import Config
+from diracx.core.config.sources import git_blob_id, load_config_cache
 
 runner = CliRunner()
 
@@ -40,6 +41,13 @@ def test_cs_sync(tmp_path, monkeypatch):
     assert actual_output == expected_output
     Config.model_validate(actual_output)
 
+    # The JSON rendering holds the same content
+    json_file = output_file.with_suffix(".json")
+    assert (
+        load_config_cache(json_file.read_bytes(), git_blob_id(output_file.read_bytes()))
+        == actual_output
+    )
+
 
 def test_disabled_vos_empty(tmp_path, monkeypatch):
     # # DisabledVOs cannot be set if any Legacy clients are enabled
@@ -65,6 +65,7 @@ def test_generate_cs(tmp_path, protocol):
     assert result.exit_code == 0, result.output
     assert (tmp_path / ".git").is_dir()
     assert (tmp_path / "default.yml").is_file()
+    assert (tmp_path / "default.json").is_file()
 
     # Running a second time should fail
     result = runner.invoke(app, ["internal", "generate-cs", cs_repo])
@@ -36,6 +36,7 @@ from ...operations._operations import (
     build_auth_initiate_device_flow_request,
     build_auth_revoke_refresh_token_by_jti_request,
     build_auth_userinfo_request,
+    build_config_serve_config_diff_request,
     build_config_serve_config_request,
     build_jobs_add_heartbeat_request,
     build_jobs_assign_sandbox_to_job_request,
@@ -953,6 +954,63 @@ class ConfigOperations:
 
         return deserialized  # type: ignore
 
+    @distributed_trace_async
+    async def serve_config_diff(self, *, since: str, **kwargs: Any) -> Any:
+        """Serve Config Diff.
+
+        Get the changes to the config since a given revision.
+
+        The changes are returned as a JSON patch (RFC 6902) which, applied to the
+        config of revision ``since``, gives the latest config. The ETag header
+        contains the revision of the latest config.
+
+        If ``since`` isn't one of the revisions recently loaded by the server,
+        return 404: the full config must then be downloaded from "/config/".
+
+        :keyword since: Required.
+        :paramtype since: str
+        :return: any
+        :rtype: any
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        error_map: MutableMapping = {
+            401: ClientAuthenticationError,
+            404: ResourceNotFoundError,
+            409: ResourceExistsError,
+            304: ResourceNotModifiedError,
+        }
+        error_map.update(kwargs.pop("error_map", {}) or {})
+
+        _headers = kwargs.pop("headers", {}) or {}
+        _params = kwargs.pop("params", {}) or {}
+
+        cls: ClsType[Any] = kwargs.pop("cls", None)
+
+        _request = build_config_serve_config_diff_request(
+            since=since,
+            headers=_headers,
+            params=_params,
+        )
+        _request.url = self._client.format_url(_request.url)
+
+        _stream = False
+        pipeline_response: PipelineResponse = await self._client._pipeline.run(  # pylint: disable=protected-access
+            _request, stream=_stream, **kwargs
+        )
+
+        response = pipeline_response.http_response
+
+        if response.status_code not in [200]:
+            map_error(status_code=response.status_code, response=response, error_map=error_map)
+            raise HttpResponseError(response=response)
+
+        deserialized = self._deserialize("object", pipeline_response.http_response)
+
+        if cls:
+            return cls(pipeline_response, deserialized, {})  # type: ignore
+
+        return deserialized  # type: ignore
+
 
 class JobsOperations:
     """
@@ -0,0 +1,56 @@
+"""Support for the column oriented list payloads served by the search routes.
+
+When the ``Accept`` header contains ``COLUMNAR_JSON_MEDIA_TYPE`` the server may
+reply with ``{"columns": [...], "rows": [[...], ...]}`` instead of a list of
+objects. This avoids repeating every key in every row of large pages.
+The generated operations only know about the list of objects, so the
+operations using it replace their deserializer with a ``ColumnarDeserializer``
+which expands the payload back to a list of dicts.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "COLUMNAR_JSON_MEDIA_TYPE",
+    "ColumnarDeserializer",
+    "accept_columnar",
+    "decode_columnar",
+]
+
+from typing import Any
+
+from .._generated._utils.serialization import Deserializer
+
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.diracx.columns+json"
+
+
+def accept_columnar(headers: dict[str, str] | None) -> dict[str, str]:
+    """Return a copy of the headers accepting the column oriented payload."""
+    headers = dict(headers or {})
+    headers.setdefault("Accept", f"{COLUMNAR_JSON_MEDIA_TYPE}, application/json")
+    return headers
+
+
+def decode_columnar(data: dict[str, Any]) -> list[dict[str, Any]]:
+    """Convert a column oriented payload to a list of dicts."""
+    columns = data["columns"]
+    return [dict(zip(columns, row)) for row in data["rows"]]
+
+
+class ColumnarDeserializer(Deserializer):
+    """Generated Deserializer which also expands column oriented responses.
+
+    Rows of a column oriented response are plain JSON values so they are
+    returned directly rather than going through the generic deserialization.
+    """
+
+    @classmethod
+    def from_deserializer(cls, deserializer: Deserializer) -> ColumnarDeserializer:
+        """Create a ColumnarDeserializer knowing the models of ``deserializer``."""
+        return cls(deserializer.dependencies)
+
+    def __call__(self, target_obj, response_data, content_type=None):
+        headers = getattr(response_data, "headers", None) or {}
+        if headers.get("Content-Type", "").startswith(COLUMNAR_JSON_MEDIA_TYPE):
+            return decode_columnar(response_data.json())
+        return super().__call__(target_obj, response_data, content_type)
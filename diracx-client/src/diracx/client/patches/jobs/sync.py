@@ -17,6 +17,7 @@ from azure.core.tracing.decorator import distributed_trace
 
 from ..._generated.operations._operations import JobsOperations as _JobsOperations
 from diracx.client._generated.models._models import JobMetaData
+from ..columnar import ColumnarDeserializer
 from .common import make_search_body, make_summary_body, SearchKwargs, SummaryKwargs, prepare_body_for_patch
 
 # We're intentionally ignoring overrides here because we want to change the interface.
@@ -24,6 +25,11 @@ from .common import make_search_body, make_summary_body, SearchKwargs, SummaryKw
 
 
 class JobsOperations(_JobsOperations):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Search and summary responses may be column oriented, see ..columnar
+        self._deserialize = ColumnarDeserializer.from_deserializer(self._deserialize)
+
     @distributed_trace
     def search(self, **kwargs: Unpack[SearchKwargs]) -> list[dict[str, Any]]:
         """TODO"""
@@ -13,6 +13,7 @@ from azure.core.tracing.decorator_async import distributed_trace_async
 from ..._generated.aio.operations._operations import (
     PilotsOperations as _PilotsOperations,
 )
+from ..columnar import ColumnarDeserializer
 from .common import (
     RegisterPilotsKwargs,
     SearchKwargs,
@@ -27,6 +28,11 @@ from .common import (
 
 
 class PilotsOperations(_PilotsOperations):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Search and summary responses may be column oriented, see ..columnar
+        self._deserialize = ColumnarDeserializer.from_deserializer(self._deserialize)
+
     @distributed_trace_async
     async def search(
         self, **kwargs: Unpack[SearchKwargs]
@@ -18,6 +18,8 @@ from typing import IO, Any, Literal, TypedDict, Unpack, cast
 from diracx.core.models.pilot import PilotStatus
 from diracx.core.models.search import SearchSpec
 
+from ..columnar import accept_columnar
+
 
 class ResponseExtra(TypedDict, total=False):
     content_type: str
@@ -60,6 +62,7 @@ def make_search_body(**kwargs: Unpack[SearchKwargs]) -> UnderlyingSearchArgs:
             body[key] = value
     result: UnderlyingSearchArgs = {"body": BytesIO(json.dumps(body).encode("utf-8"))}
     result.update(cast(SearchExtra, kwargs))
+    result["headers"] = accept_columnar(result.get("headers"))
     return result
 
 
@@ -91,6 +94,7 @@ def make_summary_body(**kwargs: Unpack[SummaryKwargs]) -> UnderlyingSummaryArgs:
             body[key] = value
     result: UnderlyingSummaryArgs = {"body": BytesIO(json.dumps(body).encode("utf-8"))}
     result.update(cast(ResponseExtra, kwargs))
+    result["headers"] = accept_columnar(result.get("headers"))
     return result
 
 
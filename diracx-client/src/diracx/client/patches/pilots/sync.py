@@ -11,6 +11,7 @@ from typing import Any, Unpack
 from azure.core.tracing.decorator import distributed_trace
 
 from ..._generated.operations._operations import PilotsOperations as _PilotsOperations
+from ..columnar import ColumnarDeserializer
 from .common import (
     RegisterPilotsKwargs,
     SearchKwargs,
@@ -25,6 +26,11 @@ from .common import (
 
 
 class PilotsOperations(_PilotsOperations):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Search and summary responses may be column oriented, see ..columnar
+        self._deserialize = ColumnarDeserializer.from_deserializer(self._deserialize)
+
     @distributed_trace
     def search(self, **kwargs: Unpack[SearchKwargs]) -> list[dict[str, Any]]:
         """Search for pilots matching the provided filters."""
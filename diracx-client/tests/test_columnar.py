@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from diracx.client._generated._utils.serialization import Deserializer
+from diracx.client._generated.models import _models
+from diracx.client.patches.columnar import (
+    COLUMNAR_JSON_MEDIA_TYPE,
+    ColumnarDeserializer,
+)
+from diracx.client.patches.jobs.sync import JobsOperations
+
+
+class FakeResponse:
+    def __init__(self, headers, data):
+        self.headers = headers
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_columnar_deserializer():
+    models = {k: v for k, v in vars(_models).items() if isinstance(v, type)}
+    deserializer = ColumnarDeserializer.from_deserializer(Deserializer(models))
+    assert deserializer.dependencies == models
+
+    response = FakeResponse(
+        {"Content-Type": COLUMNAR_JSON_MEDIA_TYPE},
+        {"columns": ["JobID", "Status"], "rows": [[1, "Running"], [2, "Done"]]},
+    )
+    assert deserializer("[{object}]", response) == [
+        {"JobID": 1, "Status": "Running"},
+        {"JobID": 2, "Status": "Done"},
+    ]
+    # Other responses go through the generated deserialization
+    assert deserializer("[str]", ["a", "b"]) == ["a", "b"]
+
+
+def test_jobs_operations_use_columnar_deserializer():
+    operations = JobsOperations(None, None, None, Deserializer())
+    assert isinstance(operations._deserialize, ColumnarDeserializer)
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 __all__ = [
+    "BatchGitConfigSource",
     "CacheableSource",
     "Config",
     "ConfigSource",
@@ -15,6 +16,7 @@ __all__ = [
     "RegistryConfig",
     "RemoteGitConfigSource",
     "SerializableSet",
+    "SerializedConfig",
     "SupportInfo",
     "UserConfig",
     "is_running_in_async_context",
@@ -32,10 +34,12 @@ from .schema import (
     UserConfig,
 )
 from .sources import (
+    BatchGitConfigSource,
     CacheableSource,
     ConfigSource,
     ConfigSourceUrl,
     LocalGitConfigSource,
     RemoteGitConfigSource,
+    SerializedConfig,
     is_running_in_async_context,
 )
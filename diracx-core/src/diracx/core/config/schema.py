@@ -164,11 +164,45 @@ class RegistryConfig(BaseModel):
     groups: MutableMapping[str, GroupConfig] = Field(alias="Groups")
     """DIRAC groups section, subsections represent the name of the group."""
 
+    # The lookup maps below are computed once per config revision, the config
+    # must not be modified after they have been used.
+
     @cached_property
     def _preferred_username_to_sub(self) -> dict[str, str]:
         """Compute reverse lookup map from preferred username to user sub."""
         return {user.prefered_username: sub for sub, user in self.users.items()}
 
+    @cached_property
+    def _sub_to_groups(self) -> dict[str, frozenset[str]]:
+        """Compute lookup map from user sub to the groups they belong to."""
+        sub_to_groups: dict[str, set[str]] = {}
+        for group_name, group in self.groups.items():
+            for sub in group.users:
+                sub_to_groups.setdefault(sub, set()).add(group_name)
+        return {sub: frozenset(groups) for sub, groups in sub_to_groups.items()}
+
+    @cached_property
+    def _sub_to_properties(self) -> dict[str, frozenset[SecurityProperty]]:
+        """Compute lookup map from user sub to the properties of all their groups."""
+        return {
+            sub: frozenset().union(*(self.groups[g].properties for g in groups))
+            for sub, groups in self._sub_to_groups.items()
+        }
+
+    @cached_property
+    def _dn_to_sub(self) -> dict[str, str]:
+        """Compute reverse lookup map from certificate DN to user sub."""
+        return {dn: sub for sub, user in self.users.items() for dn in user.dns}
+
+    @cached_property
+    def _suspended_subs(self) -> dict[str, frozenset[str]]:
+        """Compute lookup map from VO to the subs of the users suspended in it."""
+        suspended: dict[str, set[str]] = {}
+        for sub, user in self.users.items():
+            for vo in user.suspended:
+                suspended.setdefault(vo, set()).add(sub)
+        return {vo: frozenset(subs) for vo, subs in suspended.items()}
+
     def sub_from_preferred_username(self, preferred_username: str) -> str:
         """Get the user sub from the preferred username.
 
@@ -187,6 +221,36 @@ class RegistryConfig(BaseModel):
         except KeyError:
             raise KeyError(f"User {preferred_username} not found in registry") from None
 
+    def groups_of(self, sub: str) -> frozenset[str]:
+        """Get the names of the groups a user belongs to."""
+        return self._sub_to_groups.get(sub, frozenset())
+
+    def properties_of(self, sub: str) -> frozenset[SecurityProperty]:
+        """Get the union of the properties of the groups a user belongs to."""
+        return self._sub_to_properties.get(sub, frozenset())
+
+    def sub_from_dn(self, dn: str) -> str:
+        """Get the user sub from one of their certificate DNs.
+
+        Args:
+            dn: The Distinguished Name to look up.
+
+        Returns:
+            The user sub (subject identifier) for the given DN.
+
+        Raises:
+            KeyError: If no user has the given DN.
+
+        """
+        try:
+            return self._dn_to_sub[dn]
+        except KeyError:
+            raise KeyError(f"DN {dn} not found in registry") from None
+
+    def is_suspended(self, sub: str, vo: str) -> bool:
+        """Check whether a user is suspended in the given VO."""
+        return sub in self._suspended_subs.get(vo, frozenset())
+
 
 class DIRACConfig(BaseModel):
     no_setup: bool = Field(False, alias="NoSetup")
@@ -396,6 +460,11 @@ class ResourcesComputingConfig(BaseModel):
             compatible_platforms.add(platform)
         return v
 
+    @cached_property
+    def _compatible_platforms(self) -> dict[frozenset[str], tuple[str, ...]]:
+        """Memo of find_compatible_platforms for this config revision."""
+        return {}
+
 
 class ResourcesConfig(BaseModel):
     # TODO: Remove this once the model is extended to support everything
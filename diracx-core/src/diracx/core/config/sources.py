@@ -6,15 +6,22 @@ This is where all the backend abstraction and the caching logic takes place.
 from __future__ import annotations
 
 import asyncio
+import gzip
+import hashlib
+import json
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import cache
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Annotated
+from typing import Annotated, Any
 from urllib.parse import urlparse, urlunparse
 
+import git
 import sh
 import yaml
+from cachetools import Cache, LRUCache
 from pydantic import AnyUrl, BeforeValidator, TypeAdapter, UrlConstraints
 
 from diracx.core.exceptions import BadConfigurationVersionError
@@ -24,8 +31,13 @@ from diracx.core.sources import CacheableSource
 from .schema import Config
 
 DEFAULT_CONFIG_FILE = "default.yml"
+# Optional JSON rendering of DEFAULT_CONFIG_FILE which is much faster to load
+DEFAULT_CONFIG_CACHE_FILE = "default.json"
 DEFAULT_GIT_BRANCH = "master"
 DEFAULT_CS_CONTENT_HARD_TTL = 15
+# Number of revisions for which the serialized config is kept, to be able to
+# send the changes since a recent revision rather than the full config
+DEFAULT_CONFIG_HISTORY_SIZE = 16
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +50,64 @@ def is_running_in_async_context():
         return False
 
 
+@cache
+def _config_schema_digest() -> str:
+    """Return a digest of the JSON schema of the Config class, with extensions."""
+    config_class: Config = select_from_extension(
+        group=DiracEntryPoint.CORE, name="config"
+    )[0].load()
+    schema = json.dumps(config_class.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()[:16]
+
+
+# libyaml is an order of magnitude faster than the pure Python loader
+YamlSafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_config_yaml(data: str | bytes) -> Any:
+    """Parse the YAML content of the config file."""
+    return yaml.load(data, Loader=YamlSafeLoader)  # noqa: S506
+
+
+def git_blob_id(data: bytes) -> str:
+    """Return the id git gives to a blob with the given content."""
+    header = b"blob %d\0" % len(data)
+    return hashlib.sha1(header + data, usedforsecurity=False).hexdigest()
+
+
+def dump_config_cache(config_yaml: bytes, raw_obj: Any) -> bytes:
+    """Render the raw config as JSON, to be committed as DEFAULT_CONFIG_CACHE_FILE.
+
+    Args:
+        config_yaml: The content of the DEFAULT_CONFIG_FILE it was rendered from.
+        raw_obj: The parsed content of config_yaml.
+
+    """
+    document = {"source": git_blob_id(config_yaml), "config": raw_obj}
+    return json.dumps(document, separators=(",", ":")).encode()
+
+
+def load_config_cache(data: str | bytes, source_id: str) -> Any | None:
+    """Return the raw config from its JSON rendering.
+
+    None is returned if the rendering wasn't made from the blob with id
+    ``source_id``, e.g. because the YAML file was edited by hand since.
+    """
+    try:
+        document = json.loads(data)
+    except ValueError:
+        logger.warning("Ignoring invalid %s", DEFAULT_CONFIG_CACHE_FILE)
+        return None
+    if not isinstance(document, dict) or document.get("source") != source_id:
+        logger.warning(
+            "Ignoring %s as it wasn't rendered from the current %s",
+            DEFAULT_CONFIG_CACHE_FILE,
+            DEFAULT_CONFIG_FILE,
+        )
+        return None
+    return document.get("config")
+
+
 def _apply_default_scheme(value: str) -> str:
     """Apply the default git+file:// scheme if not present."""
     if "://" not in value:
@@ -52,6 +122,26 @@ class AnyUrlWithoutHost(AnyUrl):
 ConfigSourceUrl = Annotated[AnyUrlWithoutHost, BeforeValidator(_apply_default_scheme)]
 
 
+@dataclass(frozen=True)
+class SerializedConfig:
+    """The JSON representation of a config revision, as served to clients."""
+
+    hexsha: str
+    modified: datetime
+    json: bytes
+    gzip: bytes
+
+    @classmethod
+    def from_config(cls, config: Config) -> SerializedConfig:
+        body = config.model_dump_json(by_alias=True).encode()
+        return cls(
+            hexsha=config._hexsha,
+            modified=config._modified,
+            json=body,
+            gzip=gzip.compress(body, mtime=0),
+        )
+
+
 class ConfigSource(CacheableSource[Config]):
     """Abstract class for the configuration source.
 
@@ -66,6 +156,9 @@ class ConfigSource(CacheableSource[Config]):
 
     def __init__(self, *, backend_url: ConfigSourceUrl) -> None:
         super().__init__()
+        # The serialized form of the recent revisions, computed when they are
+        # loaded so that requests never have to serialize the config
+        self._serialized_cache: Cache = LRUCache(maxsize=DEFAULT_CONFIG_HISTORY_SIZE)
 
     def __init_subclass__(cls) -> None:
         """Keep a record of <scheme: class>."""
@@ -78,15 +171,55 @@ class ConfigSource(CacheableSource[Config]):
         # Avoid circular import
         from diracx.core.settings import FactorySettings
 
-        return cls.create_from_url(backend_url=FactorySettings().config_backend_url)
+        settings = FactorySettings()
+        return cls.create_from_url(
+            backend_url=settings.config_backend_url,
+            snapshot_dir=settings.config_snapshot_dir,
+        )
 
     @classmethod
     def create_from_url(
-        cls, *, backend_url: ConfigSourceUrl | Path | str
+        cls,
+        *,
+        backend_url: ConfigSourceUrl | Path | str,
+        snapshot_dir: Path | None = None,
     ) -> "ConfigSource":
-        """Produce a concrete instance depending on the backend URL scheme."""
+        """Produce a concrete instance depending on the backend URL scheme.
+
+        See CacheableSource for the meaning of ``snapshot_dir``.
+        """
         url = TypeAdapter(ConfigSourceUrl).validate_python(str(backend_url))
-        return cls.__registry[url.scheme](backend_url=url)
+        config_source = cls.__registry[url.scheme](backend_url=url)
+        config_source.snapshot_dir = snapshot_dir
+        return config_source
+
+    def snapshot_name(self, hexsha: str) -> str:
+        # Snapshots are only valid for the Config schema they were made with
+        return f"config-{hexsha}-{_config_schema_digest()}.pickle"
+
+    @classmethod
+    def instance(cls) -> ConfigSource:
+        """Dependency injection stub.
+
+        The application factory overrides it to return the ConfigSource in use.
+        """
+        raise NotImplementedError(f"{cls.__name__} was not wired by the factory")
+
+    def _read_work(self) -> str:
+        hexsha = super()._read_work()
+        if hexsha not in self._serialized_cache:
+            self._serialized_cache[hexsha] = SerializedConfig.from_config(
+                self._content_cache[hexsha]
+            )
+        return hexsha
+
+    def read_serialized(self, hexsha: str) -> SerializedConfig | None:
+        """Return the serialized config of a recently loaded revision, if known."""
+        return self._serialized_cache.get(hexsha)
+
+    def clear_caches(self):
+        super().clear_caches()
+        self._serialized_cache.clear()
 
 
 class BaseGitConfigSource(ConfigSource):
@@ -128,21 +261,66 @@ class BaseGitConfigSource(ConfigSource):
         return rev, modified
 
     def read_raw(self, hexsha: str, modified: datetime) -> Config:
-        """:param: hexsha commit hash"""
+        """:param: hexsha commit hash
+
+        The JSON rendering of the config is used if it was committed alongside
+        the YAML file and is up to date with it.
+        """
         logger.debug("Reading %s for %s with mtime %s", self, hexsha, modified)
+        blob_ids = self.read_tree(hexsha)
+        if DEFAULT_CONFIG_FILE not in blob_ids:
+            raise BadConfigurationVersionError(
+                f"Error reading configuration: no {DEFAULT_CONFIG_FILE} in {hexsha}"
+            )
+        raw_obj = None
+        if cache_id := blob_ids.get(DEFAULT_CONFIG_CACHE_FILE):
+            raw_obj = load_config_cache(
+                self.read_blob(cache_id), blob_ids[DEFAULT_CONFIG_FILE]
+            )
+        if raw_obj is None:
+            raw_obj = load_config_yaml(self.read_blob(blob_ids[DEFAULT_CONFIG_FILE]))
+        return self.validate_config(raw_obj, hexsha, modified)
+
+    def read_tree(self, hexsha: str) -> dict[str, str]:
+        """Return the blob ids of the config files present in a commit."""
         try:
-            blob = sh.git.show(
-                f"{hexsha}:{DEFAULT_CONFIG_FILE}",
+            listing = sh.git(
+                "ls-tree",
+                hexsha,
+                "--",
+                DEFAULT_CONFIG_FILE,
+                DEFAULT_CONFIG_CACHE_FILE,
                 _cwd=self.repo_location,
                 _tty_out=False,
                 _async=False,
             )
-            raw_obj = yaml.safe_load(blob)
         except sh.ErrorReturnCode as e:
             raise BadConfigurationVersionError(
                 f"Error reading configuration: {e}"
             ) from e
+        blob_ids = {}
+        for line in listing.splitlines():
+            info, _, path = line.partition("\t")
+            blob_ids[path] = info.split()[2]
+        return blob_ids
 
+    def read_blob(self, blob_id: str) -> str | bytes:
+        try:
+            return sh.git(
+                "cat-file",
+                "blob",
+                blob_id,
+                _cwd=self.repo_location,
+                _tty_out=False,
+                _async=False,
+            )
+        except sh.ErrorReturnCode as e:
+            raise BadConfigurationVersionError(
+                f"Error reading configuration: {e}"
+            ) from e
+
+    def validate_config(self, raw_obj, hexsha: str, modified: datetime) -> Config:
+        """Build the Config, including extension fields, from its raw content."""
         config_class: Config = select_from_extension(
             group=DiracEntryPoint.CORE, name="config"
         )[0].load()
@@ -221,3 +399,70 @@ class RemoteGitConfigSource(BaseGitConfigSource):
             logger.exception(err)
 
         return super().latest_revision()
+
+
+class BatchGitConfigSource(BaseGitConfigSource):
+    """The configuration is stored on a local git repository read with GitPython.
+
+    Unlike LocalGitConfigSource, which spawns git processes every time it looks
+    for a new revision, refs are read directly from the repository files and
+    objects are read through a single long-lived ``git cat-file --batch``
+    process. The repository doesn't need a working tree.
+
+    GitPython objects are not thread safe, which is fine as the revision cache
+    never refreshes a source from several threads at once.
+    """
+
+    scheme = "git+batch"
+
+    def __init__(self, *, backend_url: ConfigSourceUrl) -> None:
+        super().__init__(backend_url=backend_url)
+        if not backend_url.path:
+            raise ValueError("Empty path for BatchGitConfigSource")
+
+        self.repo_location = Path(backend_url.path)
+        try:
+            self._repo = git.Repo(self.repo_location)
+        except (git.InvalidGitRepositoryError, git.NoSuchPathError) as e:
+            raise ValueError(
+                f"{self.repo_location} is not a valid git repository"
+            ) from e
+
+    def __hash__(self):
+        return hash(self.repo_location)
+
+    def latest_revision(self) -> tuple[str, datetime]:
+        try:
+            commit = self._repo.commit(self.git_revision)
+        except (ValueError, git.BadName, git.BadObject) as e:
+            raise BadConfigurationVersionError(
+                f"Error parsing latest revision: {e}"
+            ) from e
+        modified = datetime.fromtimestamp(commit.committed_date, tz=timezone.utc)
+        logger.debug(
+            "Latest revision for %s is %s with mtime %s", self, commit.hexsha, modified
+        )
+        return commit.hexsha, modified
+
+    def read_tree(self, hexsha: str) -> dict[str, str]:
+        try:
+            tree = self._repo.commit(hexsha).tree
+        except (ValueError, git.BadName, git.BadObject) as e:
+            raise BadConfigurationVersionError(
+                f"Error reading configuration: {e}"
+            ) from e
+        blob_ids = {}
+        for path in (DEFAULT_CONFIG_FILE, DEFAULT_CONFIG_CACHE_FILE):
+            try:
+                blob_ids[path] = (tree / path).hexsha
+            except KeyError:
+                pass
+        return blob_ids
+
+    def read_blob(self, blob_id: str) -> str | bytes:
+        try:
+            return self._repo.odb.stream(bytes.fromhex(blob_id)).read()
+        except (ValueError, git.BadObject) as e:
+            raise BadConfigurationVersionError(
+                f"Error reading configuration: {e}"
+            ) from e
@@ -26,5 +26,15 @@ def find_compatible_platforms(job_platforms: list[str], config: Config) -> list[
         list of compatible platforms
 
     """
-    os_compatibility_dict = config.resources.computing.os_compatibility
-    return returnValueOrRaise(getDIRACPlatform(job_platforms, os_compatibility_dict))
+    computing = config.resources.computing
+    # The result only depends on the config revision and the set of platforms
+    # so it's memoized, as most jobs of bulk submissions ask for the same ones
+    key = frozenset(job_platforms)
+    if (platforms := computing._compatible_platforms.get(key)) is None:
+        platforms = tuple(
+            returnValueOrRaise(
+                getDIRACPlatform(job_platforms, computing.os_compatibility)
+            )
+        )
+        computing._compatible_platforms[key] = platforms
+    return list(platforms)
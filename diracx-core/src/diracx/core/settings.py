@@ -379,6 +379,26 @@ class FactorySettings(ServiceSettingsBase):
     """The URL of the configuration backend.
     """
 
+    config_snapshot_dir: Path | None = Field(
+        default=None,
+        validation_alias="DIRACX_CONFIG_SNAPSHOT_DIR",
+    )
+    """A directory shared by the DiracX processes of a host (e.g. a tmpfs) where
+    each new configuration revision is stored, once validated, by the first
+    process which loads it. Other processes then load it from there rather than
+    validating it again, waiting for it if it is being validated. It must only
+    be writable by DiracX.
+    """
+
+    config_change_notifications: bool = Field(
+        default=False,
+        validation_alias="DIRACX_CONFIG_CHANGE_NOTIFICATIONS",
+    )
+    """Subscribe to the configuration changes announced by the task scheduler on
+    the tasks Redis server. New revisions are then loaded as soon as they are
+    published, and the configuration backend is only polled every few minutes.
+    """
+
     legacy_exchange_hashed_api_key: str = Field(
         default="", validation_alias="DIRACX_LEGACY_EXCHANGE_HASHED_API_KEY"
     )
@@ -390,6 +410,28 @@ class FactorySettings(ServiceSettingsBase):
     )
     """The url for the redis server to manage tasks"""
 
+    tasks_stream_weights: dict[str, float] | None = Field(
+        default=None, validation_alias="DIRACX_TASKS_STREAM_WEIGHTS"
+    )
+    """JSON mapping of task streams to the share of a worker's reads they get,
+    keyed by priority (e.g. `{"realtime": 8, "normal": 3, "background": 1}`) or
+    by `priority:size`. Streams which aren't listed have a weight of 1. When
+    unset, each read takes as many tasks from every stream."""
+
+    tasks_strict_priority: bool = Field(
+        default=False, validation_alias="DIRACX_TASKS_STRICT_PRIORITY"
+    )
+    """Only read tasks from a priority stream when the streams of higher
+    priorities are empty, so that background tasks never delay realtime ones
+    but can be starved by them. Can't be combined with
+    `DIRACX_TASKS_STREAM_WEIGHTS`."""
+
+    tasks_work_stealing: bool = Field(
+        default=False, validation_alias="DIRACX_TASKS_WORK_STEALING"
+    )
+    """Let idle workers take tasks meant for smaller workers. Requires
+    `DIRACX_TASKS_STREAM_WEIGHTS` to be set."""
+
     enabled_services: dict[str, bool] = Field(default_factory=dict)
     """The following environment variables dictates which routers are enabled."""
 
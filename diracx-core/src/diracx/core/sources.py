@@ -14,20 +14,35 @@ __all__ = [
     "Snapshot",
 ]
 
+import logging
+import os
+import pickle
+import socket
+import time
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
+from tempfile import NamedTemporaryFile
 from typing import ClassVar, Generic, TypeVar
 
 from cachetools import Cache, LRUCache
 
+from diracx.core.exceptions import NotReadyError
 from diracx.core.utils import AsyncTwoLevelCache, TwoLevelCache
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_CS_REV_CACHE_SOFT_TTL = 5
 # TODO: Reduce the hard TTL when we have more redundancy around the source of truth
 DEFAULT_CS_REV_CACHE_HARD_TTL = 60 * 60
+# Number of snapshots of each source kept in the snapshot directory
+DEFAULT_SNAPSHOT_HISTORY_SIZE = 4
+# Seconds after which the claim of a revision by another process is considered
+# abandoned, and the revision is read instead of waiting for its snapshot
+DEFAULT_SNAPSHOT_CLAIM_TIMEOUT = 5
 
 
 @dataclass(frozen=True)
@@ -39,23 +54,65 @@ class Snapshot(Generic[T]):
     modified: datetime
 
 
+def _is_abandoned(claim: Path) -> bool:
+    """Whether the snapshot claim ``claim`` can't be expected to be released soon.
+
+    This is the case if it is older than ``DEFAULT_SNAPSHOT_CLAIM_TIMEOUT``
+    seconds, or if it was made by a process of this host which is dead.
+    """
+    try:
+        age = time.time() - claim.stat().st_mtime
+        owner = claim.read_text()
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+    if age > DEFAULT_SNAPSHOT_CLAIM_TIMEOUT:
+        return True
+    host, _, pid = owner.partition(" ")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # The process exists but belongs to another user
+    return False
+
+
 class CacheableSource(Generic[T], metaclass=ABCMeta):
     """Abstract base class for sources that can be cached.
 
     Handles the caching of the latest revision and its content using a two-level cache.
+
+    If ``snapshot_dir`` is set, the content of each revision is also pickled
+    there by the first process which reads it, so that the other processes
+    sharing the directory (e.g. a tmpfs) can load it instead of calling
+    ``read_raw``. The first process claims the revision with a lock file
+    while the others wait for its snapshot, unless the claim is older than
+    ``DEFAULT_SNAPSHOT_CLAIM_TIMEOUT`` seconds or its process is dead. As
+    snapshots are unpickled, the directory must only be writable by DiracX
+    itself.
     """
 
+    #: Directory shared between processes where the content of each revision
+    #: is stored once it has been read, see _read_revision
+    snapshot_dir: Path | None = None
+
     def __init__(self):
         # Revision cache is used to store the latest revision and its
         # modification date. This cache has two TTLs, one which triggers the
         # background refresh and the other which is results in a hard failure.
         # This allows us to avoid blocking while the refresh is done, while
         # maintaining strong guarantees on the data freshness.
+        # Refreshes run in the thread pool shared by all the sources, there is
+        # never more than one at a time for a given source as it has one key.
         self._revision_cache = TwoLevelCache(
             soft_ttl=DEFAULT_CS_REV_CACHE_SOFT_TTL,
             hard_ttl=DEFAULT_CS_REV_CACHE_HARD_TTL,
-            max_workers=1,
             max_items=1,
+            name=type(self).__name__,
         )
         # The content of a given revision can be stored in a simple LRU cache
         # We keep the last two versions in memory to avoid any potential to flip
@@ -93,6 +150,31 @@ class CacheableSource(Generic[T], metaclass=ABCMeta):
         )
         return self._content_cache[hexsha]
 
+    def refresh(self) -> None:
+        """Look for a new revision in the background, without waiting for the soft TTL.
+
+        Reads keep returning the current revision until the new one is loaded.
+        """
+        self._revision_cache.expire("latest_revision")
+        try:
+            self._revision_cache.get("latest_revision", self._read_work, blocking=False)
+        except NotReadyError:
+            pass
+
+    def notify_revision(self, hexsha: str) -> None:
+        """Handle another process announcing the latest revision of the source."""
+        if self._revision_cache.hard_cache.get("latest_revision") != hexsha:
+            logger.info("Refreshing %s as revision %s was announced", self, hexsha)
+            self.refresh()
+
+    def set_poll_interval(self, seconds: float) -> None:
+        """Change how often the backend is checked for new revisions.
+
+        This can be much longer than the default when ``notify_revision`` is
+        called for new revisions.
+        """
+        self._revision_cache.set_soft_ttl(seconds)
+
     def _read_work(self) -> str:
         """Work function for the thread pool of `self._revision_cache`.
 
@@ -101,9 +183,116 @@ class CacheableSource(Generic[T], metaclass=ABCMeta):
         """
         hexsha, modified = self.latest_revision()
         if hexsha not in self._content_cache:
-            self._content_cache[hexsha] = self.read_raw(hexsha, modified)
+            self._content_cache[hexsha] = self._read_revision(hexsha, modified)
         return hexsha
 
+    def _read_revision(self, hexsha: str, modified: datetime) -> T:
+        """Read a revision from the snapshot directory, or from the backend."""
+        if self.snapshot_dir is None:
+            return self.read_raw(hexsha, modified)
+        content = self._read_snapshot(hexsha)
+        if content is not None:
+            return content
+
+        claim = self.snapshot_dir / f".{self.snapshot_name(hexsha)}.lock"
+        try:
+            fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            try:
+                os.write(fd, f"{socket.gethostname()} {os.getpid()}".encode())
+            finally:
+                os.close(fd)
+        except FileExistsError:
+            content = self._wait_for_snapshot(hexsha, claim)
+            if content is not None:
+                return content
+        except OSError:
+            logger.warning("Failed to claim snapshot %s", claim, exc_info=True)
+        else:
+            try:
+                # The snapshot may have been written since it was looked for
+                content = self._read_snapshot(hexsha)
+                if content is None:
+                    content = self.read_raw(hexsha, modified)
+                    self._write_snapshot(hexsha, content)
+                return content
+            finally:
+                claim.unlink(missing_ok=True)
+
+        content = self.read_raw(hexsha, modified)
+        self._write_snapshot(hexsha, content)
+        return content
+
+    def _wait_for_snapshot(self, hexsha: str, claim: Path) -> T | None:
+        """Wait for the process which claimed a revision to write its snapshot.
+
+        Returns None if the claim is released without a snapshot, e.g. because
+        reading the revision failed, or if it is abandoned (see
+        ``_is_abandoned``), in which case it is removed.
+        """
+        while True:
+            content = self._read_snapshot(hexsha)
+            if content is not None or not claim.exists():
+                return content
+            if _is_abandoned(claim):
+                logger.warning("Ignoring abandoned snapshot claim %s", claim)
+                claim.unlink(missing_ok=True)
+                return None
+            time.sleep(0.05)
+
+    def snapshot_name(self, hexsha: str) -> str:
+        """Return the file name of the snapshot of a revision.
+
+        Subclasses should include anything which affects the content read
+        for a given revision (e.g. the version of a schema) in the name.
+        """
+        return f"{type(self).__name__}-{hexsha}.pickle"
+
+    def _read_snapshot(self, hexsha: str) -> T | None:
+        assert self.snapshot_dir is not None
+        path = self.snapshot_dir / self.snapshot_name(hexsha)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            content = pickle.loads(data)  # noqa: S301
+        except Exception:
+            logger.warning("Ignoring invalid snapshot %s", path, exc_info=True)
+            return None
+        logger.debug("Loaded %s from snapshot %s", self, path)
+        return content
+
+    def _write_snapshot(self, hexsha: str, content: T) -> None:
+        assert self.snapshot_dir is not None
+        path = self.snapshot_dir / self.snapshot_name(hexsha)
+        try:
+            # Write to a temporary file first so other processes never see a
+            # partially written snapshot
+            with NamedTemporaryFile(
+                dir=self.snapshot_dir, prefix=f".{path.name}.", delete=False
+            ) as f:
+                pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, path)
+        except OSError:
+            logger.warning("Failed to write snapshot %s", path, exc_info=True)
+            return
+
+        # Remove the oldest snapshots of this source. Other processes sharing
+        # the directory may be doing the same, so snapshots can vanish at any
+        # point.
+        snapshots = []
+        try:
+            for snapshot in self.snapshot_dir.glob(self.snapshot_name("*")):
+                try:
+                    snapshots.append((snapshot.stat().st_mtime, snapshot))
+                except FileNotFoundError:
+                    continue
+            snapshots.sort(reverse=True)
+            for _, old_snapshot in snapshots[DEFAULT_SNAPSHOT_HISTORY_SIZE:]:
+                old_snapshot.unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Failed to remove old snapshots of %s", self, exc_info=True)
+
     def clear_caches(self):
         """Clear the caches."""
         self._revision_cache.clear()
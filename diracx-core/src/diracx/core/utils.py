@@ -4,8 +4,10 @@ __all__ = [
     "EXPIRES_GRACE_SECONDS",
     "AsyncTwoLevelCache",
     "TwoLevelCache",
+    "apply_json_patch",
     "batched_async",
     "dotenv_files_from_environment",
+    "make_json_patch",
     "prepare_verify",
     "read_credentials",
     "recursive_merge",
@@ -18,18 +20,20 @@ import fcntl
 import json
 import logging
 import os
+import random
 import re
 import ssl
 import stat
 import threading
-from collections import defaultdict
+import time
 from collections.abc import Callable, Coroutine
-from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, AsyncIterable, TypeVar, overload
 
-from cachetools import Cache, TTLCache
+from cachetools import Cache, TLRUCache, TTLCache
+from opentelemetry import metrics
 
 from .exceptions import NotReadyError
 from .models import TokenResponse
@@ -67,6 +71,61 @@ def recursive_merge(base: Any, override: Any) -> Any:
     return override if override is not None else base
 
 
+def _escape_json_pointer(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def make_json_patch(old: Any, new: Any, path: str = "") -> list[dict[str, Any]]:
+    """Return the RFC 6902 JSON patch transforming ``old`` into ``new``.
+
+    Objects are compared key by key, any other changed value (including
+    lists) is replaced as a whole.
+    """
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        if old == new and type(old) is type(new):
+            return []
+        return [{"op": "replace", "path": path, "value": new}]
+    patch: list[dict[str, Any]] = []
+    for key, old_value in old.items():
+        key_path = f"{path}/{_escape_json_pointer(key)}"
+        if key not in new:
+            patch.append({"op": "remove", "path": key_path})
+        else:
+            patch.extend(make_json_patch(old_value, new[key], key_path))
+    for key, new_value in new.items():
+        if key not in old:
+            key_path = f"{path}/{_escape_json_pointer(key)}"
+            patch.append({"op": "add", "path": key_path, "value": new_value})
+    return patch
+
+
+def apply_json_patch(document: Any, patch: list[dict[str, Any]]) -> Any:
+    """Apply a JSON patch produced by ``make_json_patch`` to ``document``.
+
+    Only the ``add``, ``remove`` and ``replace`` operations on objects are
+    supported. ``document`` is modified in place and returned.
+    """
+    for operation in patch:
+        if not operation["path"]:
+            document = operation["value"]
+            continue
+        *parents, key = (
+            part.replace("~1", "/").replace("~0", "~")
+            for part in operation["path"].split("/")[1:]
+        )
+        target = document
+        for part in parents:
+            target = target[part]
+        match operation["op"]:
+            case "add" | "replace":
+                target[key] = operation["value"]
+            case "remove":
+                del target[key]
+            case op:
+                raise NotImplementedError(f"Unsupported JSON patch operation {op!r}")
+    return document
+
+
 def dotenv_files_from_environment(prefix: str) -> list[str]:
     """Get the sorted list of .env files to use for configuration."""
     env_files = {}
@@ -163,6 +222,61 @@ def write_credentials(token_response: TokenResponse, *, location: Path | None =
             fcntl.flock(f, fcntl.LOCK_UN)
 
 
+# Refreshes of all the TwoLevelCaches share a bounded thread pool, unless they
+# are given their own number of workers
+TWO_LEVEL_CACHE_REFRESH_WORKERS = 8
+_shared_refresh_pool: ThreadPoolExecutor | None = None
+_shared_refresh_pool_lock = threading.Lock()
+
+_meter = metrics.get_meter(__name__)
+_cache_lookups = _meter.create_counter(
+    "cache_lookups_total",
+    description=(
+        "Lookups in two level caches by result: hit, soft_miss (stale value "
+        "served while refreshing), hard_miss (waited for the refresh) or not_ready"
+    ),
+)
+_cache_refresh_duration = _meter.create_histogram(
+    "cache_refresh_duration_seconds",
+    description="Duration of the refreshes of two level caches",
+    unit="s",
+)
+
+
+def _get_shared_refresh_pool() -> ThreadPoolExecutor:
+    """Return the thread pool shared by the TwoLevelCaches, creating it if needed.
+
+    It's created lazily so that processes forked after import get their own.
+    """
+    global _shared_refresh_pool
+    with _shared_refresh_pool_lock:
+        if _shared_refresh_pool is None:
+            _shared_refresh_pool = ThreadPoolExecutor(
+                max_workers=TWO_LEVEL_CACHE_REFRESH_WORKERS,
+                thread_name_prefix="diracx-cache-refresh",
+            )
+        return _shared_refresh_pool
+
+
+class _EvictionNotifyingTTLCache(TTLCache):
+    """TTLCache which calls ``on_evict`` with keys which expire or are evicted."""
+
+    def __init__(self, maxsize, ttl, on_evict: Callable[[Any], None]):
+        super().__init__(maxsize, ttl)
+        self._on_evict = on_evict
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._on_evict(key)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key)
+        return key, value
+
+
 class TwoLevelCache:
     """A two-level caching system with soft and hard time-to-live (TTL) expiration.
 
@@ -170,18 +284,24 @@ class TwoLevelCache:
     of cached values. It uses a soft TTL for quick access and a hard TTL as a fallback,
     which helps in reducing latency and maintaining data freshness.
 
+    Lookups and refreshes are reported as OpenTelemetry metrics labelled with
+    the name of the cache.
+
     Attributes:
         soft_cache (TTLCache): A cache with a shorter TTL for quick access.
         hard_cache (TTLCache): A cache with a longer TTL as a fallback.
-        locks (defaultdict): Thread-safe locks for each cache key.
+        locks (dict): Locks for each cache key, removed once the key expires.
         futures (dict): Stores ongoing asynchronous population tasks.
         pool (ThreadPoolExecutor): Thread pool for executing cache population tasks.
 
     Args:
         soft_ttl (int): Time-to-live in seconds for the soft cache.
         hard_ttl (int): Time-to-live in seconds for the hard cache.
-        max_workers (int): Maximum number of workers in the thread pool.
+        max_workers (int | None): Number of workers of a thread pool dedicated
+            to this cache. By default a bounded pool shared by all the caches
+            is used.
         max_items (int): Maximum number of items in the cache.
+        name (str): Name of the cache in the metrics.
 
     Example:
         >>> cache = TwoLevelCache(soft_ttl=60, hard_ttl=300)
@@ -196,15 +316,59 @@ class TwoLevelCache:
         soft_ttl: int,
         hard_ttl: int,
         *,
-        max_workers: int = 10,
+        max_workers: int | None = None,
         max_items: int = 1_000_000,
+        name: str = "unnamed",
     ):
         """Initialize the TwoLevelCache with specified TTLs."""
         self.soft_cache: Cache = TTLCache(max_items, soft_ttl)
-        self.hard_cache: Cache = TTLCache(max_items, hard_ttl)
-        self.locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.hard_cache: Cache = _EvictionNotifyingTTLCache(
+            max_items, hard_ttl, self._remove_lock
+        )
+        self.locks: dict[str, threading.Lock] = {}
+        # Guards the creation and removal of the entries of self.locks
+        self._locks_lock = threading.Lock()
         self.futures: dict[str, Future] = {}
-        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._max_workers = max_workers
+        self.pool = (
+            ThreadPoolExecutor(max_workers=max_workers)
+            if max_workers is not None
+            else _get_shared_refresh_pool()
+        )
+        self._metric_attributes = {"cache": name}
+
+    def _get_lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            if (lock := self.locks.get(key)) is None:
+                lock = self.locks[key] = threading.Lock()
+            return lock
+
+    def _acquire_lock(self, key: str, blocking: bool) -> threading.Lock | None:
+        """Acquire the lock of a key, returning None if it's not available."""
+        while True:
+            lock = self._get_lock(key)
+            if not lock.acquire(blocking=blocking):
+                return None
+            # The lock may have been removed while we were waiting for it, in
+            # which case another thread might hold a new one for the same key
+            if self.locks.get(key) is lock:
+                return lock
+            lock.release()
+
+    def _remove_lock(self, key: str) -> None:
+        """Remove the lock of a key which has left the hard cache, if unused."""
+        with self._locks_lock:
+            lock = self.locks.get(key)
+            if lock is None or not lock.acquire(blocking=False):
+                return
+            try:
+                if key not in self.futures:
+                    del self.locks[key]
+            finally:
+                lock.release()
+
+    def _record_lookup(self, result: str) -> None:
+        _cache_lookups.add(1, {**self._metric_attributes, "result": result})
 
     def get(self, key: str, populate_func: Callable[[], T], blocking: bool = True) -> T:
         """Retrieve a value from the cache, populating it if necessary.
@@ -233,8 +397,9 @@ class TwoLevelCache:
 
         """
         if key in self.soft_cache:
+            self._record_lookup("hit")
             return self.soft_cache[key]
-        if self.locks[key].acquire(blocking=blocking):
+        if lock := self._acquire_lock(key, blocking):
             try:
                 if key not in self.futures:
                     self.futures[key] = self.pool.submit(self._work, key, populate_func)
@@ -243,26 +408,30 @@ class TwoLevelCache:
                     # cache to avoid later requests needing to acquire the lock.
                     result = self.hard_cache[key]
                     self.soft_cache[key] = result
+                    self._record_lookup("soft_miss")
                     return result
                 future = self.futures[key]
             finally:
-                self.locks[key].release()
+                lock.release()
             if blocking:
                 # It is critical that ``future`` is waited for outside of the lock
                 # as _work acquires the lock before filling the caches. This also
                 # means we can guarantee that the future has not yet been removed
                 # from the futures dict.
                 # Use result() instead of wait() to propagate any exceptions
+                self._record_lookup("hard_miss")
                 future.result()
                 return self.hard_cache[key]
 
         # If the lock is not acquired we're in a non-blocking mode, try to get the
         # value from the hard cache. If it's not there, raise NotReadyError.
         if key in self.hard_cache:
+            self._record_lookup("soft_miss")
             return self.hard_cache[key]
         logger.debug(
             "Cache key %r not ready yet, background population in progress", key
         )
+        self._record_lookup("not_ready")
         raise NotReadyError(f"Cache key {key} is not ready yet.")
 
     def _work(self, key: str, populate_func: Callable[[], Any]) -> None:
@@ -282,6 +451,7 @@ class TwoLevelCache:
         """
         success = False
         result = None
+        start = time.perf_counter()
         try:
             result = populate_func()
             success = True
@@ -293,22 +463,42 @@ class TwoLevelCache:
             )
             raise
         finally:
+            _cache_refresh_duration.record(
+                time.perf_counter() - start,
+                {**self._metric_attributes, "success": success},
+            )
             # Always remove the future so the next request can retry on failure
             # or submit a new refresh task on success
-            with self.locks[key]:
+            lock = self._acquire_lock(key, blocking=True)
+            assert lock is not None
+            try:
                 self.futures.pop(key, None)
                 if success:
                     self.hard_cache[key] = result
                     self.soft_cache[key] = result
+            finally:
+                lock.release()
+
+    def expire(self, key: str) -> None:
+        """Expire the soft TTL of a key so the next get refreshes it in the background."""
+        self.soft_cache.pop(key, None)
+
+    def set_soft_ttl(self, soft_ttl: float) -> None:
+        """Change the soft TTL, the keys already cached are refreshed on next get."""
+        self.soft_cache = TTLCache(self.soft_cache.maxsize, soft_ttl)
 
     def clear(self):
-        """Clear all caches and reset the thread pool."""
-        self.pool.shutdown(wait=True)
-        self.pool = ThreadPoolExecutor(max_workers=self.pool._max_workers)
+        """Clear all caches once the refreshes in progress are done."""
+        if self._max_workers is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = ThreadPoolExecutor(max_workers=self._max_workers)
+        else:
+            wait(list(self.futures.values()))
         self.soft_cache.clear()
         self.hard_cache.clear()
         self.futures.clear()
-        self.locks.clear()
+        with self._locks_lock:
+            self.locks.clear()
 
 
 class AsyncTwoLevelCache:
@@ -320,19 +510,26 @@ class AsyncTwoLevelCache:
     raises NotReadyError (blocking=False).
 
     The key difference from TwoLevelCache is that all coordination uses asyncio
-    primitives (asyncio.Lock, asyncio.Task) rather than a ThreadPoolExecutor,
-    so populate_func can be a native coroutine.
+    Tasks rather than a ThreadPoolExecutor, so populate_func can be a native
+    coroutine. As the event loop only switches between coroutines when they
+    await, no lock is needed: the ``tasks`` dict alone ensures there is a single
+    refresh in flight per key, and each refresh removes its own entry.
+
+    The soft TTL of each entry is shortened by a random fraction of up to
+    ``soft_ttl_jitter``, so that caches filled at the same time (e.g. the
+    sources of a service which just started) don't all refresh at once.
 
     Attributes:
-        soft_cache (TTLCache): A cache with a shorter TTL for quick access.
+        soft_cache (TLRUCache): A cache with a shorter, jittered TTL for quick access.
         hard_cache (TTLCache): A cache with a longer TTL as a fallback.
         tasks (dict): In-flight refresh Tasks keyed by cache key.
-        _lock (asyncio.Lock): Guards task creation to ensure single-flight behaviour.
 
     Args:
         soft_ttl (int): Time-to-live in seconds for the soft cache.
         hard_ttl (int): Time-to-live in seconds for the hard cache.
         max_items (int): Maximum number of items in each cache tier.
+        soft_ttl_jitter (float): Maximum fraction of soft_ttl removed from the
+            soft TTL of each entry.
 
     Example:
         >>> cache = AsyncTwoLevelCache(soft_ttl=5, hard_ttl=3600)
@@ -348,16 +545,19 @@ class AsyncTwoLevelCache:
         hard_ttl: int,
         *,
         max_items: int = 1_000_000,
+        soft_ttl_jitter: float = 0.2,
     ):
         """Initialize the AsyncTwoLevelCache with specified TTLs."""
-        self.soft_cache: Cache = TTLCache(max_items, soft_ttl)
+        self.soft_ttl = soft_ttl
+        self.soft_ttl_jitter = soft_ttl_jitter
+        self.soft_cache: Cache = TLRUCache(max_items, self._soft_expiry)
         self.hard_cache: Cache = TTLCache(max_items, hard_ttl)
         # One Task per key for single-flight refresh deduplication.
         self.tasks: dict[str, asyncio.Task] = {}
-        # A single lock guards task creation across all keys.
-        # Per-key locks would be cleaner but require careful cleanup;
-        # contention here is minimal since task creation is very fast.
-        self._lock = asyncio.Lock()
+
+    def _soft_expiry(self, key: str, value: Any, now: float) -> float:
+        jitter = self.soft_ttl_jitter * random.random()  # noqa: S311
+        return now + self.soft_ttl * (1 - jitter)
 
     async def get(
         self,
@@ -383,39 +583,36 @@ class AsyncTwoLevelCache:
             The cached value associated with the key.
 
         """
-        # Fast path: soft cache hit, no locking needed.
+        # There is no await until the refresh Task is registered, so no other
+        # coroutine can interleave and start a second refresh for this key.
         if key in self.soft_cache:
             return self.soft_cache[key]
 
-        async with self._lock:
-            # Re-check inside the lock in case another coroutine just populated it.
-            if key in self.soft_cache:
-                return self.soft_cache[key]
-
-            # Ensure at most one refresh Task is in flight for this key.
-            if key not in self.tasks or self.tasks[key].done():
-                task = asyncio.create_task(self._work(key, populate_func))
-                # Failures are already logged in _work; mark any exception as
-                # retrieved so soft-refresh failures (which nothing awaits)
-                # don't emit "Task exception was never retrieved" warnings.
-                task.add_done_callback(
-                    lambda t: t.exception() if not t.cancelled() else None
-                )
-                self.tasks[key] = task
-            task = self.tasks[key]
-
-            if key in self.hard_cache:
-                # Soft miss but hard hit: serve stale while the refresh runs.
-                # Pre-fill soft cache so the next request skips the lock entirely.
-                result = self.hard_cache[key]
-                self.soft_cache[key] = result
-                return result
+        # Ensure at most one refresh Task is in flight for this key.
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._work(key, populate_func))
+            # Failures are already logged in _work; mark any exception as
+            # retrieved so soft-refresh failures (which nothing awaits)
+            # don't emit "Task exception was never retrieved" warnings.
+            task.add_done_callback(
+                lambda t: t.exception() if not t.cancelled() else None
+            )
+            self.tasks[key] = task
+
+        if key in self.hard_cache:
+            # Soft miss but hard hit: serve stale while the refresh runs.
+            # Pre-fill soft cache so the next requests don't look at the task.
+            result = self.hard_cache[key]
+            self.soft_cache[key] = result
+            return result
 
         # Hard miss: no value in either cache yet.
         if blocking:
             try:
-                # Await outside the lock so _work can acquire it to write results.
-                await task
+                # Shield so that a cancelled waiter doesn't cancel the refresh
+                # the other waiters are relying on.
+                await asyncio.shield(task)
             except asyncio.CancelledError:
                 # If the refresh task was cancelled (e.g. by clear()) report a
                 # cache miss; only propagate when we are being cancelled.
@@ -461,18 +658,18 @@ class AsyncTwoLevelCache:
             )
             raise
         finally:
-            async with self._lock:
-                self.tasks.pop(key, None)
-                if success:
-                    self.hard_cache[key] = result
-                    self.soft_cache[key] = result
+            # clear() may have replaced the entry with another task
+            if self.tasks.get(key) is asyncio.current_task():
+                del self.tasks[key]
+            if success:
+                self.hard_cache[key] = result
+                self.soft_cache[key] = result
 
     async def clear(self):
         """Cancel any in-flight refresh tasks and clear both cache tiers."""
-        async with self._lock:
-            for task in self.tasks.values():
-                task.cancel()
-            self.tasks.clear()
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
         self.soft_cache.clear()
         self.hard_cache.clear()
 
@@ -1,11 +1,42 @@
 from __future__ import annotations
 
 import datetime
+import gzip
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
 from urllib import request
 
+import git
 import pytest
+import yaml
+from pydantic import TypeAdapter
 
-from diracx.core.config import Config, ConfigSource, RemoteGitConfigSource
+from diracx.core import sources
+from diracx.core.config import (
+    BatchGitConfigSource,
+    Config,
+    ConfigSource,
+    ConfigSourceUrl,
+    LocalGitConfigSource,
+    RemoteGitConfigSource,
+)
+from diracx.core.config.sources import (
+    dump_config_cache,
+    git_blob_id,
+    load_config_cache,
+    load_config_yaml,
+)
+from diracx.core.exceptions import BadConfigurationVersionError
+from diracx.core.sources import DEFAULT_SNAPSHOT_HISTORY_SIZE
+
+logger = logging.getLogger(__name__)
 
 # The diracx-chart contains a CS example
 TEST_REPO = "git+https://github.com/DIRACGrid/diracx-charts.git"
@@ -59,3 +90,320 @@ def test_remote_git_config_source_branch(monkeypatch):
 def test_remote_git_config_source_commit(monkeypatch):
     hexsha = default_remote_conf_assertions(monkeypatch, TEST_REPO_SPECIFIC_COMMIT_HASH)
     assert hexsha == COMMIT_HASH
+
+
+def test_serialized_config_history(with_config_repo, tmp_path):
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    config_source = ConfigSource.create_from_url(backend_url=f"git+file://{repo_path}")
+
+    first = config_source.read()
+    serialized = config_source.read_serialized(first._hexsha)
+    assert serialized is not None
+    assert serialized.modified == first._modified
+    assert json.loads(serialized.json) == first.model_dump(mode="json", by_alias=True)
+    assert gzip.decompress(serialized.gzip) == serialized.json
+
+    commit_config_change(repo_path, NoSetup=True)
+    config_source._revision_cache.clear()
+
+    second = config_source.read()
+    assert second._hexsha != first._hexsha
+    assert second.dirac.no_setup
+
+    # The previous revision is still available
+    assert config_source.read_serialized(first._hexsha) == serialized
+    assert config_source.read_serialized(second._hexsha) is not None
+    assert config_source.read_serialized("unknown") is None
+
+    config_source.clear_caches()
+    assert config_source.read_serialized(first._hexsha) is None
+
+
+def commit_config_change(repo_path, **dirac_options):
+    cs_file = repo_path / "default.yml"
+    content = yaml.safe_load(cs_file.read_text())
+    content["DIRAC"].update(dirac_options)
+    cs_file.write_text(yaml.safe_dump(content))
+    repo = git.Repo(repo_path)
+    repo.index.add([cs_file])
+    return repo.index.commit("Update config").hexsha
+
+
+def test_batch_git_config_source(with_config_repo, tmp_path):
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+
+    config_source = ConfigSource.create_from_url(backend_url=f"git+batch://{repo_path}")
+    assert isinstance(config_source, BatchGitConfigSource)
+    reference = LocalGitConfigSource(
+        backend_url=TypeAdapter(ConfigSourceUrl).validate_python(str(repo_path))
+    )
+
+    hexsha, modified = config_source.latest_revision()
+    assert (hexsha, modified) == reference.latest_revision()
+    assert config_source.read_raw(hexsha, modified) == reference.read_raw(
+        hexsha, modified
+    )
+
+    # New commits are seen, including once they have been packed
+    new_hexsha = commit_config_change(repo_path, NoSetup=True)
+    assert config_source.latest_revision()[0] == new_hexsha
+    git.Repo(repo_path).git.gc("--prune=now")
+    assert not list((repo_path / ".git" / "objects").glob("??/*"))
+    new_hexsha = commit_config_change(repo_path, NoSetup=False)
+    git.Repo(repo_path).git.gc("--prune=now")
+    hexsha, modified = config_source.latest_revision()
+    assert hexsha == new_hexsha
+    assert not config_source.read_raw(hexsha, modified).dirac.no_setup
+
+    with pytest.raises(BadConfigurationVersionError):
+        config_source.read_raw("0" * 40, modified)
+
+    config_source.git_revision = "non_existing_branch"
+    with pytest.raises(BadConfigurationVersionError):
+        config_source.latest_revision()
+
+    with pytest.raises(ValueError, match="not a valid git repository"):
+        ConfigSource.create_from_url(backend_url=f"git+batch://{tmp_path}")
+
+
+@pytest.mark.benchmark
+def test_git_config_source_benchmark(with_config_repo, tmp_path):
+    """Compare the number of revision checks per second of the git sources."""
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    git.Repo(repo_path).git.gc()
+
+    n_checks = 100
+    for scheme in ["git+file", "git+batch"]:
+        config_source = ConfigSource.create_from_url(
+            backend_url=f"{scheme}://{repo_path}"
+        )
+        hexsha, modified = config_source.latest_revision()
+        start = time.perf_counter()
+        for _ in range(n_checks):
+            assert config_source.latest_revision()[0] == hexsha
+        rate = n_checks / (time.perf_counter() - start)
+        start = time.perf_counter()
+        config_source.read_raw(hexsha, modified)
+        read_time = time.perf_counter() - start
+        logger.info(
+            "%-15s %8.0f revision checks/s, read_raw in %6.1f ms",
+            scheme,
+            rate,
+            read_time * 1000,
+        )
+
+
+def test_config_snapshot_dir(with_config_repo, tmp_path, monkeypatch):
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+
+    def make_source():
+        return ConfigSource.create_from_url(
+            backend_url=f"git+file://{repo_path}", snapshot_dir=snapshot_dir
+        )
+
+    first = make_source()
+    config = first.read()
+    snapshot_path = snapshot_dir / first.snapshot_name(config._hexsha)
+    assert [p.name for p in snapshot_dir.iterdir()] == [snapshot_path.name]
+
+    # Another process sharing the directory doesn't read the config itself
+    second = make_source()
+    monkeypatch.setattr(second, "read_raw", lambda *args: pytest.fail("read_raw"))
+    loaded = second.read()
+    assert loaded == config
+    assert loaded._hexsha == config._hexsha
+    assert loaded._modified == config._modified
+
+    # Invalid snapshots are ignored
+    snapshot_path.write_bytes(b"invalid")
+    third = make_source()
+    assert third.read() == config
+
+    # Only the most recent snapshots are kept
+    for i in range(DEFAULT_SNAPSHOT_HISTORY_SIZE + 2):
+        hexsha = commit_config_change(repo_path, NoSetup=bool(i % 2))
+        first.clear_caches()
+        assert first.read()._hexsha == hexsha
+    snapshots = list(snapshot_dir.glob(first.snapshot_name("*")))
+    assert len(snapshots) == DEFAULT_SNAPSHOT_HISTORY_SIZE
+    assert snapshot_dir / first.snapshot_name(hexsha) in snapshots
+    assert not list(snapshot_dir.glob(".*"))
+
+
+def test_config_snapshot_claim(with_config_repo, tmp_path, monkeypatch):
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    source = ConfigSource.create_from_url(
+        backend_url=f"git+file://{with_config_repo}", snapshot_dir=snapshot_dir
+    )
+    hexsha, modified = source.latest_revision()
+    config = source.read_raw(hexsha, modified)
+    claim = snapshot_dir / f".{source.snapshot_name(hexsha)}.lock"
+
+    # While another process reads the revision, the snapshot is waited for
+    claim.touch()
+    monkeypatch.setattr(source, "read_raw", lambda *args: pytest.fail("read_raw"))
+    writer = threading.Timer(0.2, source._write_snapshot, (hexsha, config))
+    writer.start()
+    assert source._read_revision(hexsha, modified) == config
+    writer.join()
+
+    # A claim left by a dead process doesn't block the others
+    monkeypatch.setattr(source, "read_raw", lambda *args: config)
+    dead = subprocess.Popen([sys.executable, "-c", ""])
+    dead.wait()
+    for owner, mtime in [(f"{socket.gethostname()} {dead.pid}", None), ("", 0)]:
+        (snapshot_dir / source.snapshot_name(hexsha)).unlink()
+        claim.write_text(owner)
+        if mtime is not None:
+            # Nor does one older than DEFAULT_SNAPSHOT_CLAIM_TIMEOUT
+            os.utime(claim, (mtime, mtime))
+        start = time.monotonic()
+        assert source._read_revision(hexsha, modified) == config
+        assert time.monotonic() - start < sources.DEFAULT_SNAPSHOT_CLAIM_TIMEOUT
+        assert not claim.exists()
+        assert (snapshot_dir / source.snapshot_name(hexsha)).exists()
+
+
+def test_config_snapshot_cleanup_race(with_config_repo, tmp_path, monkeypatch):
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    source = ConfigSource.create_from_url(
+        backend_url=f"git+file://{with_config_repo}", snapshot_dir=snapshot_dir
+    )
+    hexsha, modified = source.latest_revision()
+    config = source.read_raw(hexsha, modified)
+
+    # Another process removes a snapshot between the listing and the cleanup
+    vanished = snapshot_dir / source.snapshot_name("vanished")
+    glob = type(snapshot_dir).glob
+    monkeypatch.setattr(
+        type(snapshot_dir),
+        "glob",
+        lambda self, pattern: [*glob(self, pattern), vanished],
+    )
+    source._write_snapshot(hexsha, config)
+    assert (snapshot_dir / source.snapshot_name(hexsha)).exists()
+
+
+@pytest.mark.benchmark
+def test_config_snapshot_benchmark(with_config_repo, tmp_path):
+    """Compare validating a config with a large registry to loading its snapshot."""
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    cs_file = repo_path / "default.yml"
+    content = yaml.safe_load(cs_file.read_text())
+    users = content["Registry"]["lhcb"]["Users"]
+    for i in range(10_000):
+        users[f"sub-{i}"] = {"PreferedUsername": f"user{i}", "DNs": [f"/CN=user{i}"]}
+    content["Registry"]["lhcb"]["Groups"]["lhcb_user"]["Users"].extend(users)
+    cs_file.write_text(yaml.safe_dump(content))
+    repo = git.Repo(repo_path)
+    repo.index.add([cs_file])
+    repo.index.commit("Add many users")
+
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    timings = {}
+    for name in ["read_raw", "snapshot"]:
+        config_source = ConfigSource.create_from_url(
+            backend_url=f"git+file://{repo_path}", snapshot_dir=snapshot_dir
+        )
+        hexsha, modified = config_source.latest_revision()
+        start = time.perf_counter()
+        config = config_source._read_revision(hexsha, modified)
+        timings[name] = time.perf_counter() - start
+        assert len(config.registry["lhcb"].users) == 10_002
+    for name, elapsed in timings.items():
+        logger.info("%-10s %8.1f ms", name, elapsed * 1000)
+
+
+@pytest.mark.parametrize("scheme", ["git+file", "git+batch"])
+def test_config_cache_file(with_config_repo, tmp_path, scheme):
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    cs_file = repo_path / "default.yml"
+    cache_file = repo_path / "default.json"
+    repo = git.Repo(repo_path)
+    config_source = ConfigSource.create_from_url(backend_url=f"{scheme}://{repo_path}")
+
+    # The JSON rendering is preferred when it matches the YAML file
+    config_yaml = cs_file.read_bytes()
+    raw = yaml.safe_load(config_yaml)
+    raw["DIRAC"]["NoSetup"] = True
+    cache_file.write_bytes(dump_config_cache(config_yaml, raw))
+    repo.index.add([cache_file])
+    hexsha = repo.index.commit("Add JSON rendering").hexsha
+    assert git_blob_id(config_yaml) == repo.commit(hexsha).tree["default.yml"].hexsha
+    modified = config_source.latest_revision()[1]
+    assert config_source.read_raw(hexsha, modified).dirac.no_setup
+
+    # It's ignored once the YAML file has been changed without updating it
+    cs_file.write_bytes(config_yaml + b"# Edited by hand\n")
+    repo.index.add([cs_file])
+    hexsha = repo.index.commit("Edit YAML file").hexsha
+    assert not config_source.read_raw(hexsha, modified).dirac.no_setup
+
+    cache_file.write_text("invalid")
+    repo.index.add([cache_file])
+    hexsha = repo.index.commit("Break JSON rendering").hexsha
+    assert not config_source.read_raw(hexsha, modified).dirac.no_setup
+
+    repo.index.remove([cs_file], working_tree=True)
+    hexsha = repo.index.commit("Remove YAML file").hexsha
+    with pytest.raises(BadConfigurationVersionError, match="no default.yml"):
+        config_source.read_raw(hexsha, modified)
+
+
+@pytest.mark.benchmark
+def test_config_loader_benchmark(with_config_repo, tmp_path):
+    """Compare the ways of loading a config with a 50k users registry."""
+    repo_path = tmp_path / "cs-repo"
+    shutil.copytree(with_config_repo, repo_path)
+    cs_file = repo_path / "default.yml"
+    raw = yaml.safe_load(cs_file.read_text())
+    users = raw["Registry"]["lhcb"]["Users"]
+    for i in range(50_000):
+        users[f"sub-{i}"] = {"PreferedUsername": f"user{i}", "DNs": [f"/CN=user{i}"]}
+    raw["Registry"]["lhcb"]["Groups"]["lhcb_user"]["Users"].extend(users)
+    config_yaml = yaml.safe_dump(raw).encode()
+    config_json = dump_config_cache(config_yaml, raw)
+    logger.info(
+        "YAML is %.1f MB, JSON is %.1f MB",
+        len(config_yaml) / 1e6,
+        len(config_json) / 1e6,
+    )
+
+    loaders = {
+        "yaml.SafeLoader": lambda: yaml.load(config_yaml, Loader=yaml.SafeLoader),  # noqa: S506
+        "yaml.CSafeLoader": lambda: load_config_yaml(config_yaml),
+        "JSON rendering": lambda: load_config_cache(
+            config_json, git_blob_id(config_yaml)
+        ),
+    }
+    for name, load in loaders.items():
+        start = time.perf_counter()
+        assert load() == raw
+        logger.info("%-20s %8.1f ms", name, (time.perf_counter() - start) * 1000)
+
+    cs_file.write_bytes(config_yaml)
+    repo = git.Repo(repo_path)
+    repo.index.add([cs_file])
+    yaml_hexsha = repo.index.commit("Add many users").hexsha
+    (repo_path / "default.json").write_bytes(config_json)
+    repo.index.add([repo_path / "default.json"])
+    json_hexsha = repo.index.commit("Add JSON rendering").hexsha
+    config_source = ConfigSource.create_from_url(backend_url=f"git+batch://{repo_path}")
+    modified = config_source.latest_revision()[1]
+    for name, hexsha in [("YAML", yaml_hexsha), ("JSON", json_hexsha)]:
+        start = time.perf_counter()
+        config = config_source.read_raw(hexsha, modified)
+        elapsed = time.perf_counter() - start
+        assert len(config.registry["lhcb"].users) == 50_002
+        logger.info("read_raw from %-5s %8.1f ms", name, elapsed * 1000)
@@ -0,0 +1,53 @@
+"""Test the lookup maps of RegistryConfig."""
+
+from __future__ import annotations
+
+import pytest
+
+from diracx.core.config import RegistryConfig
+from diracx.core.properties import NORMAL_USER, PRODUCTION_MANAGEMENT
+
+REGISTRY = {
+    "IdP": {"URL": "https://idp.invalid", "ClientID": "diracx"},
+    "DefaultGroup": "user",
+    "Users": {
+        "sub-a": {"PreferedUsername": "alice", "DNs": ["/CN=alice", "/CN=alice2"]},
+        "sub-b": {"PreferedUsername": "bob", "DNs": ["/CN=bob"], "Suspended": ["vo"]},
+        "sub-c": {"PreferedUsername": "carol"},
+    },
+    "Groups": {
+        "user": {"Users": ["sub-a", "sub-b"], "Properties": [NORMAL_USER]},
+        "prod": {"Users": ["sub-a"], "Properties": [PRODUCTION_MANAGEMENT]},
+    },
+}
+
+
+@pytest.fixture
+def registry() -> RegistryConfig:
+    return RegistryConfig.model_validate(REGISTRY)
+
+
+def test_groups_and_properties(registry):
+    assert registry.groups_of("sub-a") == {"user", "prod"}
+    assert registry.properties_of("sub-a") == {NORMAL_USER, PRODUCTION_MANAGEMENT}
+    assert registry.groups_of("sub-b") == {"user"}
+    assert registry.properties_of("sub-b") == {NORMAL_USER}
+    # Users without groups and unknown users
+    for sub in ["sub-c", "sub-unknown"]:
+        assert registry.groups_of(sub) == frozenset()
+        assert registry.properties_of(sub) == frozenset()
+
+
+def test_sub_from_dn(registry):
+    assert registry.sub_from_dn("/CN=alice") == "sub-a"
+    assert registry.sub_from_dn("/CN=alice2") == "sub-a"
+    assert registry.sub_from_dn("/CN=bob") == "sub-b"
+    with pytest.raises(KeyError, match="/CN=carol"):
+        registry.sub_from_dn("/CN=carol")
+
+
+def test_is_suspended(registry):
+    assert registry.is_suspended("sub-b", "vo")
+    assert not registry.is_suspended("sub-b", "other_vo")
+    assert not registry.is_suspended("sub-a", "vo")
+    assert not registry.is_suspended("sub-unknown", "vo")
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import pytest
+from DIRACCommon.ConfigurationSystem.Client.Helpers.Resources import getDIRACPlatform
 from DIRACCommon.Core.Utilities.ReturnValues import SErrorException
 
+import diracx.core.resources
 from diracx.core.config import Config
 from diracx.core.resources import find_compatible_platforms
 
@@ -91,3 +93,35 @@ def test_find_compatible_platforms_with_extension(monkeypatch):
 
     # Should use the extension function
     assert result == ["extension_result"]
+
+
+def test_find_compatible_platforms_memoized(monkeypatch):
+    """Test that the result is memoized for each config revision."""
+    calls = []
+
+    def counting_get_dirac_platform(os_list, os_compatibility):
+        calls.append(os_list)
+        return getDIRACPlatform(os_list, os_compatibility)
+
+    monkeypatch.setattr(
+        diracx.core.resources, "getDIRACPlatform", counting_get_dirac_platform
+    )
+    test_config = _make_test_config({"slc7": {"centos7"}, "el9": {"alma9"}})
+
+    result = find_compatible_platforms(["centos7", "alma9"], test_config)
+    assert result == ["slc7", "el9"]
+    # Modifying the result doesn't affect the memo
+    result.append("other")
+    assert find_compatible_platforms(["alma9", "centos7"], test_config) == [
+        "slc7",
+        "el9",
+    ]
+    assert len(calls) == 1
+
+    assert find_compatible_platforms(["alma9"], test_config) == ["el9"]
+    assert len(calls) == 2
+
+    # Another revision of the config has its own memo
+    other_config = _make_test_config({"el9": {"alma9"}})
+    assert find_compatible_platforms(["alma9", "centos7"], other_config) == ["el9"]
+    assert len(calls) == 3
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import fcntl
 import os
 import stat
@@ -13,7 +14,9 @@ from diracx.core.models import TokenResponse
 from diracx.core.utils import (
     AsyncTwoLevelCache,
     TwoLevelCache,
+    apply_json_patch,
     dotenv_files_from_environment,
+    make_json_patch,
     read_credentials,
     serialize_credentials,
     write_credentials,
@@ -301,6 +304,71 @@ class TestTwoLevelCache:
         # Ensure background thread completes
         thread.join()
 
+    def test_shared_refresh_pool(self):
+        """Test that caches share a thread pool unless given their own workers."""
+        first = TwoLevelCache(soft_ttl=10, hard_ttl=60)
+        second = TwoLevelCache(soft_ttl=10, hard_ttl=60)
+        dedicated = TwoLevelCache(soft_ttl=10, hard_ttl=60, max_workers=1)
+        assert first.pool is second.pool
+        assert dedicated.pool is not first.pool
+
+        for cache in [first, dedicated]:
+            assert cache.get("key", lambda: "value") == "value"
+            cache.clear()
+            assert cache.get("key", lambda: "new value") == "new value"
+        # Clearing a cache doesn't stop the shared pool
+        assert second.get("key", lambda: "value") == "value"
+
+    def test_locks_removed_on_expiry(self):
+        """Test that the per-key locks don't outlive the keys."""
+        import time
+
+        cache = TwoLevelCache(soft_ttl=0.01, hard_ttl=0.05)
+        for key in ["a", "b"]:
+            cache.get(key, lambda: "value")
+        assert set(cache.locks) == {"a", "b"}
+
+        time.sleep(0.1)
+        cache.get("c", lambda: "value")
+        assert set(cache.locks) == {"c"}
+
+        # Expired keys are populated again
+        assert cache.get("a", lambda: "new value") == "new value"
+        assert set(cache.locks) == {"a", "c"}
+
+    def test_lookup_metrics(self, monkeypatch):
+        """Test that lookups are counted by result."""
+        import threading
+
+        import diracx.core.utils
+
+        results = []
+        monkeypatch.setattr(
+            diracx.core.utils._cache_lookups,
+            "add",
+            lambda amount, attributes: results.append(attributes["result"]),
+        )
+        cache = TwoLevelCache(soft_ttl=10, hard_ttl=60, name="test")
+
+        cache.get("key", lambda: "value")
+        cache.get("key", lambda: "value")
+        assert results == ["hard_miss", "hit"]
+
+        cache.expire("key")
+        cache.get("key", lambda: "value")
+        assert results[-1] == "soft_miss"
+
+        release = threading.Event()
+
+        def slow_populate():
+            release.wait(timeout=5)
+            return "value"
+
+        with pytest.raises(NotReadyError):
+            cache.get("other", slow_populate, blocking=False)
+        assert results[-1] == "not_ready"
+        release.set()
+
 
 class TestAsyncTwoLevelCache:
     """Tests for AsyncTwoLevelCache, mirroring TestTwoLevelCache."""
@@ -469,3 +537,96 @@ class TestAsyncTwoLevelCache:
 
         with pytest.raises(NotReadyError):
             await task
+
+    async def test_cancelled_waiter_does_not_cancel_population(self):
+        """Cancelling one waiter leaves the shared refresh to the others."""
+        import asyncio
+
+        cache = AsyncTwoLevelCache(soft_ttl=10, hard_ttl=60)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_populate():
+            started.set()
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(cache.get("key", slow_populate))
+        second = asyncio.create_task(cache.get("key", slow_populate))
+        await asyncio.wait_for(started.wait(), timeout=1.0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        release.set()
+        assert await second == "value"
+
+    async def test_concurrent_readers_stress(self):
+        """Many readers over many keys populate each key exactly once."""
+        import asyncio
+        import random
+        from collections import Counter
+
+        cache = AsyncTwoLevelCache(soft_ttl=10, hard_ttl=60)
+        calls: Counter[str] = Counter()
+
+        def populate_for(key):
+            async def populate():
+                calls[key] += 1
+                await asyncio.sleep(random.uniform(0, 0.01))
+                return key.upper()
+
+            return populate
+
+        keys = [f"key{i}" for i in range(50)]
+        readers = [random.choice(keys) for _ in range(5000)]
+        results = await asyncio.gather(
+            *(cache.get(key, populate_for(key)) for key in readers)
+        )
+        assert results == [key.upper() for key in readers]
+        assert all(calls[key] == 1 for key in set(readers))
+        # Every refresh removed its own entry
+        assert cache.tasks == {}
+
+    def test_soft_ttl_jitter(self):
+        """Entries filled together don't all expire from the soft cache at once."""
+        cache = AsyncTwoLevelCache(soft_ttl=100, hard_ttl=600, soft_ttl_jitter=0.2)
+        expiries = [cache._soft_expiry(f"key{i}", "value", 1000) for i in range(100)]
+        assert all(1080 <= expiry <= 1100 for expiry in expiries)
+        assert len(set(expiries)) > 1
+
+        # Without jitter the full soft TTL is used
+        cache = AsyncTwoLevelCache(soft_ttl=100, hard_ttl=600, soft_ttl_jitter=0)
+        assert cache._soft_expiry("key", "value", 0) == 100
+
+
+@pytest.mark.parametrize(
+    "old, new, expected",
+    [
+        ({"a": 1}, {"a": 1}, []),
+        ({"a": 1}, {"a": 2}, [{"op": "replace", "path": "/a", "value": 2}]),
+        ({"a": 1}, {"a": True}, [{"op": "replace", "path": "/a", "value": True}]),
+        ({"a": 1}, {}, [{"op": "remove", "path": "/a"}]),
+        ({}, {"a": {"b": 1}}, [{"op": "add", "path": "/a", "value": {"b": 1}}]),
+        (
+            {"a": {"b": [1, 2], "c": 1}},
+            {"a": {"b": [1, 2, 3], "c": 1}},
+            [{"op": "replace", "path": "/a/b", "value": [1, 2, 3]}],
+        ),
+        (
+            {"a/b": {"c~d": 1}},
+            {"a/b": {"c~d": 2}},
+            [{"op": "replace", "path": "/a~1b/c~0d", "value": 2}],
+        ),
+        ({"a": 1}, [1], [{"op": "replace", "path": "", "value": [1]}]),
+    ],
+)
+def test_json_patch(old, new, expected):
+    patch = make_json_patch(old, new)
+    assert patch == expected
+    assert apply_json_patch(copy.deepcopy(old), patch) == new
+
+
+def test_apply_json_patch_unsupported_operation():
+    with pytest.raises(NotImplementedError):
+        apply_json_patch({"a": 1}, [{"op": "move", "from": "/a", "path": "/b"}])
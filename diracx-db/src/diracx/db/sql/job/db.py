@@ -47,6 +47,27 @@ class JobDB(BaseSQLDB):
         """Get a summary of the jobs."""
         return await self._summary(table=Jobs, group_by=group_by, search=search)
 
+    async def get_job_owners(
+        self, job_ids: Iterable[int]
+    ) -> dict[int, tuple[str, str]]:
+        """Get the owner and VO of the given jobs.
+
+        This is a single primary key lookup, used by the access policies to
+        check the ownership of the jobs a request acts on.
+
+        Args:
+            job_ids: the job ids
+
+        Returns:
+            mapping of job id to (Owner, VO). Unknown jobs are omitted.
+        """
+        stmt = select(Jobs.job_id, Jobs.owner, Jobs.vo).where(
+            Jobs.job_id.in_(set(job_ids))
+        )
+        return {
+            job_id: (owner, vo) for job_id, owner, vo in await self.conn.execute(stmt)
+        }
+
     async def search(
         self,
         parameters: list[str] | None,
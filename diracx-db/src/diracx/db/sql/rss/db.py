@@ -18,9 +18,15 @@ class ResourceStatusDB(BaseSQLDB):
 
     metadata = RSSBase.metadata
 
-    async def get_site_statuses(self) -> list[tuple[str, str, str, str]]:
+    async def get_site_statuses(
+        self, since: datetime | None = None
+    ) -> list[tuple[str, str, str, str]]:
         """Return all site statuses across all VOs.
 
+        Args:
+            since: Only return the rows whose DateEffective is at or after this
+                   date. Defaults to None (all rows).
+
         Returns:
             List of (name, status, reason, vo) tuples.
 
@@ -31,6 +37,8 @@ class ResourceStatusDB(BaseSQLDB):
             SiteStatus.reason,
             SiteStatus.vo,
         )
+        if since is not None:
+            stmt = stmt.where(SiteStatus.date_effective >= since)
         result = await self.conn.execute(stmt)
         return [(row.Name, row.Status, row.Reason, row.VO) for row in result.all()]
 
@@ -38,6 +46,7 @@ class ResourceStatusDB(BaseSQLDB):
         self,
         status_types: list[str] | None = None,
         element_type: str | None = None,
+        since: datetime | None = None,
     ) -> dict[str, dict[str, dict[str, Row]]]:
         """Return resource statuses for the given status types across all VOs.
 
@@ -48,6 +57,8 @@ class ResourceStatusDB(BaseSQLDB):
                           "StorageElement"). Defaults to None (no filter), which
                           returns every element type and would mix, say, compute
                           and FTS rows that both use the "all" status type.
+            since: Only return the rows whose DateEffective is at or after this
+                   date. Defaults to None (all rows).
 
         Returns:
             Nested dict keyed by VO, then resource name, then status type. The
@@ -68,6 +79,8 @@ class ResourceStatusDB(BaseSQLDB):
         )
         if element_type is not None:
             stmt = stmt.where(ResourceStatus.element_type == element_type)
+        if since is not None:
+            stmt = stmt.where(ResourceStatus.date_effective >= since)
         result = await self.conn.execute(stmt)
 
         statuses: dict[str, dict[str, dict[str, Row]]] = {}
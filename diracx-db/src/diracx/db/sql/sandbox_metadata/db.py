@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterable
 from typing import Any
 
 from sqlalchemy import (
@@ -51,6 +52,19 @@ class SandboxMetadataDB(BaseSQLDB):
         )
         return (await self.conn.execute(stmt)).scalar_one_or_none()
 
+    async def get_sandbox_owner_ids(
+        self, pfns: Iterable[str], se_name: str
+    ) -> dict[str, int]:
+        """Get the id of the owner of several sandboxes in a single query.
+
+        Sandboxes which are not found are omitted from the result.
+        """
+        stmt = select(SandBoxes.SEPFN, SandBoxes.OwnerId).where(
+            SandBoxes.SEName == se_name,
+            SandBoxes.SEPFN.in_(set(pfns)),
+        )
+        return {pfn: owner_id for pfn, owner_id in await self.conn.execute(stmt)}
+
     async def insert_owner(self, user: UserInfo) -> int:
         stmt = insert(SBOwners).values(
             Owner=user.preferred_username,
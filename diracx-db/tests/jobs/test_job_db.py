@@ -389,3 +389,12 @@ async def test_set_job_commands_invalid_job_id(job_db: JobDB):
     async with job_db as job_db:
         with pytest.raises(IntegrityError):
             await job_db.set_job_commands([(123456, "test_command", "")])
+
+
+async def test_get_job_owners(populated_job_db):
+    async with populated_job_db as db:
+        owners = await db.get_job_owners([1, 2, 2, 1000])
+    assert owners == {1: ("owner0", "lhcb"), 2: ("owner1", "lhcb")}
+
+    async with populated_job_db as db:
+        assert await db.get_job_owners([]) == {}
@@ -211,3 +211,24 @@ async def test_get_sandbox_owner_id(sandbox_metadata_db: SandboxMetadataDB):
             "not_found", sandbox_se
         )
     assert sb_owner_id is None
+
+
+async def test_get_sandbox_owner_ids(sandbox_metadata_db: SandboxMetadataDB):
+    user_info = UserInfo(
+        sub="vo:sub", preferred_username="user1", dirac_group="group1", vo="vo"
+    )
+    pfns = [secrets.token_hex() for _ in range(3)]
+    sandbox_se = "SandboxSE"
+    async with sandbox_metadata_db:
+        owner_id = await sandbox_metadata_db.insert_owner(user_info)
+        for pfn in pfns:
+            await sandbox_metadata_db.insert_sandbox(owner_id, sandbox_se, pfn, 100)
+
+    async with sandbox_metadata_db:
+        sb_owner_ids = await sandbox_metadata_db.get_sandbox_owner_ids(
+            [*pfns, "not_found"], sandbox_se
+        )
+    assert sb_owner_ids == {pfn: owner_id for pfn in pfns}
+
+    async with sandbox_metadata_db:
+        assert await sandbox_metadata_db.get_sandbox_owner_ids(pfns, "OtherSE") == {}
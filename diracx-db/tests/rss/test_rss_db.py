@@ -230,3 +230,26 @@ async def test_insert_resource_status_sets_element_type(rss_db: ResourceStatusDB
         fts = await db.get_resource_statuses(["all"], element_type="FTS")
     assert set(compute["lhcb"]) == {"ComputeOnly"}
     assert set(fts["lhcb"]) == {"FTSOnly"}
+
+
+async def test_statuses_since(rss_db: ResourceStatusDB):
+    """Only the rows effective at or after ``since`` are returned."""
+    later = _NOW.replace(year=2025)
+    async with rss_db as db:
+        for name, date in [("Old", _NOW), ("New", later)]:
+            await db.insert_resource_status(
+                name=name,
+                status="Active",
+                status_type="all",
+                vo="all",
+                element_type="ComputeElement",
+                date_effective=date,
+            )
+            await db.insert_site_status(
+                name=name, status="Active", vo="all", date_effective=date
+            )
+
+        result = await db.get_resource_statuses(since=later)
+        assert set(result["all"]) == {"New"}
+        assert [row[0] for row in await db.get_site_statuses(since=later)] == ["New"]
+        assert len(await db.get_site_statuses(since=_NOW)) == 2
@@ -299,8 +299,11 @@ async def exchange_token(
             "Dynamic registration of users is not yet implemented"
         )
 
+    if config.registry[vo].is_suspended(sub, vo):
+        raise PermissionError(f"User {preferred_username} is suspended in {vo}")
+
     # Check that the subject is part of the dirac users
-    if sub not in config.registry[vo].groups[dirac_group].users:
+    if dirac_group not in config.registry[vo].groups_of(sub):
         raise PermissionError(
             f"User is not a member of the requested group ({preferred_username}, {dirac_group})"
         )
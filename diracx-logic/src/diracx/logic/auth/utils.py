@@ -225,11 +225,7 @@ async def verify_dirac_refresh_token(
 
 def get_allowed_user_properties(config: Config, sub, vo: str) -> set[SecurityProperty]:
     """Retrieve all properties of groups a user is registered in."""
-    allowed_user_properties = set()
-    for group in config.registry[vo].groups:
-        if sub in config.registry[vo].groups[group].users:
-            allowed_user_properties.update(config.registry[vo].groups[group].properties)
-    return allowed_user_properties
+    return set(config.registry[vo].properties_of(sub))
 
 
 def parse_and_validate_scope(
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Mapping
+from typing import Any
 
 from diracx.core.models.rss import (
     ALLOWED,
@@ -40,6 +42,48 @@ def map_status(db_status: str, reason: str | None = None) -> ResourceStatus:
     )
 
 
+def site_status(status: str, reason: str | None) -> SiteStatusModel:
+    """Build the status of a site from its SiteStatus row."""
+    return SiteStatusModel(all=map_status(status, reason))
+
+
+def compute_element_status(rows: Mapping[str, Any]) -> ComputeElementStatus:
+    """Build the status of a compute element from its rows by status type."""
+    return ComputeElementStatus(all=map_status(rows["all"].Status, rows["all"].Reason))
+
+
+def fts_status(rows: Mapping[str, Any]) -> FTSStatus:
+    """Build the status of an FTS server from its rows by status type."""
+    return FTSStatus(all=map_status(rows["all"].Status, rows["all"].Reason))
+
+
+STORAGE_STATUS_TYPES = ["ReadAccess", "WriteAccess", "CheckAccess", "RemoveAccess"]
+
+
+def storage_element_status(
+    name: str, vo: str, rows: Mapping[str, Any]
+) -> StorageElementStatus | None:
+    """Build the status of a storage element from its rows by status type.
+
+    Returns None when one or more of the four access rows is missing: the
+    status is undefined and guessing could grant unintended access.
+    """
+    if missing := [st for st in STORAGE_STATUS_TYPES if st not in rows]:
+        logger.warning(
+            "Skipping storage element %r (vo=%r): missing status types %s",
+            name,
+            vo,
+            missing,
+        )
+        return None
+    return StorageElementStatus(
+        read=map_status(rows["ReadAccess"].Status, rows["ReadAccess"].Reason),
+        write=map_status(rows["WriteAccess"].Status, rows["WriteAccess"].Reason),
+        check=map_status(rows["CheckAccess"].Status, rows["CheckAccess"].Reason),
+        remove=map_status(rows["RemoveAccess"].Status, rows["RemoveAccess"].Reason),
+    )
+
+
 async def get_site_statuses(
     resource_status_db: ResourceStatusDB,
 ) -> dict[str, dict[str, SiteStatusModel]]:
@@ -56,7 +100,7 @@ async def get_site_statuses(
         vo = vo or "all"
         if vo not in result:
             result[vo] = {}
-        result[vo][name] = SiteStatusModel(all=map_status(status, reason))
+        result[vo][name] = site_status(status, reason)
 
     return result
 
@@ -72,10 +116,7 @@ async def get_compute_statuses(
     result: dict[str, dict[str, ComputeElementStatus]] = {}
     for vo, names in all_rows.items():
         result[vo] = {
-            name: ComputeElementStatus(
-                all=map_status(rows["all"].Status, rows["all"].Reason)
-            )
-            for name, rows in names.items()
+            name: compute_element_status(rows) for name, rows in names.items()
         }
 
     return result
@@ -91,24 +132,18 @@ async def get_fts_statuses(
 
     result: dict[str, dict[str, FTSStatus]] = {}
     for vo, names in all_rows.items():
-        result[vo] = {
-            name: FTSStatus(all=map_status(rows["all"].Status, rows["all"].Reason))
-            for name, rows in names.items()
-        }
+        result[vo] = {name: fts_status(rows) for name, rows in names.items()}
 
     return result
 
 
-STORAGE_STATUS_TYPES = ["ReadAccess", "WriteAccess", "CheckAccess", "RemoveAccess"]
-
-
 async def get_storage_statuses(
     resource_status_db: ResourceStatusDB,
 ) -> dict[str, dict[str, StorageElementStatus]]:
     """Fetch all storage element statuses across all VOs.
 
-    Storage elements missing one or more of the four access rows are skipped:
-    their status is undefined and guessing could grant unintended access.
+    Storage elements missing one or more of the four access rows are skipped,
+    see storage_element_status.
     """
     all_rows = await resource_status_db.get_resource_statuses(
         STORAGE_STATUS_TYPES, element_type=ResourceType.Storage
@@ -118,25 +153,7 @@ async def get_storage_statuses(
     for vo, names in all_rows.items():
         result[vo] = {}
         for name, rows in names.items():
-            if missing := [st for st in STORAGE_STATUS_TYPES if st not in rows]:
-                logger.warning(
-                    "Skipping storage element %r (vo=%r): missing status types %s",
-                    name,
-                    vo,
-                    missing,
-                )
-                continue
-            result[vo][name] = StorageElementStatus(
-                read=map_status(rows["ReadAccess"].Status, rows["ReadAccess"].Reason),
-                write=map_status(
-                    rows["WriteAccess"].Status, rows["WriteAccess"].Reason
-                ),
-                check=map_status(
-                    rows["CheckAccess"].Status, rows["CheckAccess"].Reason
-                ),
-                remove=map_status(
-                    rows["RemoveAccess"].Status, rows["RemoveAccess"].Reason
-                ),
-            )
+            if (status := storage_element_status(name, vo, rows)) is not None:
+                result[vo][name] = status
 
     return result
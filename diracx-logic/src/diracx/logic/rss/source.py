@@ -8,10 +8,16 @@ violating the project's dependency flow:
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import math
+import time
 from abc import abstractmethod
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import ClassVar
+from typing import Any, ClassVar
+
+from pydantic import BaseModel, SerializeAsAny, TypeAdapter
 
 from diracx.core.models.rss import ResourceType
 from diracx.core.sources import AsyncCacheableSource, Snapshot
@@ -19,10 +25,10 @@ from diracx.db.sql.rss.db import ResourceStatusDB
 
 from .query import (
     STORAGE_STATUS_TYPES,
-    get_compute_statuses,
-    get_fts_statuses,
-    get_site_statuses,
-    get_storage_statuses,
+    compute_element_status,
+    fts_status,
+    site_status,
+    storage_element_status,
 )
 
 logger = logging.getLogger(__name__)
@@ -30,6 +36,33 @@ logger = logging.getLogger(__name__)
 #: Revision returned when the underlying table contains no rows.
 EMPTY_REVISION = ("empty-0", datetime(1970, 1, 1, tzinfo=timezone.utc))
 
+#: Rows keyed by VO, then element name, then status type.
+StatusRows = dict[str, dict[str, dict[str, Any]]]
+
+_VIEW_ADAPTER = TypeAdapter(dict[str, SerializeAsAny[BaseModel]])
+
+
+@dataclass(frozen=True)
+class VOView:
+    """The statuses visible to a VO, serialized as they are served."""
+
+    body: bytes
+    #: Digest of the body, used to build the ETag of the view
+    digest: str
+    #: DateEffective of the revision in which the view last changed
+    modified: datetime
+
+
+@dataclass(frozen=True)
+class StatusSnapshot(Snapshot[dict[str, dict[str, BaseModel]]]):
+    """A snapshot of all VOs' statuses along with the view of each VO."""
+
+    views: dict[str, VOView]
+
+    def view(self, vo: str) -> VOView:
+        """Return the view of a VO: the "all" entries overlaid with its own."""
+        return self.views.get(vo) or self.views["all"]
+
 
 def _make_revision(max_date: datetime | None, count: int) -> tuple[str, datetime]:
     """Build a (revision, modified) pair from the latest date and row count.
@@ -46,18 +79,153 @@ def _make_revision(max_date: datetime | None, count: int) -> tuple[str, datetime
     return f"{max_date.isoformat()}-{count}", max_date
 
 
-class ResourceStatusSource(AsyncCacheableSource[Snapshot]):
+def _revision_count(revision: str) -> int:
+    """Return the row count encoded in a revision built by _make_revision."""
+    return int(revision.rsplit("-", 1)[1])
+
+
+class IncrementalStatusSource(AsyncCacheableSource[StatusSnapshot]):
+    """Caching source which refreshes its snapshot incrementally.
+
+    Rather than reloading the whole table for every new revision, only the rows
+    whose DateEffective is at or after the previous revision's are fetched and
+    merged into the rows of the previous snapshot. The models of the elements
+    they belong to are rebuilt, all the others are shared with the previous
+    snapshot.
+
+    Merging can add or replace rows but never remove them, so the merged rows
+    are counted and compared with the row count of the new revision. A mismatch
+    means rows were deleted (or inserted with an older DateEffective) and the
+    whole table is reloaded. It is also reloaded every ``full_resync_interval``
+    seconds to pick up updates which didn't advance DateEffective.
+
+    The view of each VO is serialized once per revision, and only if its
+    entries changed, so that requests only have to look it up. Its digest
+    only changes with its content, so a change in one VO doesn't invalidate
+    the clients' caches of the others.
+    """
+
+    db_class = ResourceStatusDB
+
+    #: Maximum number of seconds between two reloads of the whole table.
+    full_resync_interval: ClassVar[float] = 15 * 60
+
+    def __init__(self, *, db: ResourceStatusDB) -> None:
+        super().__init__()
+        self._db = db
+        self._rows: StatusRows = {}
+        self._row_count = 0
+        self._data: dict[str, dict[str, BaseModel]] = {}
+        # DateEffective of the revision the rows were last refreshed for
+        self._rows_date: datetime | None = None
+        self._last_full_resync = -math.inf
+        # The data the views were last built from, to find the unchanged ones
+        self._views_data: dict[str, dict[str, BaseModel]] = {}
+        self._views: dict[str, VOView] = {}
+
+    @abstractmethod
+    async def _fetch_rows(
+        self, db: ResourceStatusDB, since: datetime | None
+    ) -> StatusRows:
+        """Fetch the rows changed since the given date, or all if it is None."""
+
+    @abstractmethod
+    def _to_model(self, name: str, vo: str, rows: dict[str, Any]) -> BaseModel | None:
+        """Build the status of an element from its rows, None to leave it out."""
+
+    async def read_raw(self, hexsha: str, modified: datetime) -> StatusSnapshot:
+        async with self._db as db:
+            if not await self._refresh_incrementally(db, hexsha):
+                await self._full_resync(db)
+        self._rows_date = modified
+        self._update_views(modified)
+        return StatusSnapshot(
+            data=self._data, hexsha=hexsha, modified=modified, views=self._views
+        )
+
+    def _update_views(self, modified: datetime) -> None:
+        common = self._data.get("all")
+        common_changed = common is not self._views_data.get("all")
+        views = {}
+        for vo in self._data.keys() | {"all"}:
+            previous = self._views.get(vo)
+            entries = self._data.get(vo)
+            if previous and not common_changed and entries is self._views_data.get(vo):
+                views[vo] = previous
+                continue
+            body = _VIEW_ADAPTER.dump_json({**(common or {}), **(entries or {})})
+            if previous and previous.body == body:
+                views[vo] = previous
+            else:
+                digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+                views[vo] = VOView(body=body, digest=digest, modified=modified)
+        self._views_data = self._data
+        self._views = views
+
+    async def _full_resync(self, db: ResourceStatusDB) -> None:
+        self._rows = await self._fetch_rows(db, None)
+        self._row_count = sum(
+            len(rows) for names in self._rows.values() for rows in names.values()
+        )
+        self._data = {}
+        for vo, names in self._rows.items():
+            self._data[vo] = {}
+            for name, rows in names.items():
+                if (model := self._to_model(name, vo, rows)) is not None:
+                    self._data[vo][name] = model
+        self._last_full_resync = time.monotonic()
+
+    async def _refresh_incrementally(self, db: ResourceStatusDB, hexsha: str) -> bool:
+        """Merge the rows changed since the last refresh, if possible.
+
+        Returns False when the whole table has to be reloaded instead.
+        """
+        if self._rows_date is None:
+            return False
+        if time.monotonic() - self._last_full_resync >= self.full_resync_interval:
+            return False
+
+        changed = await self._fetch_rows(db, self._rows_date)
+        new_rows = sum(
+            status_type not in self._rows.get(vo, {}).get(name, {})
+            for vo, names in changed.items()
+            for name, rows in names.items()
+            for status_type in rows
+        )
+        if self._row_count + new_rows != _revision_count(hexsha):
+            logger.info(
+                "%s: rows were removed since the last refresh, reloading all of them",
+                type(self).__name__,
+            )
+            return False
+
+        # The previous snapshot may still be in use so only copy-on-write
+        data = dict(self._data)
+        for vo, names in changed.items():
+            vo_rows = self._rows.setdefault(vo, {})
+            vo_data = data[vo] = dict(data.get(vo, {}))
+            for name, rows in names.items():
+                merged = vo_rows.setdefault(name, {})
+                merged.update(rows)
+                if (model := self._to_model(name, vo, merged)) is None:
+                    vo_data.pop(name, None)
+                else:
+                    vo_data[name] = model
+        self._row_count += new_rows
+        self._data = data
+        return True
+
+
+class ResourceStatusSource(IncrementalStatusSource):
     """Base caching source for Compute, Storage and FTS resource types.
 
-    Subclasses declare the status types their data lives in and how to fetch
-    it from the database.
+    Subclasses declare the status types their data lives in and how to build
+    the status of an element from its rows.
 
     One source instance per resource type covers all VOs. VO filtering is done
     in the route after the snapshot is fetched from the cache.
     """
 
-    db_class = ResourceStatusDB
-
     #: Status types holding this resource type's data, used both for the
     #: revision query and the data fetch.
     status_types: ClassVar[list[str]]
@@ -68,10 +236,6 @@ class ResourceStatusSource(AsyncCacheableSource[Snapshot]):
     #: would collide and a change to one would invalidate the other's cache.
     element_type: ClassVar[ResourceType]
 
-    def __init__(self, *, db: ResourceStatusDB) -> None:
-        super().__init__()
-        self._db = db
-
     async def latest_revision(self) -> tuple[str, datetime]:
         async with self._db as db:
             max_date, count = await db.get_resource_status_date(
@@ -79,59 +243,57 @@ class ResourceStatusSource(AsyncCacheableSource[Snapshot]):
             )
         return _make_revision(max_date, count)
 
-    async def read_raw(self, hexsha: str, modified: datetime) -> Snapshot:
-        async with self._db as db:
-            data = await self._fetch(db)
-        return Snapshot(data=data, hexsha=hexsha, modified=modified)
-
-    @abstractmethod
-    async def _fetch(self, db: ResourceStatusDB) -> dict:
-        """Fetch this resource type's statuses, keyed by VO then name."""
+    async def _fetch_rows(
+        self, db: ResourceStatusDB, since: datetime | None
+    ) -> StatusRows:
+        return await db.get_resource_statuses(
+            self.status_types, element_type=self.element_type, since=since
+        )
 
 
 class StorageElementStatusSource(ResourceStatusSource):
     status_types = STORAGE_STATUS_TYPES
     element_type = ResourceType.Storage
 
-    async def _fetch(self, db: ResourceStatusDB) -> dict:
-        return await get_storage_statuses(db)
+    def _to_model(self, name: str, vo: str, rows: dict[str, Any]) -> BaseModel | None:
+        return storage_element_status(name, vo, rows)
 
 
 class ComputeElementStatusSource(ResourceStatusSource):
     status_types = ["all"]
     element_type = ResourceType.Compute
 
-    async def _fetch(self, db: ResourceStatusDB) -> dict:
-        return await get_compute_statuses(db)
+    def _to_model(self, name: str, vo: str, rows: dict[str, Any]) -> BaseModel | None:
+        return compute_element_status(rows)
 
 
 class FTSStatusSource(ResourceStatusSource):
     status_types = ["all"]
     element_type = ResourceType.FTS
 
-    async def _fetch(self, db: ResourceStatusDB) -> dict:
-        return await get_fts_statuses(db)
+    def _to_model(self, name: str, vo: str, rows: dict[str, Any]) -> BaseModel | None:
+        return fts_status(rows)
 
 
-class SiteStatusSource(AsyncCacheableSource[Snapshot]):
+class SiteStatusSource(IncrementalStatusSource):
     """Caching source for Site statuses.
 
     Uses its own DB table (SiteStatus) and a dedicated date query, so it is a
-    direct subclass of AsyncCacheableSource rather than ResourceStatusSource.
+    direct subclass of IncrementalStatusSource rather than ResourceStatusSource.
     """
 
-    db_class = ResourceStatusDB
-
-    def __init__(self, *, db: ResourceStatusDB) -> None:
-        super().__init__()
-        self._db = db
-
     async def latest_revision(self) -> tuple[str, datetime]:
         async with self._db as db:
             max_date, count = await db.get_site_status_date()
         return _make_revision(max_date, count)
 
-    async def read_raw(self, hexsha: str, modified: datetime) -> Snapshot:
-        async with self._db as db:
-            data = await get_site_statuses(db)
-        return Snapshot(data=data, hexsha=hexsha, modified=modified)
+    async def _fetch_rows(
+        self, db: ResourceStatusDB, since: datetime | None
+    ) -> StatusRows:
+        rows: StatusRows = {}
+        for name, status, reason, vo in await db.get_site_statuses(since=since):
+            rows.setdefault(vo or "all", {})[name] = {"all": (status, reason)}
+        return rows
+
+    def _to_model(self, name: str, vo: str, rows: dict[str, Any]) -> BaseModel | None:
+        return site_status(*rows["all"])
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from diracx.core.config import RegistryConfig
+from diracx.core.properties import NORMAL_USER
+from diracx.logic.auth.token import exchange_token
+
+REGISTRY = {
+    "IdP": {"URL": "https://idp.invalid", "ClientID": "diracx"},
+    "DefaultGroup": "user",
+    "Users": {
+        "sub-a": {"PreferedUsername": "alice", "Suspended": ["vo"]},
+        "sub-b": {"PreferedUsername": "bob"},
+    },
+    "Groups": {"user": {"Users": ["sub-a"], "Properties": [NORMAL_USER]}},
+}
+
+
+@pytest.fixture
+def config():
+    return SimpleNamespace(registry={"vo": RegistryConfig.model_validate(REGISTRY)})
+
+
+async def _exchange(config, sub):
+    # Refused exchanges fail before the database or the settings are used
+    return await exchange_token(
+        None, "vo:vo group:user", {"sub": sub}, config, None, {NORMAL_USER}
+    )
+
+
+async def test_exchange_token_suspended_user(config):
+    with pytest.raises(PermissionError, match="alice is suspended in vo"):
+        await _exchange(config, "sub-a")
+
+
+async def test_exchange_token_not_a_member(config):
+    with pytest.raises(PermissionError, match="not a member of the requested group"):
+        await _exchange(config, "sub-b")
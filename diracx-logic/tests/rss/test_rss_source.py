@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import json
+import math
 from collections import namedtuple
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy import delete
 
 from diracx.core.models.rss import (
     ComputeElementStatus,
@@ -14,6 +17,7 @@ from diracx.core.models.rss import (
     StorageElementStatus,
 )
 from diracx.db.sql.rss.db import ResourceStatusDB
+from diracx.db.sql.rss.schema import ResourceStatus as ResourceStatusTable
 from diracx.logic.rss.source import (
     ComputeElementStatusSource,
     FTSStatusSource,
@@ -156,7 +160,7 @@ async def test_read_raw_compute(mock_resource_status_db):
         assert key in result.data["test_vo"]
         assert value.model_dump() == result.data["test_vo"][key].model_dump()
     mock_resource_status_db.get_resource_statuses.assert_awaited_once_with(
-        ["all"], element_type=ResourceType.Compute
+        ["all"], element_type=ResourceType.Compute, since=None
     )
 
 
@@ -203,6 +207,7 @@ async def test_read_raw_storage(mock_resource_status_db):
     mock_resource_status_db.get_resource_statuses.assert_awaited_once_with(
         ["ReadAccess", "WriteAccess", "CheckAccess", "RemoveAccess"],
         element_type=ResourceType.Storage,
+        since=None,
     )
 
 
@@ -254,5 +259,159 @@ async def test_read_raw_fts(mock_resource_status_db):
         assert key in result.data["test_vo"]
         assert value.model_dump() == result.data["test_vo"][key].model_dump()
     mock_resource_status_db.get_resource_statuses.assert_awaited_once_with(
-        ["all"], element_type=ResourceType.FTS
+        ["all"], element_type=ResourceType.FTS, since=None
+    )
+
+
+@pytest.fixture
+async def rss_db():
+    rss_db = ResourceStatusDB("sqlite+aiosqlite:///:memory:")
+    async with rss_db.engine_context():
+        async with rss_db.engine.begin() as conn:
+            await conn.run_sync(rss_db.metadata.create_all)
+        yield rss_db
+
+
+async def _insert_compute(rss_db, name, vo, status, date):
+    async with rss_db as db:
+        await db.insert_resource_status(
+            name=name,
+            status=status,
+            status_type="all",
+            vo=vo,
+            element_type=ResourceType.Compute,
+            date_effective=date,
+        )
+
+
+async def _reread(source):
+    """Read the source as if the revision cache had expired."""
+    await source._revision_cache.clear()
+    return await source.read()
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    """Record the ``since`` argument of every resource status fetch."""
+    calls = []
+    original = ResourceStatusDB.get_resource_statuses
+
+    async def get_resource_statuses(self, *args, since=None, **kwargs):
+        calls.append(since)
+        return await original(self, *args, since=since, **kwargs)
+
+    monkeypatch.setattr(
+        ResourceStatusDB, "get_resource_statuses", get_resource_statuses
     )
+    return calls
+
+
+async def test_incremental_refresh(rss_db, fetch_calls):
+    """Only the rows changed since the previous revision are fetched."""
+    await _insert_compute(rss_db, "CE1", "vo1", "Active", _MAX_DATE)
+    await _insert_compute(rss_db, "CE2", "vo2", "Active", _MAX_DATE.replace(year=2022))
+    source = ComputeElementStatusSource(db=rss_db)
+
+    first = await source.read()
+    assert fetch_calls == [None]
+    assert first.data["vo1"]["CE1"].all.allowed
+
+    # An update (replacing the primary key) and an insertion
+    later = _MAX_DATE.replace(year=2024)
+    async with rss_db as db:
+        await db.conn.execute(
+            delete(ResourceStatusTable).where(ResourceStatusTable.name == "CE1")
+        )
+    await _insert_compute(rss_db, "CE1", "vo1", "Banned", later)
+    await _insert_compute(rss_db, "CE3", "vo1", "Active", later)
+
+    second = await _reread(source)
+    assert fetch_calls == [None, _MAX_DATE]
+    assert not second.data["vo1"]["CE1"].all.allowed
+    assert second.data["vo1"]["CE3"].all.allowed
+    # Unchanged VOs are shared and the previous snapshot is left untouched
+    assert second.data["vo2"] is first.data["vo2"]
+    assert first.data["vo1"]["CE1"].all.allowed
+    assert set(first.data["vo1"]) == {"CE1"}
+
+
+async def test_incremental_refresh_detects_deletions(rss_db, fetch_calls):
+    """Deleted rows can't be merged so the whole table is reloaded."""
+    await _insert_compute(rss_db, "CE1", "vo1", "Active", _MAX_DATE)
+    await _insert_compute(rss_db, "CE2", "vo1", "Active", _MAX_DATE)
+    source = ComputeElementStatusSource(db=rss_db)
+    await source.read()
+
+    later = _MAX_DATE.replace(year=2024)
+    async with rss_db as db:
+        await db.conn.execute(
+            delete(ResourceStatusTable).where(ResourceStatusTable.name == "CE2")
+        )
+    await _insert_compute(rss_db, "CE3", "vo1", "Active", later)
+
+    snapshot = await _reread(source)
+    assert fetch_calls == [None, _MAX_DATE, None]
+    assert set(snapshot.data["vo1"]) == {"CE1", "CE3"}
+
+
+async def test_periodic_full_resync(rss_db, fetch_calls, monkeypatch):
+    await _insert_compute(rss_db, "CE1", "vo1", "Active", _MAX_DATE)
+    source = ComputeElementStatusSource(db=rss_db)
+    await source.read()
+    await _insert_compute(rss_db, "CE2", "vo1", "Active", _MAX_DATE.replace(year=2024))
+    await _reread(source)
+    assert fetch_calls == [None, _MAX_DATE]
+
+    monkeypatch.setattr(source, "full_resync_interval", 0)
+    await _insert_compute(rss_db, "CE3", "vo1", "Active", _MAX_DATE.replace(year=2025))
+    assert set((await _reread(source)).data["vo1"]) == {"CE1", "CE2", "CE3"}
+    assert fetch_calls == [None, _MAX_DATE, None]
+
+
+async def test_incremental_refresh_site(rss_db):
+    async with rss_db as db:
+        await db.insert_site_status(
+            name="Site1", status="Active", vo="vo1", date_effective=_MAX_DATE
+        )
+    source = SiteStatusSource(db=rss_db)
+    assert (await source.read()).data["vo1"]["Site1"].all.allowed
+
+    async with rss_db as db:
+        await db.insert_site_status(
+            name="Site2",
+            status="Banned",
+            vo="vo1",
+            date_effective=_MAX_DATE.replace(year=2024),
+        )
+    snapshot = await _reread(source)
+    assert snapshot.data["vo1"]["Site1"].all.allowed
+    assert not snapshot.data["vo1"]["Site2"].all.allowed
+
+
+async def test_vo_views(rss_db):
+    """Each VO's view is serialized once and kept until its content changes."""
+    await _insert_compute(rss_db, "CE-shared", "all", "Active", _MAX_DATE)
+    await _insert_compute(rss_db, "CE1", "vo1", "Banned", _MAX_DATE)
+    await _insert_compute(rss_db, "CE2", "vo2", "Active", _MAX_DATE)
+    source = ComputeElementStatusSource(db=rss_db)
+
+    first = await source.read()
+    assert json.loads(first.view("vo1").body) == {
+        "CE-shared": {"all": {"allowed": True, "warnings": None}},
+        "CE1": {"all": {"allowed": False, "reason": "Banned"}},
+    }
+    # VOs without entries of their own see the "all" entries
+    assert first.view("vo3") is first.views["all"]
+    assert set(json.loads(first.view("vo3").body)) == {"CE-shared"}
+
+    await _insert_compute(rss_db, "CE3", "vo2", "Active", _MAX_DATE.replace(year=2024))
+    second = await _reread(source)
+    assert second.view("vo1") is first.view("vo1")
+    assert second.view("vo2").digest != first.view("vo2").digest
+    assert second.view("vo2").modified == _MAX_DATE.replace(year=2024)
+
+    # A full reload rebuilds the views but unchanged ones are kept as they were
+    source._last_full_resync = -math.inf
+    await _insert_compute(rss_db, "CE4", "vo2", "Active", _MAX_DATE.replace(year=2025))
+    third = await _reread(source)
+    assert third.view("vo1") is first.view("vo1")
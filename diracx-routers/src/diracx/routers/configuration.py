@@ -2,33 +2,75 @@ from __future__ import annotations
 
 __all__ = ["router"]
 
+import json
 import logging
+from http import HTTPStatus
 from typing import Annotated
 
+from cachetools import LRUCache
 from fastapi import (
+    Depends,
     Header,
+    HTTPException,
     Response,
 )
 
+from diracx.core.config import ConfigSource, SerializedConfig
+from diracx.core.utils import make_json_patch
 from diracx.routers.dependencies import Config
 
 from .access_policies import open_access
 from .fastapi_classes import DiracxRouter
+from .utils.compression import compress, negotiate_encoding
 from .utils.http_cache import apply_cache_headers
 
 logger = logging.getLogger(__name__)
 
 router = DiracxRouter()
 
+ConfigSourceInstance = Annotated[ConfigSource, Depends(ConfigSource.instance)]
+
+# The config compressed with the encodings not pre-computed by the ConfigSource,
+# keyed by (revision, content encoding), so that each revision is compressed once
+_config_body_cache: LRUCache[tuple[str, str], bytes] = LRUCache(maxsize=8)
+# JSON patches between two revisions, keyed by (old revision, new revision)
+_config_patch_cache: LRUCache[tuple[str, str], bytes] = LRUCache(maxsize=32)
+
+
+def config_body(serialized: SerializedConfig, encoding: str | None) -> bytes:
+    """Return the JSON representation of the config, compressed with encoding."""
+    match encoding:
+        case None:
+            return serialized.json
+        case "gzip":
+            return serialized.gzip
+    key = (serialized.hexsha, encoding)
+    if (body := _config_body_cache.get(key)) is None:
+        body = _config_body_cache[key] = compress(serialized.json, encoding)
+    return body
+
+
+def config_patch(old: SerializedConfig, new: SerializedConfig) -> bytes:
+    """Return the JSON patch to go from the old revision of the config to the new one."""
+    key = (old.hexsha, new.hexsha)
+    if (patch := _config_patch_cache.get(key)) is None:
+        patch = json.dumps(
+            make_json_patch(json.loads(old.json), json.loads(new.json))
+        ).encode()
+        _config_patch_cache[key] = patch
+    return patch
+
 
 @open_access
 @router.get("/")
 async def serve_config(
     config: Config,
+    config_source: ConfigSourceInstance,
     response: Response,
     # check_permissions: OpenAccessPolicyCallable,
     if_none_match: Annotated[str | None, Header()] = None,
     if_modified_since: Annotated[str | None, Header()] = None,
+    accept_encoding: Annotated[str | None, Header()] = None,
 ):
     """Get the latest view of the config.
 
@@ -36,6 +78,9 @@ async def serve_config(
 
     If If-Modified-Since is given and is newer than latest,
         return 304: this is to avoid flip/flopping
+
+    The body is serialized and compressed once per revision, according to
+    Accept-Encoding.
     """
     # await check_permissions()
     apply_cache_headers(
@@ -44,6 +89,57 @@ async def serve_config(
         modified=config._modified,
         if_none_match=if_none_match,
         if_modified_since=if_modified_since,
+        vary="Accept-Encoding",
+    )
+
+    serialized = config_source.read_serialized(config._hexsha)
+    if serialized is None:
+        # Not expected as the ConfigSource serializes each revision it loads
+        serialized = SerializedConfig.from_config(config)
+    encoding = negotiate_encoding(accept_encoding)
+    headers = dict(response.headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=config_body(serialized, encoding),
+        media_type="application/json",
+        headers=headers,
     )
 
-    return config
+
+@open_access
+@router.get("/diff")
+async def serve_config_diff(
+    config: Config,
+    config_source: ConfigSourceInstance,
+    response: Response,
+    since: str,
+):
+    """Get the changes to the config since a given revision.
+
+    The changes are returned as a JSON patch (RFC 6902) which, applied to the
+    config of revision ``since``, gives the latest config. The ETag header
+    contains the revision of the latest config.
+
+    If ``since`` isn't one of the revisions recently loaded by the server,
+    return 404: the full config must then be downloaded from "/config/".
+    """
+    apply_cache_headers(
+        response,
+        etag=config._hexsha,
+        modified=config._modified,
+        if_none_match=None,
+        if_modified_since=None,
+    )
+    old = config_source.read_serialized(since)
+    new = config_source.read_serialized(config._hexsha)
+    if old is None or new is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Config revision {since} is not known, fetch the full config",
+        )
+    return Response(
+        content=config_patch(old, new),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
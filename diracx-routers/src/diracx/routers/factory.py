@@ -13,8 +13,8 @@ from importlib.metadata import EntryPoint, EntryPoints, entry_points
 from logging import Formatter, StreamHandler
 from typing import Any, TypeVar, cast
 
-from cachetools import TTLCache
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from cachetools import LRUCache, TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.dependencies.models import Dependant
 from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.exceptions import RequestValidationError
@@ -22,7 +22,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
 from fastapi.routing import APIRoute
 from packaging.version import InvalidVersion, parse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 from uvicorn.logging import AccessFormatter, DefaultFormatter
 
 from diracx.core.config import ConfigSource
@@ -34,9 +34,11 @@ from diracx.db.exceptions import DBUnavailableError
 from diracx.db.os.utils import BaseOSDB
 from diracx.db.sql.utils import BaseSQLDB
 from diracx.routers.access_policies import BaseAccessPolicy, check_permissions
+from diracx.tasks.plumbing.config_notifications import config_revision_listener
 
 from .fastapi_classes import DiracFastAPI, DiracxRouter
 from .otel import instrument_otel
+from .utils.compression import CompressionMiddleware
 from .utils.users import verify_dirac_access_token
 
 T = TypeVar("T")
@@ -147,6 +149,9 @@ def create_app_inner(
     # Override the ConfigSource.create by the actual reading of the config
     # Mark it as non-blocking so we can serve 503 errors while waiting for the config
     app.dependency_overrides[ConfigSource.create] = config_source.read_non_blocking
+    app.dependency_overrides[ConfigSource.instance] = partial(
+        lambda x: x, config_source
+    )
 
     all_access_policies_used = {}
 
@@ -342,6 +347,7 @@ def create_app_inner(
         "https://localhost:3000",
     ]
 
+    app.add_middleware(CompressionMiddleware)
     app.add_middleware(ClientMinVersionCheckMiddleware)
 
     app.add_middleware(
@@ -409,15 +415,27 @@ def create_app() -> DiracFastAPI:
         )
         all_access_policies[access_policy_name] = access_policy_classes
 
-    return create_app_inner(
+    config_source = ConfigSource.create()
+    app = create_app_inner(
         enabled_systems=enabled_systems,
         all_service_settings=all_service_settings,
         database_urls=BaseSQLDB.available_urls(),
         os_database_conn_kwargs=BaseOSDB.available_urls(),
-        config_source=ConfigSource.create(),
+        config_source=config_source,
         all_access_policies=all_access_policies,
     )
 
+    if factory_settings.config_change_notifications:
+        app.lifetime_functions.append(
+            partial(
+                config_revision_listener,
+                factory_settings.tasks_redis_url,
+                config_source,
+            )
+        )
+
+    return app
+
 
 def dirac_error_handler(request: Request, exc: DiracError) -> Response:
     status_code = getattr(exc, "http_status_code", HTTPStatus.BAD_REQUEST)
@@ -517,36 +535,75 @@ async def db_no_transaction(db: T2) -> AsyncGenerator[T2]:
     yield db
 
 
-class ClientMinVersionCheckMiddleware(BaseHTTPMiddleware):
-    """Custom FastAPI middleware to verify that the client has the required minimum version."""
+class ClientMinVersionCheckMiddleware:
+    """Custom ASGI middleware to verify that the client has the required minimum version.
 
-    def __init__(self, app: FastAPI):
-        super().__init__(app)
+    This is written as a pure ASGI middleware rather than with
+    ``BaseHTTPMiddleware`` as the latter runs the rest of the application in a
+    separate task and pipes the response through a memory stream, which is
+    costly on every request and breaks streaming responses.
+    Only the ``DiracX-Client-Version`` header is looked at and the outcome of
+    the check is cached for each distinct value of the header. Rejected
+    versions are logged at most once every ``REJECTION_LOG_INTERVAL`` seconds
+    for each value.
+    """
+
+    REJECTION_LOG_INTERVAL = 60
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.min_client_version = get_min_client_version()
         self.parsed_min_client_version = parse(self.min_client_version)
+        # Maps the raw header value to the error to return, if any
+        self._checked_versions: LRUCache[bytes, str | None] = LRUCache(maxsize=1024)
+        # Header values rejected within the last REJECTION_LOG_INTERVAL seconds
+        self._logged_rejections: TTLCache[bytes, bool] = TTLCache(
+            maxsize=1024, ttl=self.REJECTION_LOG_INTERVAL
+        )
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        client_version = request.headers.get("DiracX-Client-Version")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"diracx-client-version":
+                    # When comes from Swagger or Web, there is no client version header.
+                    # This is not managed here.
+                    if value and (detail := self.check_client_version(value)):
+                        if value not in self._logged_rejections:
+                            self._logged_rejections[value] = True
+                            logger.error(
+                                "Error checking client version %s",
+                                value.decode("latin-1"),
+                            )
+                        # Return a JSONResponse because the HTTPException
+                        # is not handled nicely in the middleware
+                        response = JSONResponse(
+                            status_code=HTTPStatus.BAD_REQUEST,
+                            content={"detail": detail},
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+
+        await self.app(scope, receive, send)
+
+    def check_client_version(self, raw_client_version: bytes) -> str | None:
+        """Return the error detail if the client version is not acceptable."""
+        try:
+            return self._checked_versions[raw_client_version]
+        except KeyError:
+            pass
 
+        client_version = raw_client_version.decode("latin-1")
+        detail = None
         try:
-            if client_version and self.is_version_too_old(client_version):
-                # When comes from Swagger or Web, there is no client version header.
-                # This is not managed here.
-
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Client version {client_version} is not compatible with the server. "
-                    f"Upgrade to a version >= {self.min_client_version}.",
+            if self.is_version_too_old(client_version):
+                detail = (
+                    f"Client version {client_version} is not compatible with the server. "
+                    f"Upgrade to a version >= {self.min_client_version}."
                 )
         except HTTPException as exc:
-            # Return a JSONResponse because the HTTPException
-            # is not handled nicely in the middleware
-            logger.error("Error checking client version %s", client_version)
-            return JSONResponse(
-                status_code=exc.status_code,
-                content={"detail": exc.detail},
-            )
-        # If the version is not given or cannot be parsed
+            detail = exc.detail
+        # If the version cannot be checked
         except Exception:
             logger.debug(
                 "Failed to check client version header: %s",
@@ -554,8 +611,8 @@ class ClientMinVersionCheckMiddleware(BaseHTTPMiddleware):
                 exc_info=True,
             )
 
-        response = await call_next(request)
-        return response
+        self._checked_versions[raw_client_version] = detail
+        return detail
 
     def is_version_too_old(self, client_version: str) -> bool | None:
         """Verify that client version is ge than min."""
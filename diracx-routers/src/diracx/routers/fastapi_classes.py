@@ -11,6 +11,8 @@ from starlette.routing import Route
 
 from diracx.tasks.plumbing.depends import auto_inject
 
+from .utils.responses import DiracJSONResponse
+
 T = TypeVar("T")
 
 
@@ -56,6 +58,9 @@ class DiracFastAPI(FastAPI):
             generate_unique_id_function=lambda route: f"{route.tags[0]}_{route.name}",
             title="Dirac",
             lifespan=lifespan,
+            # Only used for routes without a response model, the others are
+            # already serialized directly to JSON by pydantic
+            default_response_class=DiracJSONResponse,
             openapi_url="/api/openapi.json",
             docs_url="/api/docs",
             swagger_ui_oauth2_redirect_url="/api/docs/oauth2-redirect",
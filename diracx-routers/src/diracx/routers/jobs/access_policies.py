@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from enum import StrEnum, auto
 from http import HTTPStatus
 from typing import Annotated
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException
 
-from diracx.core.models import VectorSearchOperator
 from diracx.core.properties import GENERIC_PILOT, JOB_ADMINISTRATOR, NORMAL_USER
 from diracx.db.sql import JobDB, SandboxMetadataDB
 from diracx.routers.access_policies import BaseAccessPolicy
@@ -28,6 +28,45 @@ class ActionType(StrEnum):
     PILOT = auto()
 
 
+# The owner and VO of a job never change, so they can be shared between
+# requests. The TTL is kept short such that deleted jobs do not linger.
+# Keys are (JobDB instance, job_id) as several applications (e.g. in tests)
+# can live in the same process with different databases.
+_job_ownership_cache: TTLCache = TTLCache(maxsize=100_000, ttl=60)
+
+
+class JobOwnershipResolver:
+    """Resolve the (Owner, VO) of jobs at most once per resolver.
+
+    Jobs which are not in the resolver's own cache are looked up in a process
+    wide TTL cache and then fetched from the JobDB with a single query.
+    """
+
+    def __init__(self, job_db: JobDB):
+        self.job_db = job_db
+        self._owners: dict[int, tuple[str, str]] = {}
+
+    async def get_owners(self, job_ids: Iterable[int]) -> dict[int, tuple[str, str]]:
+        """Return the mapping job_id -> (Owner, VO) for the known jobs."""
+        job_ids = set(job_ids)
+        missing = set()
+        for job_id in job_ids - self._owners.keys():
+            if (owner := _job_ownership_cache.get((self.job_db, job_id))) is not None:
+                self._owners[job_id] = owner
+            else:
+                missing.add(job_id)
+
+        if missing:
+            found = await self.job_db.get_job_owners(missing)
+            for job_id, owner in found.items():
+                _job_ownership_cache[(self.job_db, job_id)] = owner
+            self._owners.update(found)
+
+        return {
+            job_id: self._owners[job_id] for job_id in job_ids if job_id in self._owners
+        }
+
+
 class WMSAccessPolicy(BaseAccessPolicy):
     """Rules.
 
@@ -46,6 +85,7 @@ class WMSAccessPolicy(BaseAccessPolicy):
         action: ActionType | None = None,
         job_db: JobDB | None = None,
         job_ids: list[int] | None = None,
+        job_ownership: JobOwnershipResolver | None = None,
     ):
         assert action, "action is a mandatory parameter"
         assert job_db, "job_db is a mandatory parameter"
@@ -89,25 +129,16 @@ class WMSAccessPolicy(BaseAccessPolicy):
         # Now we know we are either in READ/MODIFY for a NORMAL_USER
         # so just make sure that whatever job_id was given belongs
         # to the current user
-        job_owners = await job_db.summary(
-            ["Owner", "VO"],
-            [
-                {
-                    "parameter": "JobID",
-                    "operator": VectorSearchOperator.IN,
-                    "values": job_ids,
-                }
-            ],
-        )
-
-        expected_owner = {
-            "Owner": user_info.preferred_username,
-            "VO": user_info.vo,
-            "count": len(set(job_ids)),
-        }
+        if job_ownership is None:
+            job_ownership = JobOwnershipResolver(job_db)
+        job_owners = await job_ownership.get_owners(job_ids)
+
+        expected_owner = (user_info.preferred_username, user_info.vo)
         # All the jobs belong to the user doing the query
         # and all of them are present
-        if job_owners == [expected_owner]:
+        if len(job_owners) == len(set(job_ids)) and all(
+            owner == expected_owner for owner in job_owners.values()
+        ):
             return
 
         raise HTTPException(HTTPStatus.FORBIDDEN)
@@ -156,22 +187,25 @@ class SandboxAccessPolicy(BaseAccessPolicy):
                 )
             if se_name is None:
                 raise NotImplementedError("se_name is None. This shouldn't happen")
-            for pfn in pfns:
+            unique_pfns = set(pfns)
+            for pfn in unique_pfns:
                 if not pfn.startswith(required_prefix):
                     raise HTTPException(
                         status_code=HTTPStatus.FORBIDDEN,
                         detail=f"Invalid PFN. PFN must start with {required_prefix}",
                     )
-                # Checking if the user owns the sandbox
-                owner_id = await sandbox_metadata_db.get_owner_id(user_info)
-                sandbox_owner_id = await sandbox_metadata_db.get_sandbox_owner_id(
-                    pfn, se_name
+            # Checking if the user owns all the sandboxes
+            owner_id = await sandbox_metadata_db.get_owner_id(user_info)
+            sandbox_owner_ids = await sandbox_metadata_db.get_sandbox_owner_ids(
+                unique_pfns, se_name
+            )
+            if not owner_id or any(
+                sandbox_owner_ids.get(pfn) != owner_id for pfn in unique_pfns
+            ):
+                raise HTTPException(
+                    status_code=HTTPStatus.FORBIDDEN,
+                    detail=f"{user_info.preferred_username} is not the owner of the sandbox",
                 )
-                if not owner_id or owner_id != sandbox_owner_id:
-                    raise HTTPException(
-                        status_code=HTTPStatus.FORBIDDEN,
-                        detail=f"{user_info.preferred_username} is not the owner of the sandbox",
-                    )
 
 
 CheckSandboxPolicyCallable = Annotated[Callable, Depends(SandboxAccessPolicy.check)]
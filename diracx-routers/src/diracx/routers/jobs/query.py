@@ -3,7 +3,7 @@ from __future__ import annotations
 from http import HTTPStatus
 from typing import Annotated, Any
 
-from fastapi import Body, Depends, Query, Response
+from fastapi import Body, Depends, Query, Request, Response
 
 from diracx.core.models import (
     SearchParams,
@@ -19,6 +19,7 @@ from diracx.routers.dependencies import Config
 
 from ..fastapi_classes import DiracxRouter
 from ..utils import AuthorizedUserInfo, verify_dirac_access_token
+from ..utils.responses import list_response
 from .access_policies import ActionType, CheckWMSPolicyCallable
 
 router = DiracxRouter()
@@ -131,7 +132,9 @@ EXAMPLE_SEARCH_RESPONSES: dict[int | str, dict[str, Any]] = {
 }
 
 
-@router.post("/search", responses=EXAMPLE_SEARCH_RESPONSES)
+@router.post(
+    "/search", responses=EXAMPLE_SEARCH_RESPONSES, response_model=list[dict[str, Any]]
+)
 async def search(
     config: Config,
     job_db: JobDB,
@@ -140,13 +143,14 @@ async def search(
     pilot_db: PilotAgentsDB,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckWMSPolicyCallable,
+    request: Request,
     response: Response,
     page: Annotated[int, Query(ge=1)] = 1,
     per_page: Annotated[int, Query(ge=1, le=MAX_PER_PAGE)] = 100,
     body: Annotated[
         SearchParams | None, Body(openapi_examples=EXAMPLE_SEARCHES)
     ] = None,
-) -> list[dict[str, Any]]:
+) -> Response:
     """Create a search query to the job database.
 
     This search can be based on different parameters, such as jobID, status, owner, etc.
@@ -200,7 +204,7 @@ async def search(
         last_idx = min(first_idx + len(jobs), total) - 1 if total > 0 else 0
         response.headers["Content-Range"] = f"jobs {first_idx}-{last_idx}/{total}"
         response.status_code = HTTPStatus.PARTIAL_CONTENT
-    return jobs
+    return list_response(request, response, jobs)
 
 
 EXAMPLE_SUMMARY = {
@@ -311,6 +315,8 @@ async def summary(
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     body: SummaryParams,
     check_permissions: CheckWMSPolicyCallable,
+    request: Request,
+    response: Response,
 ):
     """Group jobs by a specific list of parameters.
 
@@ -328,10 +334,11 @@ async def summary(
     if JOB_ADMINISTRATOR in user_info.properties:
         preferred_username = None
 
-    return await summary_bl(
+    result = await summary_bl(
         config=config,
         job_db=job_db,
         preferred_username=preferred_username,
         vo=user_info.vo,
         body=body,
     )
+    return list_response(request, response, result)
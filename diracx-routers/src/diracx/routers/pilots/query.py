@@ -3,7 +3,7 @@ from __future__ import annotations
 from http import HTTPStatus
 from typing import Annotated, Any
 
-from fastapi import Body, Depends, Query, Response
+from fastapi import Body, Depends, Query, Request, Response
 
 from diracx.core.models.search import SearchParams, SummaryParams
 from diracx.core.properties import SERVICE_ADMINISTRATOR
@@ -13,6 +13,7 @@ from diracx.logic.pilots import search as search_bl
 from diracx.logic.pilots import summary as summary_bl
 
 from ..fastapi_classes import DiracxRouter
+from ..utils.responses import list_response
 from ..utils.users import AuthorizedUserInfo, verify_dirac_access_token
 from .access_policies import (
     ActionType,
@@ -94,10 +95,13 @@ EXAMPLE_RESPONSES: dict[int | str, dict[str, Any]] = {
 }
 
 
-@router.post("/search", responses=EXAMPLE_RESPONSES)
+@router.post(
+    "/search", responses=EXAMPLE_RESPONSES, response_model=list[dict[str, Any]]
+)
 async def search(
     pilot_db: PilotAgentsDB,
     check_permissions: CheckPilotManagementPolicyCallable,
+    request: Request,
     response: Response,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     page: Annotated[int, Query(ge=1)] = 1,
@@ -105,7 +109,7 @@ async def search(
     body: Annotated[
         SearchParams | None, Body(openapi_examples=EXAMPLE_SEARCHES)  # type: ignore
     ] = None,
-) -> list[dict[str, Any]]:
+) -> Response:
     """Retrieve information about pilots.
 
     Normal users see only their own VO's pilots. Service administrators see
@@ -135,7 +139,7 @@ async def search(
         last_idx = min(first_idx + len(pilots), total) - 1 if total > 0 else 0
         response.headers["Content-Range"] = f"pilots {first_idx}-{last_idx}/{total}"
         response.status_code = HTTPStatus.PARTIAL_CONTENT
-    return pilots
+    return list_response(request, response, pilots)
 
 
 EXAMPLE_SUMMARY = {
@@ -223,6 +227,8 @@ async def summary(
     body: Annotated[
         SummaryParams, Body(openapi_examples=EXAMPLE_SUMMARY)  # type: ignore
     ],
+    request: Request,
+    response: Response,
 ):
     """Aggregate pilot counts suitable for plotting.
 
@@ -231,8 +237,9 @@ async def summary(
     """
     await check_permissions(action=ActionType.READ_PILOT_METADATA)
 
-    return await summary_bl(
+    result = await summary_bl(
         pilot_db=pilot_db,
         body=body,
         vo_constraint=_vo_constraint_for(user_info),
     )
+    return list_response(request, response, result)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Annotated, Any
+from typing import Annotated
 
 from fastapi import Depends, Header, Response
 
@@ -11,11 +11,11 @@ from diracx.core.models.rss import (
     SiteStatus,
     StorageElementStatus,
 )
-from diracx.core.sources import Snapshot
 from diracx.logic.rss.source import (
     ComputeElementStatusSource,
     FTSStatusSource,
     SiteStatusSource,
+    StatusSnapshot,
     StorageElementStatusSource,
 )
 from diracx.routers.utils.users import AuthorizedUserInfo, verify_dirac_access_token
@@ -30,81 +30,87 @@ router = DiracxRouter()
 
 
 def _vo_view(
-    snapshot: Snapshot,
+    snapshot: StatusSnapshot,
     vo: str,
     response: Response,
     if_none_match: str | None,
     if_modified_since: str | None,
-) -> dict[str, Any]:
+) -> Response:
     """Apply cache headers and return the caller's VO view of a snapshot.
 
-    The snapshot covers all VOs so it can be cached once; the response is the
-    "all" entries overlaid with the caller's VO-specific entries. The ETag is
+    The snapshot covers all VOs so it can be cached once, along with the
+    pre-serialized view of each VO: the "all" entries overlaid with the VO's
+    own entries. The ETag is derived from the content of the view and
     suffixed with the VO (and Vary: Authorization set) since the same URL
     serves different content per VO.
     """
+    view = snapshot.view(vo)
     apply_cache_headers(
         response,
-        etag=f"{snapshot.hexsha}-{vo}",
-        modified=snapshot.modified,
+        etag=f"{view.digest}-{vo}",
+        modified=view.modified,
         if_none_match=if_none_match,
         if_modified_since=if_modified_since,
         vary="Authorization",
     )
-    return {**snapshot.data.get("all", {}), **snapshot.data.get(vo, {})}
+    return Response(
+        content=view.body,
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
 
 
-@router.get("/storage")
+@router.get("/storage", response_model=dict[str, StorageElementStatus])
 async def get_storage_status(
     response: Response,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckRSSPolicyCallable,
-    snapshot: Annotated[Snapshot, Depends(StorageElementStatusSource.create)],
+    snapshot: Annotated[StatusSnapshot, Depends(StorageElementStatusSource.create)],
     if_none_match: Annotated[str | None, Header()] = None,
     if_modified_since: Annotated[str | None, Header()] = None,
-) -> dict[str, StorageElementStatus]:
+) -> Response:
     """Get the latest status of storage elements, scoped to the caller's VO."""
     await check_permissions()
     return _vo_view(snapshot, user_info.vo, response, if_none_match, if_modified_since)
 
 
-@router.get("/compute")
+@router.get("/compute", response_model=dict[str, ComputeElementStatus])
 async def get_compute_status(
     response: Response,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckRSSPolicyCallable,
-    snapshot: Annotated[Snapshot, Depends(ComputeElementStatusSource.create)],
+    snapshot: Annotated[StatusSnapshot, Depends(ComputeElementStatusSource.create)],
     if_none_match: Annotated[str | None, Header()] = None,
     if_modified_since: Annotated[str | None, Header()] = None,
-) -> dict[str, ComputeElementStatus]:
+) -> Response:
     """Get the latest status of compute elements, scoped to the caller's VO."""
     await check_permissions()
     return _vo_view(snapshot, user_info.vo, response, if_none_match, if_modified_since)
 
 
-@router.get("/site")
+@router.get("/site", response_model=dict[str, SiteStatus])
 async def get_site_status(
     response: Response,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckRSSPolicyCallable,
-    snapshot: Annotated[Snapshot, Depends(SiteStatusSource.create)],
+    snapshot: Annotated[StatusSnapshot, Depends(SiteStatusSource.create)],
     if_none_match: Annotated[str | None, Header()] = None,
     if_modified_since: Annotated[str | None, Header()] = None,
-) -> dict[str, SiteStatus]:
+) -> Response:
     """Get the latest status of sites, scoped to the caller's VO."""
     await check_permissions()
     return _vo_view(snapshot, user_info.vo, response, if_none_match, if_modified_since)
 
 
-@router.get("/fts")
+@router.get("/fts", response_model=dict[str, FTSStatus])
 async def get_fts_status(
     response: Response,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckRSSPolicyCallable,
-    snapshot: Annotated[Snapshot, Depends(FTSStatusSource.create)],
+    snapshot: Annotated[StatusSnapshot, Depends(FTSStatusSource.create)],
     if_none_match: Annotated[str | None, Header()] = None,
     if_modified_since: Annotated[str | None, Header()] = None,
-) -> dict[str, FTSStatus]:
+) -> Response:
     """Get the latest status of FTS servers, scoped to the caller's VO."""
     await check_permissions()
     return _vo_view(snapshot, user_info.vo, response, if_none_match, if_modified_since)
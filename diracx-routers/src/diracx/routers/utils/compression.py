@@ -0,0 +1,187 @@
+"""Response compression negotiated with the Accept-Encoding request header."""
+
+from __future__ import annotations
+
+__all__ = [
+    "SUPPORTED_ENCODINGS",
+    "CompressionMiddleware",
+    "compress",
+    "negotiate_encoding",
+]
+
+import gzip
+import zlib
+from typing import Any
+
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# In order of preference when the client accepts several of them
+SUPPORTED_ENCODINGS = ("zstd", "gzip")
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Return the preferred supported encoding accepted by the client, if any.
+
+    Encodings explicitly refused with ``q=0`` are ignored, also when ``*``
+    accepts any other encoding. Other quality values are not taken into
+    account.
+    """
+    if not accept_encoding:
+        return None
+    accepted = set()
+    refused = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        try:
+            is_refused = bool(params) and float(params.strip().removeprefix("q=")) == 0
+        except ValueError:
+            is_refused = False
+        (refused if is_refused else accepted).add(coding)
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in refused:
+            continue
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body with one of the SUPPORTED_ENCODINGS."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+def _compressobj(encoding: str) -> tuple[Any, int]:
+    """Return a streaming compressor for ``encoding``.
+
+    Also returns the flush mode which ends the output of each chunk of a
+    streaming response so that the client can decode it right away.
+    """
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        return compressor, zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor, zlib.Z_SYNC_FLUSH
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+class _CompressionResponder:
+    """Wrap ``send`` to compress the body of a single response.
+
+    The response start is held back until the first body message shows
+    whether the response is worth compressing. With ``encoding`` set to None
+    the body is left as it is but ``Vary`` is still set, so that caches don't
+    serve it to clients accepting compressed responses.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoding: str | None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.send: Send
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.compressor: Any = None
+        self.flush_mode = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").partition(";")[0]
+            if (
+                "content-encoding" in headers
+                # Byte ranges refer to the uncompressed body, unlike the
+                # ranges of the paginated search results
+                or headers.get("content-range", "").lower().startswith("bytes")
+                or content_type.strip().lower() == "text/event-stream"
+            ):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            # e.g. pathsend or trailers, which are sent as they are
+            await self._send_start()
+            self.passthrough = True
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None or (
+                len(body) < self.minimum_size and not more_body
+            ):
+                await self._send_start()
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.compressor, self.flush_mode = _compressobj(self.encoding)
+            body = self._compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            if more_body or self.start_message.get("trailers", False):
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self._send_start()
+        else:
+            body = self._compress(body, more_body)
+        await self.send({**message, "body": body})
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return self.compressor.compress(body) + self.compressor.flush(
+                self.flush_mode
+            )
+        return self.compressor.compress(body) + self.compressor.flush()
+
+    async def _send_start(self) -> None:
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
+
+
+class CompressionMiddleware:
+    """Compress responses with zstd or gzip depending on Accept-Encoding.
+
+    Like Starlette's GZipMiddleware, bodies smaller than ``minimum_size``,
+    server-sent events, byte range responses and responses which already have a
+    Content-Encoding (e.g. the pre-compressed config) are sent as they are.
+    The responses are compressed by a plain wrapper of ``send`` rather than
+    Starlette's responders, whose interface changes between releases.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        responder = _CompressionResponder(self.app, self.minimum_size, encoding)
+        await responder(scope, receive, send)
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timezone
 from http import HTTPStatus
 
 import pytest
+import zstandard
 from fastapi.testclient import TestClient
 from freezegun import freeze_time
 
 from diracx.core.models import JobStatus
 from diracx.routers.jobs import EXAMPLE_SUMMARY
+from diracx.routers.utils.responses import COLUMNAR_JSON_MEDIA_TYPE
 
 from .conftest import TEST_JDL, TEST_PARAMETRIC_JDL
 
@@ -448,6 +451,72 @@ def test_insert_and_search_by_datetime(normal_user_client):
     assert len(r.json()) == 1
 
 
+def decode_columnar(data):
+    return [dict(zip(data["columns"], row)) for row in data["rows"]]
+
+
+def test_search_columnar(normal_user_client):
+    """Test that search and summary can return column oriented payloads."""
+    r = normal_user_client.post("/api/jobs/jdl", json=[TEST_JDL] * 3)
+    assert r.status_code == 201, r.json()
+
+    columnar_headers = {"Accept": f"{COLUMNAR_JSON_MEDIA_TYPE}, application/json"}
+    search_body = {"parameters": ["JobID", "Status", "SubmissionTime"]}
+
+    r = normal_user_client.post("/api/jobs/search", json=search_body)
+    assert r.status_code == 200, r.json()
+    assert r.headers["Content-Type"] == "application/json"
+    listed_jobs = r.json()
+
+    r = normal_user_client.post(
+        "/api/jobs/search", json=search_body, headers=columnar_headers
+    )
+    assert r.status_code == 200, r.json()
+    assert r.headers["Content-Type"] == COLUMNAR_JSON_MEDIA_TYPE
+    data = r.json()
+    assert set(data["columns"]) == {"JobID", "Status", "SubmissionTime"}
+    assert len(data["rows"]) == 3
+    assert decode_columnar(data) == listed_jobs
+
+    # Pagination headers and status codes are kept
+    r = normal_user_client.post(
+        "/api/jobs/search",
+        json=search_body,
+        params={"page": 1, "per_page": 2},
+        headers=columnar_headers,
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 0-1/3"
+    assert decode_columnar(r.json()) == listed_jobs[:2]
+
+    r = normal_user_client.post(
+        "/api/jobs/summary", json={"grouping": ["Status"]}, headers=columnar_headers
+    )
+    assert r.status_code == 200, r.json()
+    assert decode_columnar(r.json()) == [{"Status": "Received", "count": 3}]
+
+
+def test_search_pagination_is_compressed(normal_user_client):
+    """Partial search results are compressed, unlike byte range responses."""
+    r = normal_user_client.post("/api/jobs/jdl", json=[TEST_JDL] * 20)
+    assert r.status_code == 201, r.json()
+
+    with normal_user_client.stream(
+        "POST",
+        "/api/jobs/search",
+        params={"page": 1, "per_page": 15},
+        headers={"Accept-Encoding": "zstd"},
+    ) as r:
+        assert r.status_code == 206
+        assert r.headers["Content-Range"] == "jobs 0-14/20"
+        assert r.headers["Content-Encoding"] == "zstd"
+        raw = b"".join(r.iter_raw())
+    listed_jobs = json.loads(
+        zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    )
+    assert len(listed_jobs) == 15
+
+
 def test_search_distinct(normal_user_client):
     """Test that the distinct parameter works as expected."""
     job_definitions = [TEST_JDL, TEST_JDL, TEST_JDL]
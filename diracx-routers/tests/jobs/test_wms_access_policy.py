@@ -12,6 +12,10 @@ from diracx.routers.jobs import (
     SandboxAccessPolicy,
     WMSAccessPolicy,
 )
+from diracx.routers.jobs.access_policies import (
+    JobOwnershipResolver,
+    _job_ownership_cache,
+)
 from diracx.routers.utils import AuthorizedUserInfo
 
 base_payload = {
@@ -25,12 +29,12 @@ base_payload = {
 
 
 class FakeJobDB:
-    async def summary(self, *args): ...
+    async def get_job_owners(self, *args): ...
 
 
 class FakeSBMetadataDB:
     async def get_owner_id(self, *args): ...
-    async def get_sandbox_owner_id(self, *args): ...
+    async def get_sandbox_owner_ids(self, *args): ...
 
 
 @pytest.fixture
@@ -38,6 +42,13 @@ def job_db():
     yield FakeJobDB()
 
 
+@pytest.fixture(autouse=True)
+def clear_job_ownership_cache():
+    _job_ownership_cache.clear()
+    yield
+    _job_ownership_cache.clear()
+
+
 @pytest.fixture
 def sandbox_metadata_db():
     yield FakeSBMetadataDB()
@@ -158,10 +169,11 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
             )
 
         # Standard case, querying for one own jobs
-        async def summary_matching(*args):
-            return [{"Owner": "preferred_username", "VO": "lhcb", "count": 3}]
+        async def owners_matching(job_ids):
+            return {job_id: ("preferred_username", "lhcb") for job_id in job_ids}
 
-        monkeypatch.setattr(job_db, "summary", summary_matching)
+        _job_ownership_cache.clear()
+        monkeypatch.setattr(job_db, "get_job_owners", owners_matching)
 
         await WMSAccessPolicy.policy(
             WMS_POLICY_NAME,
@@ -181,10 +193,11 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
         )
 
         # Jobs belong to somebody else
-        async def summary_other_owner(*args):
-            return [{"Owner": "other_owner", "VO": "lhcb", "count": 3}]
+        async def owners_other_owner(job_ids):
+            return {job_id: ("other_owner", "lhcb") for job_id in job_ids}
 
-        monkeypatch.setattr(job_db, "summary", summary_other_owner)
+        _job_ownership_cache.clear()
+        monkeypatch.setattr(job_db, "get_job_owners", owners_other_owner)
         with pytest.raises(HTTPException, match=f"{HTTPStatus.FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -195,10 +208,11 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
             )
 
         # Jobs belong to somebody else
-        async def summary_other_vo(*args):
-            return [{"Owner": "preferred_username", "VO": "gridpp", "count": 3}]
+        async def owners_other_vo(job_ids):
+            return {job_id: ("preferred_username", "gridpp") for job_id in job_ids}
 
-        monkeypatch.setattr(job_db, "summary", summary_other_vo)
+        _job_ownership_cache.clear()
+        monkeypatch.setattr(job_db, "get_job_owners", owners_other_vo)
         with pytest.raises(HTTPException, match=f"{HTTPStatus.FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -209,10 +223,13 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
             )
 
         # Wrong job count
-        async def summary_other_vo(*args):
-            return [{"Owner": "preferred_username", "VO": "lhcb", "count": 2}]
+        async def owners_missing_job(job_ids):
+            return {
+                job_id: ("preferred_username", "lhcb") for job_id in sorted(job_ids)[1:]
+            }
 
-        monkeypatch.setattr(job_db, "summary", summary_other_vo)
+        _job_ownership_cache.clear()
+        monkeypatch.setattr(job_db, "get_job_owners", owners_missing_job)
         with pytest.raises(HTTPException, match=f"{HTTPStatus.FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -314,12 +331,14 @@ async def test_sandbox_access_policy_read(sandbox_metadata_db, monkeypatch):
     async def get_owner_id(*args):
         return 1
 
-    async def get_sandbox_owner_id(*args):
-        return 1
+    async def get_sandbox_owner_ids(pfns, se_name):
+        if se_name != SE_NAME:
+            return {}
+        return {pfn: 1 for pfn in pfns}
 
     monkeypatch.setattr(sandbox_metadata_db, "get_owner_id", get_owner_id)
     monkeypatch.setattr(
-        sandbox_metadata_db, "get_sandbox_owner_id", get_sandbox_owner_id
+        sandbox_metadata_db, "get_sandbox_owner_ids", get_sandbox_owner_ids
     )
 
     await SandboxAccessPolicy.policy(
@@ -359,3 +378,54 @@ async def test_sandbox_access_policy_read(sandbox_metadata_db, monkeypatch):
             required_prefix=SANDBOX_PREFIX,
             se_name="OTHER_SE_NAME",
         )
+
+
+async def test_job_ownership_resolver_caching(job_db, monkeypatch):
+    calls = []
+
+    async def get_job_owners(job_ids):
+        calls.append(set(job_ids))
+        return {
+            job_id: ("preferred_username", "lhcb") for job_id in job_ids if job_id != 4
+        }
+
+    monkeypatch.setattr(job_db, "get_job_owners", get_job_owners)
+
+    resolver = JobOwnershipResolver(job_db)
+    assert await resolver.get_owners([1, 2]) == {
+        1: ("preferred_username", "lhcb"),
+        2: ("preferred_username", "lhcb"),
+    }
+    # Jobs already resolved by this resolver are not fetched again
+    assert await resolver.get_owners([1, 2, 3, 4]) == {
+        1: ("preferred_username", "lhcb"),
+        2: ("preferred_username", "lhcb"),
+        3: ("preferred_username", "lhcb"),
+    }
+    assert calls == [{1, 2}, {3, 4}]
+
+    # A new resolver is served from the process wide cache, except for
+    # the unknown job which is looked up again
+    resolver = JobOwnershipResolver(job_db)
+    assert len(await resolver.get_owners([1, 2, 3, 4])) == 3
+    assert calls == [{1, 2}, {3, 4}, {4}]
+
+    # Several jobs belonging to the user are granted, a missing one is not
+    normal_user = AuthorizedUserInfo(properties=[NORMAL_USER], **base_payload)
+    await WMSAccessPolicy.policy(
+        WMS_POLICY_NAME,
+        normal_user,
+        action=ActionType.READ,
+        job_db=job_db,
+        job_ids=[1, 2, 3],
+        job_ownership=resolver,
+    )
+    with pytest.raises(HTTPException, match=f"{HTTPStatus.FORBIDDEN}"):
+        await WMSAccessPolicy.policy(
+            WMS_POLICY_NAME,
+            normal_user,
+            action=ActionType.READ,
+            job_db=job_db,
+            job_ids=[1, 4],
+            job_ownership=resolver,
+        )
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import gzip
+import json
+from datetime import datetime, timezone
 from http import HTTPStatus
 
 import pytest
+import zstandard
+
+from diracx.core.config import ConfigSource, SerializedConfig
+from diracx.core.utils import apply_json_patch
 
 pytestmark = pytest.mark.enabled_dependencies(
     ["AuthSettings", "ConfigSource", "OpenAccessPolicy"]
@@ -115,3 +122,73 @@ def test_get_config(normal_user_client):
     )
     assert r.status_code == HTTPStatus.NOT_MODIFIED, r.text
     assert not r.text
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, content_encoding",
+    [
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("zstd;q=0, gzip", "gzip"),
+    ],
+)
+def test_get_config_compressed(normal_user_client, accept_encoding, content_encoding):
+    r = normal_user_client.get("/api/config/", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == HTTPStatus.OK, r.text
+    expected = r.json()
+
+    for _ in range(2):
+        r = normal_user_client.get(
+            "/api/config/", headers={"Accept-Encoding": accept_encoding}
+        )
+        assert r.status_code == HTTPStatus.OK, r.text
+        assert r.headers.get("Content-Encoding") == content_encoding
+        assert "Accept-Encoding" in r.headers["Vary"]
+        if content_encoding == "zstd":
+            # The test client doesn't decode zstd itself
+            assert json.loads(zstandard.decompress(r.content)) == expected
+        else:
+            assert r.json() == expected
+
+
+def test_get_config_diff(normal_user_client):
+    r = normal_user_client.get("/api/config/")
+    assert r.status_code == HTTPStatus.OK, r.text
+    latest_config = r.json()
+    etag = r.headers["ETag"]
+
+    # No change since the latest revision
+    r = normal_user_client.get("/api/config/diff", params={"since": etag})
+    assert r.status_code == HTTPStatus.OK, r.text
+    assert r.json() == []
+    assert r.headers["ETag"] == etag
+
+    r = normal_user_client.get("/api/config/diff", params={"since": "unknown"})
+    assert r.status_code == HTTPStatus.NOT_FOUND, r.text
+
+    # Pretend that an older revision was loaded before the latest one
+    config_source = normal_user_client.app.dependency_overrides[ConfigSource.instance]()
+    old_doc = json.loads(json.dumps(latest_config))
+    old_doc["DIRAC"]["NoSetup"] = not old_doc["DIRAC"]["NoSetup"]
+    del old_doc["Registry"]["lhcb"]["Users"]["c935e5ed-2g0e-5ff9-9eg6-d1bf66e57152"]
+    old_json = json.dumps(old_doc).encode()
+    old = SerializedConfig(
+        hexsha="0" * 40,
+        modified=datetime(2000, 1, 1, tzinfo=timezone.utc),
+        json=old_json,
+        gzip=gzip.compress(old_json),
+    )
+    config_source._serialized_cache[old.hexsha] = old
+    try:
+        r = normal_user_client.get("/api/config/diff", params={"since": old.hexsha})
+    finally:
+        del config_source._serialized_cache[old.hexsha]
+    assert r.status_code == HTTPStatus.OK, r.text
+    assert r.headers["ETag"] == etag
+    patch = r.json()
+    assert {op["path"] for op in patch} == {
+        "/DIRAC/NoSetup",
+        "/Registry/lhcb/Users/c935e5ed-2g0e-5ff9-9eg6-d1bf66e57152",
+    }
+    assert apply_json_patch(json.loads(old.json), patch) == latest_config
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import time
+from http import HTTPStatus
+
+import httpx2
+import pytest
+import zstandard
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from packaging.version import parse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from diracx.routers.factory import ClientMinVersionCheckMiddleware
+from diracx.routers.utils.compression import (
+    CompressionMiddleware,
+    compress,
+    negotiate_encoding,
+)
+
+logger = logging.getLogger(__name__)
+
+LARGE_CONTENT = [{"JobID": i, "Status": "Running"} for i in range(1000)]
+
+
+class LegacyClientMinVersionCheckMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware based implementation, used as a reference."""
+
+    def __init__(self, app, min_client_version: str):
+        super().__init__(app)
+        self.min_client_version = min_client_version
+        self.parsed_min_client_version = parse(min_client_version)
+
+    async def dispatch(self, request: Request, call_next):
+        client_version = request.headers.get("DiracX-Client-Version")
+        if client_version and parse(client_version) < self.parsed_min_client_version:
+            return JSONResponse(
+                status_code=HTTPStatus.BAD_REQUEST,
+                content={"detail": "Client version too old"},
+            )
+        return await call_next(request)
+
+
+def make_app(middleware=None, **kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i}\n"
+
+        return StreamingResponse(chunks())
+
+    @app.get("/large")
+    async def large():
+        return LARGE_CONTENT
+
+    @app.get("/large-stream")
+    async def large_stream():
+        async def chunks():
+            for i in range(100):
+                yield f"chunk{i}\n" * 100
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/events")
+    async def events():
+        async def chunks():
+            for i in range(100):
+                yield f"data: {i}\n\n" * 100
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/precompressed")
+    async def precompressed():
+        return Response(
+            content=gzip.compress(b"precompressed"),
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    if middleware is not None:
+        app.add_middleware(middleware, **kwargs)
+    return app
+
+
+@pytest.fixture
+def min_version_app():
+    app = make_app(ClientMinVersionCheckMiddleware)
+    app.build_middleware_stack()
+    return app
+
+
+async def test_client_version_check(min_version_app):
+    transport = httpx2.ASGITransport(app=min_version_app)
+    async with httpx2.AsyncClient(transport=transport, base_url="http://test") as c:
+        # No header at all
+        r = await c.get("/ping")
+        assert r.status_code == HTTPStatus.OK, r.text
+
+        # Recent enough client
+        r = await c.get("/ping", headers={"DiracX-Client-Version": "999.0.0"})
+        assert r.status_code == HTTPStatus.OK, r.text
+
+        # Too old, twice to exercise the cache
+        for _ in range(2):
+            r = await c.get("/ping", headers={"DiracX-Client-Version": "0.0.0a0"})
+            assert r.status_code == HTTPStatus.BAD_REQUEST, r.text
+            assert "Upgrade to a version" in r.json()["detail"]
+
+        r = await c.get("/ping", headers={"DiracX-Client-Version": "invalid.version"})
+        assert r.status_code == HTTPStatus.BAD_REQUEST, r.text
+        assert "invalid.version" in r.json()["detail"]
+
+        # Streaming responses go through untouched
+        r = await c.get("/stream", headers={"DiracX-Client-Version": "999.0.0"})
+        assert r.status_code == HTTPStatus.OK, r.text
+        assert r.text == "chunk0\nchunk1\nchunk2\n"
+
+
+def test_client_version_cached():
+    middleware = ClientMinVersionCheckMiddleware(make_app())
+    assert middleware.check_client_version(b"999.0.0") is None
+    assert middleware.check_client_version(b"invalid.version")
+    assert set(middleware._checked_versions) == {b"999.0.0", b"invalid.version"}
+
+
+async def test_client_version_rejections_logged_once(min_version_app, caplog):
+    transport = httpx2.ASGITransport(app=min_version_app)
+    async with httpx2.AsyncClient(transport=transport, base_url="http://test") as c:
+        with caplog.at_level(logging.ERROR, logger="diracx.routers.factory"):
+            for version in ["0.0.0a0", "0.0.0a0", "0.0.0a1"]:
+                r = await c.get("/ping", headers={"DiracX-Client-Version": version})
+                assert r.status_code == HTTPStatus.BAD_REQUEST
+    assert [r.getMessage() for r in caplog.records] == [
+        "Error checking client version 0.0.0a0",
+        "Error checking client version 0.0.0a1",
+    ]
+
+
+async def _requests_per_second(app: FastAPI, n_requests: int) -> float:
+    transport = httpx2.ASGITransport(app=app)
+    headers = {"DiracX-Client-Version": "999.0.0"}
+    async with httpx2.AsyncClient(transport=transport, base_url="http://test") as c:
+        # Warm up
+        for _ in range(10):
+            await c.get("/ping", headers=headers)
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            r = await c.get("/ping", headers=headers)
+            assert r.status_code == HTTPStatus.OK
+        return n_requests / (time.perf_counter() - start)
+
+
+@pytest.mark.benchmark
+async def test_middleware_benchmark(monkeypatch):
+    """Compare requests/s on a trivial route for the middleware implementations.
+
+    The pure ASGI middleware only parses each distinct header value once.
+    """
+    n_requests = 500
+    parsed = []
+
+    def counting_parse(version):
+        parsed.append(version)
+        return parse(version)
+
+    results = {
+        "no middleware": await _requests_per_second(make_app(), n_requests),
+        "BaseHTTPMiddleware": await _requests_per_second(
+            make_app(
+                LegacyClientMinVersionCheckMiddleware,
+                min_client_version=ClientMinVersionCheckMiddleware(
+                    make_app()
+                ).min_client_version,
+            ),
+            n_requests,
+        ),
+    }
+    with monkeypatch.context() as m:
+        m.setattr("diracx.routers.factory.parse", counting_parse)
+        results["pure ASGI"] = await _requests_per_second(
+            make_app(ClientMinVersionCheckMiddleware), n_requests
+        )
+    for name, rate in results.items():
+        logger.info("%-20s %8.0f requests/s", name, rate)
+    # The minimum version, then the header of the first request
+    assert parsed == [parsed[0], "999.0.0"]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("br", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("ZSTD", "zstd"),
+        ("zstd;q=0, gzip;q=0.5", "gzip"),
+        ("zstd;q=0.0, gzip;q=0", None),
+        ("*", "zstd"),
+        ("zstd;q=0, *", "gzip"),
+        ("zstd;q=0, gzip;q=0, *", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_compress_unsupported_encoding():
+    assert gzip.decompress(compress(b"data", "gzip")) == b"data"
+    with pytest.raises(ValueError, match="Unsupported encoding 'br'"):
+        compress(b"data", "br")
+
+
+def zstd_decompress(data: bytes) -> bytes:
+    # Streamed frames don't have the content size in their header
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+async def test_compression_middleware():
+    app = make_app(CompressionMiddleware)
+    transport = httpx2.ASGITransport(app=app)
+    async with httpx2.AsyncClient(transport=transport, base_url="http://test") as c:
+        # Small responses are not compressed
+        r = await c.get("/ping", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in r.headers
+        assert r.json() == {"pong": True}
+
+        r = await c.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in r.headers
+        assert r.json() == LARGE_CONTENT
+        size = len(r.content)
+
+        r = await c.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.headers["Vary"] == "Accept-Encoding"
+        assert int(r.headers["Content-Length"]) < size
+        assert r.json() == LARGE_CONTENT
+
+        # httpx2 only decodes zstd if backports.zstd is installed
+        r = await c.get("/large", headers={"Accept-Encoding": "gzip, zstd"})
+        assert r.headers["Content-Encoding"] == "zstd"
+        assert int(r.headers["Content-Length"]) < size
+        assert json.loads(zstd_decompress(r.content)) == LARGE_CONTENT
+
+        # Streaming responses are compressed chunk by chunk
+        expected = "".join(f"chunk{i}\n" * 100 for i in range(100)).encode()
+        async with c.stream(
+            "GET", "/large-stream", headers={"Accept-Encoding": "zstd"}
+        ) as r:
+            assert r.headers["Content-Encoding"] == "zstd"
+            assert "Content-Length" not in r.headers
+            raw = b"".join([chunk async for chunk in r.aiter_raw()])
+        assert zstd_decompress(raw) == expected
+
+        async with c.stream(
+            "GET", "/large-stream", headers={"Accept-Encoding": "gzip"}
+        ) as r:
+            assert r.headers["Content-Encoding"] == "gzip"
+            assert b"".join([chunk async for chunk in r.aiter_bytes()]) == expected
+
+        # Server-sent events must reach the client as soon as they are sent
+        r = await c.get("/events", headers={"Accept-Encoding": "zstd"})
+        assert "Content-Encoding" not in r.headers
+        assert r.text.startswith("data: 0\n\n")
+
+        # Responses which are already compressed are left alone
+        r = await c.get("/precompressed", headers={"Accept-Encoding": "zstd"})
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.content == b"precompressed"
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from starlette.responses import Response
+
+from diracx.core.models import JobStatus
+from diracx.routers.utils.responses import (
+    COLUMNAR_JSON_MEDIA_TYPE,
+    DiracJSONResponse,
+    list_response,
+)
+
+logger = logging.getLogger(__name__)
+
+# How FastAPI serializes the rows returned by routes annotated with this type
+rows_adapter = TypeAdapter(list[dict[str, Any]])
+
+
+def make_rows(n_rows: int) -> list[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "JobID": i,
+            "Status": JobStatus.RUNNING,
+            "MinorStatus": "Application",
+            "SubmissionTime": start + timedelta(seconds=i),
+            "LastUpdateTime": start + timedelta(seconds=2 * i),
+            "Owner": "chaen",
+            "OwnerGroup": "lhcb_user",
+            "Site": "LCG.CERN.cern",
+            "JobName": f"job_{i}",
+            "RequestID": uuid4(),
+        }
+        for i in range(n_rows)
+    ]
+
+
+def make_request(accept: str) -> Request:
+    return Request(
+        {"type": "http", "headers": [(b"accept", accept.encode())], "method": "POST"}
+    )
+
+
+def test_dirac_json_response_matches_pydantic():
+    rows = make_rows(10)
+    assert DiracJSONResponse(rows).body == rows_adapter.dump_json(rows)
+
+
+def test_list_response():
+    rows = make_rows(3)
+    response = Response(status_code=206, headers={"Content-Range": "jobs 0-2/10"})
+
+    r = list_response(make_request("application/json"), response, rows)
+    assert r.status_code == 206
+    assert r.headers["Content-Range"] == "jobs 0-2/10"
+    assert r.media_type == "application/json"
+    assert json.loads(r.body) == rows_adapter.dump_python(rows, mode="json")
+
+    r = list_response(make_request(COLUMNAR_JSON_MEDIA_TYPE), response, rows)
+    assert r.status_code == 206
+    assert r.headers["Content-Range"] == "jobs 0-2/10"
+    assert r.media_type == COLUMNAR_JSON_MEDIA_TYPE
+    data = json.loads(r.body)
+    assert data["columns"] == list(rows[0])
+    assert [dict(zip(data["columns"], row)) for row in data["rows"]] == (
+        rows_adapter.dump_python(rows, mode="json")
+    )
+
+    # Heterogeneous rows can't be column oriented
+    rows[1].pop("Site")
+    r = list_response(make_request(COLUMNAR_JSON_MEDIA_TYPE), response, rows)
+    assert r.media_type == "application/json"
+
+    r = list_response(make_request(COLUMNAR_JSON_MEDIA_TYPE), response, [])
+    assert json.loads(r.body) == {"columns": [], "rows": []}
+
+
+@pytest.mark.benchmark
+def test_list_response_benchmark():
+    """Compare size and render time of a large page for each serialization."""
+    rows = make_rows(10_000)
+    renderers = {
+        "jsonable_encoder": lambda: json.dumps(
+            jsonable_encoder(rows), separators=(",", ":")
+        ).encode(),
+        "pydantic": lambda: rows_adapter.dump_json(rows),
+        "orjson": lambda: DiracJSONResponse(rows).body,
+        "orjson columnar": lambda: (
+            list_response(make_request(COLUMNAR_JSON_MEDIA_TYPE), Response(), rows).body
+        ),
+    }
+    for name, render in renderers.items():
+        start = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - start
+        logger.info("%-20s %8.1f ms %10d bytes", name, elapsed * 1000, len(body))
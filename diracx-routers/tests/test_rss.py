@@ -267,10 +267,11 @@ def test_empty_db(empty_db_client, endpoint):
     r = empty_db_client.get(endpoint)
     assert r.status_code == HTTPStatus.OK, r.text
     assert r.json() == {}
-    assert r.headers["ETag"] == "empty-0-lhcb"
+    etag = r.headers["ETag"]
+    assert etag.endswith("-lhcb")
 
-    # A conditional request against the sentinel revision still works
-    r = empty_db_client.get(endpoint, headers={"If-None-Match": "empty-0-lhcb"})
+    # A conditional request against the empty view still works
+    r = empty_db_client.get(endpoint, headers={"If-None-Match": etag})
     assert r.status_code == HTTPStatus.NOT_MODIFIED, r.text
 
 
@@ -299,3 +300,32 @@ def test_served_from_cache(normal_user_client, monkeypatch):
         r = normal_user_client.get(endpoint)
         assert r.status_code == HTTPStatus.OK, r.text
         assert r.json(), r.text
+
+
+def test_etag_only_changes_with_the_vo_view(normal_user_client):
+    """Changes to another VO's statuses don't invalidate the caller's view."""
+    r = normal_user_client.get("/api/rss/compute")
+    assert r.status_code == HTTPStatus.OK, r.text
+    etag = r.headers["ETag"]
+
+    async def _add_compute_element(vo):
+        async with _get_rss_db(normal_user_client) as db:
+            await db.insert_resource_status(
+                name=f"CE-{vo}",
+                status="Active",
+                status_type="all",
+                vo=vo,
+                element_type=ResourceType.Compute,
+                date_effective=datetime.now(tz=timezone.utc),
+            )
+        await _clear_source_caches(normal_user_client)
+
+    normal_user_client.portal.call(_add_compute_element, "other_vo")
+    r = normal_user_client.get("/api/rss/compute", headers={"If-None-Match": etag})
+    assert r.status_code == HTTPStatus.NOT_MODIFIED, r.text
+
+    normal_user_client.portal.call(_add_compute_element, "lhcb")
+    r = normal_user_client.get("/api/rss/compute", headers={"If-None-Match": etag})
+    assert r.status_code == HTTPStatus.OK, r.text
+    assert set(r.json()) == {"CE-CERN", "CE-lhcb"}
+    assert r.headers["ETag"] != etag
@@ -7,6 +7,7 @@ Each alias documents *why* a function needs a Redis connection:
 - ``MessageTransport`` — enqueuing, reading, or promoting task messages
 - ``ResultCache`` — storing / retrieving task results
 - ``CallbackRegistry`` — tracking callback groups and firing callbacks
+- ``ConfigNotifier`` — announcing / receiving new configuration revisions
 """
 
 from __future__ import annotations
@@ -19,3 +20,4 @@ LockCoordinator: TypeAlias = Redis
 MessageTransport: TypeAlias = Redis
 ResultCache: TypeAlias = Redis
 CallbackRegistry: TypeAlias = Redis
+ConfigNotifier: TypeAlias = Redis
@@ -21,12 +21,24 @@ class BaseTask:
     Implementations must define an "async def execute(self, ...)" method, where
     the signature of "execute" determines what dependencies are injected by
     the worker.
+
+    Tasks which spend most of their time computing set ``cpu_bound = True`` and
+    define a synchronous "def execute(self)" instead, without dependencies.
+    The worker still acquires their locks, but runs "execute" in a separate
+    process so that it doesn't block the event loop. The task must therefore
+    be picklable.
+
+    Tasks whose successful executions return None, and which nobody polls
+    the result of, can set ``store_void_results = False`` so that only the
+    results of their failures are saved to the result backend.
     """
 
     priority: ClassVar[Priority] = Priority.NORMAL
     size: ClassVar[Size] = Size.MEDIUM
     retry_policy: ClassVar[RetryPolicyBase] = NoRetry()
     dlq_eligible: ClassVar[bool] = False
+    cpu_bound: ClassVar[bool] = False
+    store_void_results: ClassVar[bool] = True
 
     # ContextVar so concurrent async contexts (e.g. worker + scheduler in
     # the same process, or parallel test cases) each get their own isolated
@@ -0,0 +1,187 @@
+"""Batching of the acknowledgements and renewals sent by a stream consumer."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from ._types import _BlockingConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the exponential backoff between attempts to send a failed batch
+_RETRY_DELAY_MIN = 0.1
+_RETRY_DELAY_MAX = 10.0
+
+MessageId = str | bytes
+StreamName = str | bytes
+
+
+class AckCoalescer:
+    """Buffer XACK and XCLAIM commands and send them in batches.
+
+    Acknowledgements and renewals are buffered per stream and sent together,
+    one multi-ID XACK and one XCLAIM JUSTID per stream in a single pipeline,
+    ``flush_interval`` seconds after the first of them was buffered or as soon
+    as ``max_batch`` of them are pending. With a ``flush_interval`` of 0 every
+    call is sent straight away.
+
+    This doesn't weaken the at-least-once delivery of the broker: a message
+    stays in the pending entries list until its XACK reaches Redis, so if the
+    process dies before the batch is sent the message is reclaimed by
+    XAUTOCLAIM exactly as if the process had died while running it. Batches
+    which can't be sent are kept and retried with an exponential backoff,
+    even if nothing else is buffered meanwhile, and ``drain`` sends whatever
+    is left on shutdown.
+
+    ``before_flush`` is awaited at the start of every flush, e.g. to write the
+    results of the tasks before their messages are acknowledged.
+    """
+
+    def __init__(
+        self,
+        connection_pool: _BlockingConnectionPool,
+        consumer_group_name: str,
+        consumer_name: str,
+        *,
+        flush_interval: float = 0.05,
+        max_batch: int = 500,
+        before_flush: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self.connection_pool = connection_pool
+        self.before_flush = before_flush
+        self.consumer_group_name = consumer_group_name
+        self.consumer_name = consumer_name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._acks: dict[StreamName, set[MessageId]] = {}
+        self._renewals: dict[StreamName, set[MessageId]] = {}
+        self._pending = 0
+        self._retry_delay = _RETRY_DELAY_MIN
+        # The flush waiting for flush_interval (or the retry delay) to
+        # elapse, if any
+        self._timer: asyncio.Task[None] | None = None
+        self._background: set[asyncio.Task[None]] = set()
+
+    async def ack(self, stream: StreamName, msg_id: MessageId) -> None:
+        """Acknowledge a message with the next batch."""
+        self._acks.setdefault(stream, set()).add(msg_id)
+        # Renewing a message which is acknowledged in the same batch is useless
+        self._renewals.get(stream, set()).discard(msg_id)
+        await self._buffered()
+
+    async def renew(self, stream: StreamName, msg_id: MessageId) -> None:
+        """Reset the idle time of a pending message with the next batch."""
+        self._renewals.setdefault(stream, set()).add(msg_id)
+        await self._buffered()
+
+    async def _buffered(self) -> None:
+        self._pending += 1
+        if self.flush_interval <= 0 or self._pending >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._start_timer(self.flush_interval)
+
+    def _start_timer(self, delay: float) -> None:
+        self._timer = asyncio.create_task(self._flush_later(delay))
+        self._background.add(self._timer)
+        self._timer.add_done_callback(self._background.discard)
+
+    async def _flush_later(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Send everything buffered so far in one round trip."""
+        acks, self._acks = self._acks, {}
+        renewals, self._renewals = self._renewals, {}
+        self._pending = 0
+        if self.before_flush is not None:
+            try:
+                await self.before_flush()
+            except BaseException:
+                # Keep the acknowledgements for the next batch, they must not
+                # be sent before what ``before_flush`` writes
+                self._rebuffer(acks, renewals)
+                raise
+        if not any(acks.values()) and not any(renewals.values()):
+            return
+
+        try:
+            async with Redis(connection_pool=self.connection_pool) as redis:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for stream, ids in renewals.items():
+                        if ids := ids - acks.get(stream, set()):
+                            pipe.xclaim(
+                                stream,
+                                self.consumer_group_name,
+                                self.consumer_name,
+                                min_idle_time=0,
+                                message_ids=list(ids),
+                                justid=True,
+                            )
+                    for stream, ids in acks.items():
+                        if ids:
+                            pipe.xack(stream, self.consumer_group_name, *ids)
+                    results = await pipe.execute(raise_on_error=False)
+        except RedisError:
+            logger.warning(
+                "Failed to send %d acknowledgements and %d renewals, "
+                "keeping them for the next batch",
+                sum(map(len, acks.values())),
+                sum(map(len, renewals.values())),
+                exc_info=True,
+            )
+            self._rebuffer(acks, renewals)
+            return
+        self._retry_delay = _RETRY_DELAY_MIN
+
+        # Errors of individual commands (e.g. a deleted consumer group) won't
+        # go away by retrying them
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Failed to acknowledge or renew messages: %s", result)
+
+    def _rebuffer(
+        self,
+        acks: dict[StreamName, set[MessageId]],
+        renewals: dict[StreamName, set[MessageId]],
+    ) -> None:
+        for stream, ids in acks.items():
+            self._acks.setdefault(stream, set()).update(ids)
+        for stream, ids in renewals.items():
+            self._renewals.setdefault(stream, set()).update(
+                ids - self._acks.get(stream, set())
+            )
+        self._pending += sum(map(len, acks.values())) + sum(map(len, renewals.values()))
+        # Retry even if nothing else gets buffered: otherwise the messages of
+        # an idle worker would be redelivered and run again after idle_timeout
+        if self._timer is None:
+            self._start_timer(self._retry_delay)
+            self._retry_delay = min(self._retry_delay * 2, _RETRY_DELAY_MAX)
+
+    async def drain(self) -> None:
+        """Send everything buffered, e.g. before shutting down.
+
+        Messages whose acknowledgement still can't be sent are redelivered
+        once their idle time exceeds the broker's idle timeout.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+        # Wait for the flushes which are already sending their batch
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self.flush()
+        if self._timer is not None:
+            # The retry of a failed flush, which would outlive the worker
+            self._timer.cancel()
+        if unsent := sum(map(len, self._acks.values())):
+            logger.error(
+                "Failed to acknowledge %d messages, they will be redelivered", unsent
+            )
@@ -0,0 +1,64 @@
+"""Sharing of a worker's reads between the task streams it listens to."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from ..enums import Priority, Size
+
+#: Sizes whose tasks a worker of a given size may take when it has nothing to
+#: do. Workers only help with smaller tasks so that they never run out of
+#: resources because of a task meant for a bigger worker.
+STEALABLE_SIZES = {
+    Size.SMALL: [],
+    Size.MEDIUM: [Size.SMALL],
+    Size.LARGE: [Size.MEDIUM, Size.SMALL],
+}
+
+
+def stream_weight(
+    weights: Mapping[str, float], priority: Priority, size: Size
+) -> float:
+    """Return the weight of a stream from a weights configuration.
+
+    Weights are keyed either by ``"<priority>:<size>"`` or just by priority, the
+    former taking precedence. Streams which aren't mentioned have a weight of 1.
+    """
+    return weights.get(f"{priority}:{size}", weights.get(str(priority), 1))
+
+
+class DeficitRoundRobin:
+    """Deficit round-robin sharing of reads between weighted streams.
+
+    Each round, every stream is credited with its share of ``quantum`` reads
+    (which can be overridden for each round), in proportion to its weight,
+    and may read as many messages as its credit allows. Credit left over
+    accumulates to the next rounds, so even streams whose share is below one
+    message per round are read regularly. Streams found to be empty lose
+    their credit so that they can't build up a burst while idle.
+    """
+
+    def __init__(self, weights: Mapping[str, float], quantum: int) -> None:
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError(f"Stream weights must be positive, got {weights}")
+        total = sum(weights.values())
+        self.quantum = quantum
+        self._fractions = {stream: weight / total for stream, weight in weights.items()}
+        self._deficits = dict.fromkeys(weights, 0.0)
+
+    def next_round(self, quantum: int | None = None) -> dict[str, int]:
+        """Credit every stream and return how many messages each may read."""
+        quantum = self.quantum if quantum is None else quantum
+        allowances = {}
+        for stream, fraction in self._fractions.items():
+            self._deficits[stream] += quantum * fraction
+            if (allowance := int(self._deficits[stream])) > 0:
+                allowances[stream] = allowance
+        return allowances
+
+    def consumed(self, stream: str, count: int, *, exhausted: bool) -> None:
+        """Record that ``count`` messages were read from a stream."""
+        if exhausted:
+            self._deficits[stream] = 0.0
+        else:
+            self._deficits[stream] -= count
@@ -4,18 +4,33 @@ import functools
 import logging
 import time
 import uuid
+from collections.abc import Iterable, Mapping
 from typing import Any, AsyncGenerator, Awaitable, Callable
 from uuid import uuid4
 
+from opentelemetry import metrics
 from redis.asyncio import BlockingConnectionPool, Redis, ResponseError
 
 from ..enums import Priority, Size
 from ._types import _BlockingConnectionPool
+from .acks import AckCoalescer
 from .models import ReceivedMessage, TaskMessage
+from .read_policy import STEALABLE_SIZES, DeficitRoundRobin, stream_weight
 from .result_backend import RedisResultBackend
 
 logger = logging.getLogger(__name__)
 
+_meter = metrics.get_meter(__name__)
+_messages_dequeued = _meter.create_counter(
+    "tasks_dequeued_total",
+    description="Number of messages read from each task stream",
+)
+_queue_age = _meter.create_histogram(
+    "tasks_queue_age_seconds",
+    description="Time messages spent in their task stream before being read",
+    unit="s",
+)
+
 # The nine streams: one per (priority, size) pair
 ALL_STREAM_NAMES = [f"diracx:tasks:{p}:{s}" for p in Priority for s in Size]
 
@@ -29,11 +44,39 @@ def stream_name_for(priority: Priority | str, size: Size | str) -> str:
     return f"diracx:tasks:{priority}:{size}"
 
 
+def _record_dequeued(stream: str | bytes, msg_list: list, now: float) -> None:
+    """Record the dequeue rate and queue age metrics of freshly read messages."""
+    if isinstance(stream, bytes):
+        stream = stream.decode()
+    attributes = {"stream": stream}
+    _messages_dequeued.add(len(msg_list), attributes)
+    for msg_id, _ in msg_list:
+        if isinstance(msg_id, bytes):
+            msg_id = msg_id.decode()
+        # Stream IDs start with the time at which the message was added
+        added = int(msg_id.split("-", 1)[0]) / 1000
+        _queue_age.record(max(now - added, 0), attributes)
+
+
 class RedisStreamBroker:
     """Redis broker using streams with 9 priority x size queues.
 
-    Workers of a given size listen to 3 priority streams with strict
-    ordering: REALTIME first, then NORMAL, then BACKGROUND.
+    Workers of a given size listen to 3 priority streams. By default they
+    read them together: each XREADGROUP returns up to ``xread_count`` messages
+    from every stream, REALTIME first, then NORMAL, then BACKGROUND, so the
+    priority only orders the messages of a read.
+
+    With ``strict_priority``, the NORMAL stream is only read when REALTIME is
+    empty, and BACKGROUND only when both are, so lower priorities can starve.
+
+    When ``stream_weights`` is given, reads are instead shared between the
+    streams in proportion to their weights (see DeficitRoundRobin and
+    stream_weight for the format). With ``work_stealing`` the worker then also
+    takes tasks of smaller sizes when its own streams are empty.
+
+    Acknowledgements and renewals of the received messages are sent in
+    batches every ``ack_flush_interval`` seconds, see AckCoalescer, together
+    with the results of their tasks if there is a ``result_backend``.
     """
 
     def __init__(
@@ -50,6 +93,11 @@ class RedisStreamBroker:
         approximate: bool = True,
         idle_timeout: int = 600000,
         unacknowledged_batch_size: int = 100,
+        ack_flush_interval: float = 0.05,
+        ack_batch_size: int = 500,
+        stream_weights: Mapping[str, float] | None = None,
+        strict_priority: bool = False,
+        work_stealing: bool = False,
         max_connection_pool_size: int | None = None,
         result_backend: RedisResultBackend | None = None,
         task_id_generator: Callable[[], str] | None = None,
@@ -76,10 +124,43 @@ class RedisStreamBroker:
         self.approximate = approximate
         self.idle_timeout = idle_timeout
         self.unacknowledged_batch_size = unacknowledged_batch_size
+        self.acks = AckCoalescer(
+            self.connection_pool,
+            self.consumer_group_name,
+            self.consumer_name,
+            flush_interval=ack_flush_interval,
+            max_batch=ack_batch_size,
+            # Results are written with the acknowledgements of their messages
+            before_flush=result_backend.flush if result_backend else None,
+        )
+        if work_stealing and stream_weights is None:
+            raise ValueError("Work stealing requires stream weights")
+        if strict_priority and stream_weights is not None:
+            raise ValueError("Strict priority and stream weights are exclusive")
+        self.strict_priority = strict_priority
+        stolen_sizes = STEALABLE_SIZES[worker_size] if work_stealing else []
+        self._stolen_streams = [
+            stream_name_for(p, size) for size in stolen_sizes for p in Priority
+        ]
+        self._own_streams_drr: DeficitRoundRobin | None = None
+        self._stolen_streams_drr: DeficitRoundRobin | None = None
+        if stream_weights is not None:
+
+            def drr(sizes: list[Size]) -> DeficitRoundRobin:
+                weights = {
+                    stream_name_for(p, size): stream_weight(stream_weights, p, size)
+                    for size in sizes
+                    for p in Priority
+                }
+                return DeficitRoundRobin(weights, quantum=xread_count)
+
+            self._own_streams_drr = drr([worker_size])
+            if stolen_sizes:
+                self._stolen_streams_drr = drr(stolen_sizes)
 
     @functools.cached_property
     def _listen_streams(self) -> list[str]:
-        """Streams this worker listens to, in strict priority order."""
+        """Streams this worker listens to, in priority order."""
         return [
             stream_name_for(p, self.worker_size)
             for p in (Priority.REALTIME, Priority.NORMAL, Priority.BACKGROUND)
@@ -105,6 +186,7 @@ class RedisStreamBroker:
         await self._declare_consumer_groups()
 
     async def shutdown(self) -> None:
+        await self.acks.drain()
         if self.result_backend:
             await self.result_backend.shutdown()
         await self.connection_pool.disconnect()
@@ -123,16 +205,27 @@ class RedisStreamBroker:
                 approximate=self.approximate,
             )
 
+    async def enqueue_many(self, messages: Iterable[TaskMessage]) -> None:
+        """Send several messages to their streams in one pipelined round trip."""
+        async with Redis(connection_pool=self.connection_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for message in messages:
+                    pipe.xadd(
+                        stream_name_for(
+                            message.labels.get("priority", Priority.NORMAL),
+                            message.labels.get("size", Size.MEDIUM),
+                        ),
+                        {b"data": message.dumpb()},
+                        maxlen=self.maxlen,
+                        approximate=self.approximate,
+                    )
+                await pipe.execute()
+
     def _ack_generator(
         self, msg_id: str | bytes, queue_name: str | bytes
     ) -> Callable[[], Awaitable[None]]:
         async def _ack() -> None:
-            async with Redis(connection_pool=self.connection_pool) as redis:
-                await redis.xack(
-                    queue_name,
-                    self.consumer_group_name,
-                    msg_id,
-                )
+            await self.acks.ack(queue_name, msg_id)
 
         return _ack
 
@@ -143,42 +236,99 @@ class RedisStreamBroker:
 
         Calls XCLAIM with min-idle-time=0, which always succeeds and resets
         the idle clock — preventing the autoclaim loop from reclaiming a
-        message that is still being actively processed.
+        message that is still being actively processed. JUSTID keeps the
+        delivery counter of the message unchanged.
         """
 
         async def _renew() -> None:
-            async with Redis(connection_pool=self.connection_pool) as redis:
-                await redis.xclaim(
-                    queue_name,
+            await self.acks.renew(queue_name, msg_id)
+
+        return _renew
+
+    async def _read_weighted(
+        self, redis: Redis, drr: DeficitRoundRobin, count: int
+    ) -> list[tuple[str, list[Any]]]:
+        """Read a round of messages from the streams of ``drr`` without blocking."""
+        allowances = drr.next_round(count)
+        async with redis.pipeline(transaction=False) as pipe:
+            for stream, allowance in allowances.items():
+                pipe.xreadgroup(
                     self.consumer_group_name,
                     self.consumer_name,
-                    min_idle_time=0,
-                    message_ids=[msg_id],
+                    {stream: ">"},
+                    count=allowance,
                 )
+            results = await pipe.execute()
 
-        return _renew
+        fetched = []
+        for (stream, allowance), result in zip(allowances.items(), results):
+            msg_list = result[0][1] if result else []
+            drr.consumed(stream, len(msg_list), exhausted=len(msg_list) < allowance)
+            if msg_list:
+                fetched.append((stream, msg_list))
+        return fetched
 
-    async def listen(self) -> AsyncGenerator[ReceivedMessage, None]:
-        """Yield messages from streams in strict priority order.
+    async def _read(self, redis: Redis, count: int | None = None) -> Any:
+        """Read up to about ``count`` messages according to the read policy.
 
-        Drains higher-priority streams before moving to lower ones.
+        Returns a list of (stream, messages) pairs like XREADGROUP.
+        """
+        count = self.count if count is None else count
+        streams = self._listen_streams
+        if self.strict_priority:
+            for stream in streams:
+                if fetched := await redis.xreadgroup(
+                    self.consumer_group_name,
+                    self.consumer_name,
+                    {stream: ">"},
+                    count=count,
+                ):
+                    return fetched
+            # Every stream is empty: wait for any message
+        elif self._own_streams_drr is not None:
+            if fetched := await self._read_weighted(
+                redis, self._own_streams_drr, count
+            ):
+                return fetched
+            if self._stolen_streams_drr is not None:
+                if fetched := await self._read_weighted(
+                    redis, self._stolen_streams_drr, count
+                ):
+                    return fetched
+                streams = streams + self._stolen_streams
+            # Every stream with credit left is empty: wait for any message.
+            # Credit doesn't need updating as no stream is backlogged.
+
+        received = await redis.xreadgroup(
+            self.consumer_group_name,
+            self.consumer_name,
+            {s: ">" for s in streams},
+            block=self.block,
+            noack=False,
+            count=count,
+        )
+        return received or []
+
+    async def listen(
+        self, read_count: Callable[[], Awaitable[int]] | None = None
+    ) -> AsyncGenerator[ReceivedMessage, None]:
+        """Yield messages from streams according to the read policy.
+
+        Unless stream weights or strict priority are configured, each read
+        takes messages from every stream, higher-priority streams first.
+        ``read_count`` is awaited before each read to decide how many messages
+        to ask for, by default ``xread_count``.
         """
         async with Redis(connection_pool=self.connection_pool) as redis:
-            streams = {s: ">" for s in self._listen_streams}
             last_autoclaim = 0.0
 
             while True:
-                # Read from streams in priority order
-                fetched = await redis.xreadgroup(
-                    self.consumer_group_name,
-                    self.consumer_name,
-                    streams,
-                    block=self.block,
-                    noack=False,
-                    count=self.count,
-                )
+                count = await read_count() if read_count else None
+                fetched = await self._read(redis, count)
 
+                now = time.time()
                 for stream, msg_list in fetched:
+                    _record_dequeued(stream, msg_list, now)
                     for msg_id, msg in msg_list:
                         yield ReceivedMessage(
                             data=msg[b"data"],
@@ -1,17 +1,58 @@
 from __future__ import annotations
 
+import logging
+from collections.abc import Iterable
+from typing import Any
+
 import msgpack
 from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
 
 from ..exceptions import ResultIsMissingError
 from ._types import _BlockingConnectionPool
 from .models import TaskResult
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_RESULT_TTL = 86400  # 24 hours
 
 
+def encode_result(result: TaskResult) -> bytes:
+    """Serialize a result with msgpack.
+
+    Successful results of tasks which return None, the vast majority, are
+    stored as a ``[execution_time, labels]`` array, which is packed and
+    unpacked without going through pydantic. Other results are stored as
+    the dict dumped by pydantic.
+    """
+    if not result.is_err and result.return_value is None:
+        return msgpack.packb([result.execution_time, result.labels], datetime=True)
+    return msgpack.packb(result.model_dump(), datetime=True)
+
+
+def decode_result(data: bytes) -> TaskResult:
+    """Deserialize a result serialized by ``encode_result``."""
+    result: Any = msgpack.unpackb(data, timestamp=3)
+    if isinstance(result, list):
+        execution_time, labels = result
+        return TaskResult[None].model_construct(
+            is_err=False,
+            return_value=None,
+            execution_time=execution_time,
+            error=None,
+            labels=labels,
+        )
+    return TaskResult.model_validate(result)
+
+
 class RedisResultBackend:
-    """Result backend storing results in Redis with msgpack serialization."""
+    """Result backend storing results in Redis with msgpack serialization.
+
+    ``set_result`` writes a result straight away. The worker instead buffers
+    the results with ``buffer_result`` and the broker's AckCoalescer writes
+    them with ``flush``, in one pipeline, just before sending the
+    acknowledgements of the same messages.
+    """
 
     def __init__(
         self,
@@ -28,6 +69,7 @@ class RedisResultBackend:
         )
         self.prefix = prefix
         self.result_ttl_seconds = result_ttl_seconds or DEFAULT_RESULT_TTL
+        self._buffered: dict[str, bytes] = {}
 
     def _task_key(self, task_id: str) -> str:
         return f"{self.prefix}:{task_id}"
@@ -36,15 +78,42 @@ class RedisResultBackend:
         pass
 
     async def shutdown(self) -> None:
+        await self.flush()
         await self.redis_pool.disconnect()
 
     async def set_result(self, task_id: str, result: TaskResult) -> None:
         async with Redis(connection_pool=self.redis_pool) as redis:
-            serialized = msgpack.packb(result.model_dump(), datetime=True)
             await redis.setex(
                 name=self._task_key(task_id),
                 time=self.result_ttl_seconds,
-                value=serialized,
+                value=encode_result(result),
+            )
+
+    def buffer_result(self, task_id: str, result: TaskResult) -> None:
+        """Store a result with the next ``flush``."""
+        self._buffered[task_id] = encode_result(result)
+
+    async def flush(self) -> None:
+        """Write the buffered results in one round trip.
+
+        Results are a convenience for the callers polling them, so results
+        which can't be written are logged and dropped rather than delaying
+        the acknowledgements.
+        """
+        buffered, self._buffered = self._buffered, {}
+        if not buffered:
+            return
+        try:
+            async with Redis(connection_pool=self.redis_pool) as redis:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for task_id, value in buffered.items():
+                        pipe.setex(
+                            self._task_key(task_id), self.result_ttl_seconds, value
+                        )
+                    await pipe.execute()
+        except RedisError:
+            logger.warning(
+                "Failed to save the results of %d tasks", len(buffered), exc_info=True
             )
 
     async def is_result_ready(self, task_id: str) -> bool:
@@ -60,5 +129,20 @@ class RedisResultBackend:
                 f"Result for task {task_id} is missing or has expired"
             )
 
-        result_dict = msgpack.unpackb(result_bytes, timestamp=3)
-        return TaskResult.model_validate(result_dict)
+        return decode_result(result_bytes)  # type: ignore[arg-type]
+
+    async def get_results(self, task_ids: Iterable[str]) -> dict[str, TaskResult]:
+        """Return the results of the tasks which have one, with a single MGET.
+
+        Tasks whose result is not ready, or has expired, are left out.
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            values = await redis.mget([self._task_key(t) for t in task_ids])
+        return {
+            task_id: decode_result(value)  # type: ignore[arg-type]
+            for task_id, value in zip(task_ids, values, strict=True)
+            if value is not None
+        }
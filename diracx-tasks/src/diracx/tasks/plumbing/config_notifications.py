@@ -0,0 +1,86 @@
+"""Push notification of configuration changes over Redis pub/sub.
+
+The task scheduler publishes the hexsha of each new configuration revision it
+sees. Processes which subscribe refresh their ConfigSource straight away and
+only poll the configuration backend every ``NOTIFIED_POLL_INTERVAL_SECONDS``,
+in case a notification is missed. If the subscription is lost they go back to
+the default poll interval until it can be restored.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "CONFIG_REVISION_CHANNEL",
+    "config_revision_listener",
+    "listen_for_config_revisions",
+    "publish_config_revision",
+]
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from diracx.core.sources import DEFAULT_CS_REV_CACHE_SOFT_TTL, CacheableSource
+
+from ._redis_types import ConfigNotifier
+
+logger = logging.getLogger(__name__)
+
+CONFIG_REVISION_CHANNEL = "diracx:config:revision"
+NOTIFIED_POLL_INTERVAL_SECONDS = 5 * 60
+RESUBSCRIBE_DELAY_SECONDS = 10
+
+
+async def publish_config_revision(redis: ConfigNotifier, hexsha: str) -> None:
+    """Announce a new configuration revision to the subscribed processes."""
+    receivers = await redis.publish(CONFIG_REVISION_CHANNEL, hexsha)
+    logger.info("Announced config revision %s to %d processes", hexsha, receivers)
+
+
+async def listen_for_config_revisions(
+    redis: ConfigNotifier, config_source: CacheableSource
+) -> None:
+    """Refresh ``config_source`` whenever a new revision is announced.
+
+    Runs until cancelled, subscribing again if the connection is lost.
+    """
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(CONFIG_REVISION_CHANNEL)
+                config_source.set_poll_interval(NOTIFIED_POLL_INTERVAL_SECONDS)
+                # Revisions announced before subscribing have been missed
+                config_source.refresh()
+                logger.info("Subscribed to config revision announcements")
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        config_source.notify_revision(message["data"].decode())
+        except RedisError:
+            logger.warning(
+                "Lost config revision announcements, retrying in %ds",
+                RESUBSCRIBE_DELAY_SECONDS,
+                exc_info=True,
+            )
+        config_source.set_poll_interval(DEFAULT_CS_REV_CACHE_SOFT_TTL)
+        await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+@asynccontextmanager
+async def config_revision_listener(
+    redis_url: str, config_source: CacheableSource
+) -> AsyncIterator[None]:
+    """Run ``listen_for_config_revisions`` in the background."""
+    redis: ConfigNotifier = Redis.from_url(redis_url)
+    task = asyncio.create_task(listen_for_config_revisions(redis, config_source))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        config_source.set_poll_interval(DEFAULT_CS_REV_CACHE_SOFT_TTL)
+        await redis.aclose()
@@ -2,7 +2,15 @@ from __future__ import annotations
 
 
 class UnableToAcquireLockError(Exception):
-    """Lock acquisition failed."""
+    """Lock acquisition failed.
+
+    ``lock_key`` is the Redis key of the lock which couldn't be acquired,
+    when known.
+    """
+
+    def __init__(self, message: str, lock_key: str | None = None):
+        super().__init__(message)
+        self.lock_key = lock_key
 
 
 class StopRetryingError(Exception):
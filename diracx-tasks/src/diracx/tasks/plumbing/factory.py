@@ -3,12 +3,13 @@ from __future__ import annotations
 import asyncio
 import inspect
 import logging
+import pickle
 from collections.abc import AsyncIterator, Iterable
 from contextlib import AsyncExitStack, asynccontextmanager
 from functools import partial
 from importlib.metadata import entry_points
 from inspect import Parameter, signature
-from typing import Any, Callable, Protocol, TypeVar
+from typing import TYPE_CHECKING, Any, Callable, Protocol, TypeVar
 
 from fastapi.dependencies.models import Dependant
 from fastapi.dependencies.utils import get_dependant
@@ -20,7 +21,16 @@ from ._redis_types import LockCoordinator
 from .base_task import BaseTask
 from .broker.models import TaskBinding
 from .depends import auto_inject_depends
-from .locks import BaseLimiter, BaseLock
+from .locks import (
+    BaseLimiter,
+    BaseLock,
+    acquire_locks,
+    extend_locks,
+    release_locks,
+)
+
+if TYPE_CHECKING:
+    from .worker.cpu_lane import CpuBoundLane
 
 T = TypeVar("T")
 
@@ -36,7 +46,8 @@ logger = logging.getLogger(__name__)
 
 
 async def _lock_watchdog(
-    held_locks: list[tuple[BaseLock, LockCoordinator]],
+    held_locks: list[BaseLock],
+    redis: LockCoordinator,
     stop_event: asyncio.Event,
     interval: float = 10.0,
 ) -> None:
@@ -47,13 +58,33 @@ async def _lock_watchdog(
             return
         except asyncio.TimeoutError:
             pass
-        for lock, redis_conn in held_locks:
-            try:
-                await lock.extend(redis_conn)
-            except Exception:
-                logger.warning(
-                    "Failed to extend lock %s", lock.redis_key, exc_info=True
-                )
+        try:
+            await extend_locks(redis, held_locks)
+        except Exception:
+            logger.warning(
+                "Failed to extend locks %s",
+                [lock.redis_key for lock in held_locks],
+                exc_info=True,
+            )
+
+
+def _execute_cpu_bound(
+    cls: type[BaseTask], args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> Any:
+    """Instantiate and execute a CPU-bound task, in a process of the pool."""
+    return cls(*args).execute(**kwargs)  # type: ignore[attr-defined]
+
+
+def _check_picklable(cls: type[BaseTask], kwargs: dict[str, Any]) -> None:
+    """Raise a TypeError naming the dependencies which can't go to the pool."""
+    for name, value in kwargs.items():
+        try:
+            pickle.dumps(value)
+        except Exception as e:
+            raise TypeError(
+                f"{cls.__name__} is CPU-bound, its dependency {name!r} "
+                f"({type(value).__name__}) can't be sent to another process"
+            ) from e
 
 
 async def task_wrapper(  # noqa: D417
@@ -61,6 +92,7 @@ async def task_wrapper(  # noqa: D417
     *args: Any,
     _redis: LockCoordinator,
     _interactive: bool = False,
+    _cpu_lane: CpuBoundLane | None = None,
     **kwargs: Any,
 ) -> Any:
     """Instantiate a task, acquire locks, and execute it.
@@ -74,31 +106,48 @@ async def task_wrapper(  # noqa: D417
         _interactive: When True, ``BaseLimiter`` subclasses (rate limiters,
             concurrency limiters) are skipped entirely — only hard locks
             (mutex, RW) are acquired.
+        _cpu_lane: Process pool in which ``execute()`` runs if the task is
+            CPU-bound. Without it, CPU-bound tasks run in a thread.
 
     """
     task = cls(*args)
-    held_locks: list[tuple[BaseLock, LockCoordinator]] = []
+    held_locks: list[BaseLock] = []
     watchdog_task: asyncio.Task[None] | None = None
     try:
-        for lock in task.execution_locks:
-            # In interactive mode, skip limiters entirely
-            if _interactive and isinstance(lock, BaseLimiter):
-                continue
-
-            acquired = await lock.acquire(_redis)
-            if acquired:
-                held_locks.append((lock, _redis))
-            else:
-                from .exceptions import UnableToAcquireLockError
-
-                raise UnableToAcquireLockError(
-                    f"Could not acquire lock {lock.redis_key}"
-                )
+        # In interactive mode, skip limiters entirely
+        locks = [
+            lock
+            for lock in task.execution_locks
+            if not (_interactive and isinstance(lock, BaseLimiter))
+        ]
+        # All the locks are acquired in a single round trip, or none of them
+        failed = await acquire_locks(_redis, locks)
+        if failed is not None:
+            from .exceptions import UnableToAcquireLockError
+
+            raise UnableToAcquireLockError(
+                f"Could not acquire lock {failed.redis_key}",
+                lock_key=failed.redis_key,
+            )
+        held_locks = locks
 
         # Start watchdog to extend lock TTLs during execution
         stop_event = asyncio.Event()
         if held_locks:
-            watchdog_task = asyncio.create_task(_lock_watchdog(held_locks, stop_event))
+            watchdog_task = asyncio.create_task(
+                _lock_watchdog(held_locks, _redis, stop_event)
+            )
+
+        if cls.cpu_bound:
+            # Locks stay held (and extended by the watchdog) in this process
+            # while execute() runs out of the event loop. The dependencies
+            # were resolved here, their values are sent to the pool with the
+            # task's fields.
+            _check_picklable(cls, kwargs)
+            call = partial(_execute_cpu_bound, cls, args, kwargs)
+            if _cpu_lane is None:
+                return await asyncio.to_thread(call)
+            return await _cpu_lane.run(cls.__name__, call)
 
         # Subclasses define execute() with varying signatures for dependency
         # injection, so it can't be declared on BaseTask without LSP violations.
@@ -112,8 +161,11 @@ async def task_wrapper(  # noqa: D417
                 await watchdog_task
             except asyncio.CancelledError:
                 pass
-        for lock, conn in held_locks:
-            await lock.release(conn)
+        if held_locks:
+            from .scheduler.scheduler import DELAYED_ZSET_KEY
+
+            # Tasks waiting for the locks are made due at once
+            await release_locks(_redis, held_locks, wake_into=DELAYED_ZSET_KEY)
 
 
 def wrap_task(cls: type[BaseTask]) -> Callable[..., Any]:
@@ -125,6 +177,8 @@ def wrap_task(cls: type[BaseTask]) -> Callable[..., Any]:
 
     Also attaches ``_dependant`` for FastAPI dependency resolution.
     """
+    if cls.cpu_bound and inspect.iscoroutinefunction(cls.execute):  # type: ignore[attr-defined]
+        raise TypeError(f"{cls.__name__} is CPU-bound, its execute() can't be async")
     # Subclasses define execute() with varying signatures for dependency
     # injection, so it can't be declared on BaseTask without LSP violations.
     execute_sig = signature(cls.execute, eval_str=True)  # type: ignore[attr-defined]
@@ -308,18 +362,31 @@ async def setup_dependency_overrides(
                 overrides[os_db_class.session] = partial(_db_context, os_db)
 
         # --- Config ---
-        config_url = FactorySettings().config_backend_url
-        if config_url:
+        factory_settings = FactorySettings()
+        if factory_settings.config_backend_url:
             from diracx.core.config import ConfigSource
 
-            config_source = ConfigSource.create_from_url(backend_url=config_url)
+            config_source = ConfigSource.create_from_url(
+                backend_url=factory_settings.config_backend_url,
+                snapshot_dir=factory_settings.config_snapshot_dir,
+            )
             overrides[ConfigSource.create] = config_source.read
+            if factory_settings.config_change_notifications:
+                from .config_notifications import config_revision_listener
+
+                await stack.enter_async_context(
+                    config_revision_listener(
+                        factory_settings.tasks_redis_url, config_source
+                    )
+                )
 
         # --- Settings ---
         # Scan task dependency trees to find which ServiceSettingsBase
         # subclasses are needed, then instantiate (pydantic reads env vars).
         from diracx.core.settings import ServiceSettingsBase
 
+        from .worker.di_resolver import LongLived
+
         settings_classes: set[type[ServiceSettingsBase]] = set()
         for dep in task_dependants:
             settings_classes |= _find_dependents(dep, ServiceSettingsBase)
@@ -327,7 +394,7 @@ async def setup_dependency_overrides(
             try:
                 instance = settings_cls()
                 await stack.enter_async_context(instance.lifetime_function())
-                overrides[settings_cls.create] = partial(lambda x: x, instance)
+                overrides[settings_cls.create] = LongLived(instance)
             except Exception:
                 logger.debug(
                     "Settings %s not available, skipping",
@@ -4,6 +4,7 @@ import logging
 import time
 import uuid
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 
 from ._redis_types import LockCoordinator
 from .lock_registry import LockedObjectType
@@ -105,8 +106,164 @@ _CONCURRENCY_RELEASE_SCRIPT = """
 return redis.call("zrem", KEYS[1], ARGV[1])
 """
 
+# Lua functions shared by the scripts handling several locks at once. Each
+# lock is given as one key and five arguments: its kind (as returned by
+# ``BaseLock._batch_entry``), its owner and three kind-specific parameters.
+_BATCH_FUNCTIONS = """
+local function acquire(kind, key, owner, a, b, c)
+    if kind == "mutex" then
+        return redis.call("set", key, owner, "nx", "px", a) ~= false
+    elseif kind == "exclusive" then
+        local readers = tonumber(redis.call("hget", key, "readers") or "0")
+        if readers == 0 and not redis.call("hget", key, "writer_owner") then
+            redis.call("hset", key, "writer_owner", owner)
+            redis.call("pexpire", key, a)
+            return true
+        end
+        return false
+    elseif kind == "shared" then
+        if redis.call("hget", key, "writer_owner") then
+            return false
+        end
+        redis.call("hincrby", key, "readers", 1)
+        return true
+    elseif kind == "rate" then
+        local current = tonumber(redis.call("get", key) or "0")
+        if current + tonumber(a) > tonumber(b) then
+            return false
+        end
+        redis.call("incrby", key, a)
+        redis.call("expire", key, c)
+        return true
+    elseif kind == "concurrency" then
+        redis.call("zremrangebyscore", key, "-inf", a)
+        if redis.call("zcard", key) < tonumber(b) then
+            redis.call("zadd", key, c, owner)
+            return true
+        end
+        return false
+    end
+    error("Unknown lock kind " .. kind)
+end
+
+local function release(kind, key, owner, a, undo)
+    -- Returns whether the lock became free
+    if kind == "mutex" then
+        if redis.call("get", key) == owner then
+            return redis.call("del", key) == 1
+        end
+    elseif kind == "exclusive" then
+        if redis.call("hget", key, "writer_owner") == owner then
+            return redis.call("hdel", key, "writer_owner") == 1
+        end
+    elseif kind == "shared" then
+        if redis.call("hincrby", key, "readers", -1) <= 0 then
+            redis.call("hdel", key, "readers")
+            return true
+        end
+    elseif kind == "rate" then
+        -- Consumed quota is only given back if the locks weren't acquired
+        if undo then
+            redis.call("decrby", key, a)
+        end
+    elseif kind == "concurrency" then
+        return redis.call("zrem", key, owner) == 1
+    end
+    return false
+end
+
+local function wake(waiters, target, now)
+    -- Make the first task of the waiters ZSET of a lock (see lock_waiters_key)
+    -- due now in the target ZSET, skipping those which aren't waiting anymore
+    for _ = 1, 10 do
+        local waiter = redis.call("zrange", waiters, 0, 0)[1]
+        if not waiter then
+            return
+        end
+        redis.call("zrem", waiters, waiter)
+        if redis.call("zadd", target, "xx", "ch", now, waiter) == 1 then
+            return
+        end
+    end
+end
+
+local function extend(kind, key, owner, a, b, c)
+    if kind == "mutex" then
+        if redis.call("get", key) == owner then
+            return redis.call("pexpire", key, a)
+        end
+    elseif kind == "exclusive" then
+        if redis.call("hget", key, "writer_owner") == owner then
+            return redis.call("pexpire", key, a)
+        end
+    elseif kind == "concurrency" then
+        return redis.call("zadd", key, "xx", "ch", c, owner)
+    end
+    return 0
+end
+"""
+
+# Lua script acquiring all the locks or none of them. Returns 0 if they were
+# acquired, otherwise the (1-based) position of the first one which wasn't,
+# after releasing those acquired before it.
+_BATCH_ACQUIRE_SCRIPT = (
+    _BATCH_FUNCTIONS
+    + """
+for i = 1, #KEYS do
+    local j = (i - 1) * 5
+    if not acquire(ARGV[j + 1], KEYS[i], ARGV[j + 2], ARGV[j + 3], ARGV[j + 4], ARGV[j + 5]) then
+        for k = i - 1, 1, -1 do
+            local l = (k - 1) * 5
+            release(ARGV[l + 1], KEYS[k], ARGV[l + 2], ARGV[l + 3], true)
+        end
+        return i
+    end
+end
+return 0
+"""
+)
+
+# Lua script extending the TTL of locks. Returns, for each of them, whether it
+# was extended.
+_BATCH_EXTEND_SCRIPT = (
+    _BATCH_FUNCTIONS
+    + """
+local extended = {}
+for i = 1, #KEYS do
+    local j = (i - 1) * 5
+    extended[i] = extend(ARGV[j + 1], KEYS[i], ARGV[j + 2], ARGV[j + 3], ARGV[j + 4], ARGV[j + 5])
+end
+return extended
+"""
+)
+
+# Lua script releasing locks. The locks' arguments come after their number
+# and the current time. To wake the tasks waiting for the locks which became
+# free, the keys of the locks are followed by those of their waiters ZSETs and
+# by the ZSET in which to make them due, so that every key the script touches
+# is declared (as required by Redis Cluster).
+_BATCH_RELEASE_SCRIPT = (
+    _BATCH_FUNCTIONS
+    + """
+local n = tonumber(ARGV[1])
+local target = KEYS[2 * n + 1]
+for i = 1, n do
+    local j = 2 + (i - 1) * 5
+    local freed = release(ARGV[j + 1], KEYS[i], ARGV[j + 2], ARGV[j + 3], false)
+    if freed and target then
+        wake(KEYS[n + i], target, ARGV[2])
+    end
+end
+return n
+"""
+)
+
 DEFAULT_LOCK_TTL_MS = 30000  # 30 seconds
 
+#: Arguments of a lock in the batch scripts: its kind, its owner and three
+#: kind-specific parameters
+BatchArguments = tuple[str, str, str, str, str]
+
 
 class BaseLock(ABC):
     """Base class for all Redis-backed lock primitives.
@@ -160,6 +317,17 @@ class BaseLock(ABC):
         """
         return False
 
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        """Return the key and arguments of the lock in the batch scripts.
+
+        ``now_ms`` is the current time in milliseconds. Locks returning None
+        (e.g. disabled limiters and lock types defined outside this module)
+        are handled one by one with ``acquire``, ``extend`` and ``release``
+        by ``acquire_locks``, ``extend_locks`` and ``release_locks``, so
+        subclasses changing how a lock is acquired must return None too.
+        """
+        return None
+
 
 class MutexLock(BaseLock):
     """Mutual-exclusion lock using ``SET key owner NX PX ttl``.
@@ -209,6 +377,9 @@ class MutexLock(BaseLock):
         )
         return bool(result)
 
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        return self.redis_key, ("mutex", self._owner_id, str(self.ttl_ms), "", "")
+
 
 class ExclusiveRWLock(BaseLock):
     """Exclusive (writer) side of a reader-writer lock.
@@ -262,6 +433,9 @@ class ExclusiveRWLock(BaseLock):
         )
         return bool(result)
 
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        return self.redis_key, ("exclusive", self._owner_id, str(self.ttl_ms), "", "")
+
 
 class SharedRWLock(BaseLock):
     """Shared (reader) side of a reader-writer lock.
@@ -290,6 +464,9 @@ class SharedRWLock(BaseLock):
             _SHARED_RELEASE_SCRIPT, 1, self.redis_key
         )
 
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        return self.redis_key, ("shared", "", "", "", "")
+
 
 class BaseLimiter(BaseLock):
     """Base class for limiters.
@@ -349,6 +526,18 @@ class RateLimiter(BaseLimiter):
     async def release(self, redis: LockCoordinator) -> None:
         pass  # Rate limiters don't release
 
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        if self.limit is None or self.window_seconds is None:
+            return None
+        window_key = f"{self.redis_key}:{now_ms // 1000 // self.window_seconds}"
+        return window_key, (
+            "rate",
+            "",
+            str(self.n_items),
+            str(self.limit),
+            str(self.window_seconds * 2),
+        )
+
 
 class ConcurrencyLimiter(BaseLimiter):
     """Semaphore-style concurrency limiter backed by a Redis sorted set.
@@ -412,3 +601,122 @@ class ConcurrencyLimiter(BaseLimiter):
         expiry_ms = int(time.time() * 1000) + self.ttl_ms
         result = await redis.zadd(self.redis_key, {self._owner_id: expiry_ms}, xx=True)
         return bool(result)
+
+    def _batch_entry(self, now_ms: int) -> tuple[str, BatchArguments] | None:
+        if self.limit is None:
+            return None
+        return self.redis_key, (
+            "concurrency",
+            self._owner_id,
+            str(now_ms),
+            str(self.limit),
+            str(now_ms + self.ttl_ms),
+        )
+
+
+def lock_waiters_key(lock_key: str) -> str:
+    """Return the key of the ZSET of tasks waiting for the lock ``lock_key``."""
+    return f"waiters:{lock_key}"
+
+
+def _batch(
+    locks: Sequence[BaseLock],
+) -> tuple[list[BaseLock], list[str], list[str], list[BaseLock]]:
+    """Split locks into those handled by the batch scripts and the others.
+
+    Returns the batched locks with the keys and arguments of the scripts,
+    then the other locks.
+    """
+    now_ms = int(time.time() * 1000)
+    batched: list[BaseLock] = []
+    keys: list[str] = []
+    args: list[str] = []
+    others: list[BaseLock] = []
+    for lock in locks:
+        entry = lock._batch_entry(now_ms)
+        if entry is None:
+            others.append(lock)
+        else:
+            batched.append(lock)
+            keys.append(entry[0])
+            args.extend(entry[1])
+    return batched, keys, args, others
+
+
+async def acquire_locks(
+    redis: LockCoordinator, locks: Sequence[BaseLock]
+) -> BaseLock | None:
+    """Acquire all of ``locks`` or none of them.
+
+    The locks defined in this module are acquired atomically by a single
+    script, so no other worker ever sees only some of them held. The other
+    locks are then acquired one by one, releasing all the locks acquired so
+    far if one of them fails.
+
+    Returns None if the locks were acquired, otherwise the first lock which
+    couldn't be.
+    """
+    batched, keys, args, others = _batch(locks)
+    if batched:
+        failed = await redis.eval(  # type: ignore[arg-type]
+            _BATCH_ACQUIRE_SCRIPT, len(keys), *keys, *args
+        )
+        if failed:
+            return batched[int(failed) - 1]
+
+    acquired: list[BaseLock] = list(batched)
+    for lock in others:
+        try:
+            if not await lock.acquire(redis):
+                await release_locks(redis, acquired)
+                return lock
+        except BaseException:
+            await release_locks(redis, acquired)
+            raise
+        acquired.append(lock)
+    return None
+
+
+async def extend_locks(redis: LockCoordinator, locks: Sequence[BaseLock]) -> list[bool]:
+    """Extend the TTL of ``locks``, returning whether each of them was extended."""
+    batched, keys, args, others = _batch(locks)
+    extended: dict[int, bool] = {}
+    if batched:
+        results = await redis.eval(  # type: ignore[arg-type]
+            _BATCH_EXTEND_SCRIPT, len(keys), *keys, *args
+        )
+        for lock, result in zip(batched, results, strict=True):
+            extended[id(lock)] = bool(result)
+    for lock in others:
+        extended[id(lock)] = await lock.extend(redis)
+    return [extended[id(lock)] for lock in locks]
+
+
+async def release_locks(
+    redis: LockCoordinator,
+    locks: Sequence[BaseLock],
+    *,
+    wake_into: str | None = None,
+) -> None:
+    """Release ``locks``, all the batched ones with a single script.
+
+    With ``wake_into``, the first member of the waiters ZSET (see
+    ``lock_waiters_key``) of each lock which became free is made due now in
+    the ``wake_into`` ZSET, if it is still there. Rate limiters are never
+    freed by a release, so their waiters are not woken.
+    """
+    batched, keys, args, others = _batch(locks)
+    if batched:
+        n_locks = len(keys)
+        if wake_into is not None:
+            keys += [lock_waiters_key(key) for key in keys] + [wake_into]
+        await redis.eval(  # type: ignore[arg-type]
+            _BATCH_RELEASE_SCRIPT,
+            len(keys),
+            *keys,
+            str(n_locks),
+            str(time.time()),
+            *args,
+        )
+    for lock in others:
+        await lock.release(redis)
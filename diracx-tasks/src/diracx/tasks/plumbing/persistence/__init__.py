@@ -1,5 +1,5 @@
 from __future__ import annotations
 
-from .dlq import TaskDB
+from .dlq import TaskDB, replay_dlq_tasks
 
-__all__ = ["TaskDB"]
+__all__ = ["TaskDB", "replay_dlq_tasks"]
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Sequence
 from datetime import datetime
 from enum import StrEnum
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+import msgpack
 from sqlalchemy import (
     DateTime,
     Enum,
+    Index,
     Integer,
     LargeBinary,
     String,
@@ -15,6 +18,7 @@ from sqlalchemy import (
     delete,
     insert,
     select,
+    tuple_,
     update,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -22,6 +26,11 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from diracx.db.sql.utils.base import BaseSQLDB
 from diracx.db.sql.utils.functions import utcnow
 
+from ..broker.models import TaskMessage
+
+if TYPE_CHECKING:
+    from ..broker.redis_streams import RedisStreamBroker
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,6 +59,8 @@ class DeadLetterQueue(DLQBase):
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
     last_attempted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
+    __table_args__ = (Index("index_status_submitted_at", status, submitted_at),)
+
 
 class TaskDB(BaseSQLDB):
     """Database for task dead letter queue persistence."""
@@ -96,6 +107,32 @@ class TaskDB(BaseSQLDB):
         )
         await self.conn.execute(stmt)
 
+    async def mark_dispatched_many(self, dlq_ids: Sequence[int]) -> None:
+        """Mark several dead letter queue tasks as dispatched in one statement."""
+        if not dlq_ids:
+            return
+        stmt = (
+            update(DeadLetterQueue)
+            .where(DeadLetterQueue.id.in_(dlq_ids))
+            .values(status=DLQStatus.DISPATCHED, last_attempted_at=utcnow())
+        )
+        await self.conn.execute(stmt)
+
+    async def mark_failed_many(self, dlq_ids: Sequence[int], error: str) -> None:
+        """Mark several dead letter queue tasks as permanently failed in one statement."""
+        if not dlq_ids:
+            return
+        stmt = (
+            update(DeadLetterQueue)
+            .where(DeadLetterQueue.id.in_(dlq_ids))
+            .values(
+                status=DLQStatus.FAILED,
+                last_error=error,
+                last_attempted_at=utcnow(),
+            )
+        )
+        await self.conn.execute(stmt)
+
     async def delete_dlq_task(self, dlq_id: int) -> None:
         """Remove a completed task from the dead letter queue."""
         stmt = delete(DeadLetterQueue).where(DeadLetterQueue.id == dlq_id)
@@ -108,7 +145,102 @@ class TaskDB(BaseSQLDB):
             .where(
                 DeadLetterQueue.status.in_([DLQStatus.PENDING, DLQStatus.DISPATCHED])
             )
+            .order_by(DeadLetterQueue.submitted_at, DeadLetterQueue.id)
+            .limit(batch_size)
+        )
+        result = await self.conn.execute(stmt)
+        return [dict(row._mapping) for row in result]
+
+    async def claim_tasks(
+        self,
+        batch_size: int = 500,
+        statuses: Sequence[DLQStatus] = (DLQStatus.PENDING,),
+        after: tuple[datetime, int] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Claim the oldest tasks with one of ``statuses``, using the status index.
+
+        The rows are locked until the end of the transaction, and rows locked
+        by concurrent replays are skipped (``FOR UPDATE SKIP LOCKED``, which
+        sqlite doesn't need as it locks the whole database). ``after`` is the
+        ``(submitted_at, id)`` of the last task of the previous batch, so that
+        batches which don't change the status of their tasks aren't claimed
+        again.
+        """
+        stmt = (
+            select(DeadLetterQueue)
+            .where(DeadLetterQueue.status.in_(statuses))
+            .order_by(DeadLetterQueue.submitted_at, DeadLetterQueue.id)
             .limit(batch_size)
+            .with_for_update(skip_locked=True)
         )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(DeadLetterQueue.submitted_at, DeadLetterQueue.id)
+                > tuple_(*after)
+            )
         result = await self.conn.execute(stmt)
         return [dict(row._mapping) for row in result]
+
+
+def _dlq_task_message(row: dict[str, Any], task_id: str) -> TaskMessage:
+    """Rebuild the message of a dead letter queue task for a new attempt."""
+    data = msgpack.unpackb(row["task_args"], timestamp=3)
+    return TaskMessage(
+        task_id=task_id,
+        task_name=row["task_class"],
+        # Internal labels (e.g. _retry_attempt) belong to the previous attempts
+        labels={k: v for k, v in data["labels"].items() if not k.startswith("_")},
+        task_args=data["task_args"],
+        task_kwargs=data["task_kwargs"],
+    )
+
+
+async def replay_dlq_tasks(
+    task_db: TaskDB,
+    broker: RedisStreamBroker,
+    *,
+    batch_size: int = 500,
+    statuses: Sequence[DLQStatus] = (DLQStatus.PENDING,),
+) -> int:
+    """Re-submit the dead letter queue tasks with one of ``statuses`` to the broker.
+
+    Each batch is claimed, enqueued with a single Redis pipeline and marked
+    as dispatched in its own transaction, with one statement per batch.
+    Tasks whose arguments can't be decoded are marked as failed. If the
+    enqueue fails, the transaction of the batch is rolled back, so that its
+    tasks can be replayed again, and the error is raised.
+
+    Returns:
+        The number of tasks which were re-submitted.
+
+    """
+    replayed = 0
+    after = None
+    while True:
+        async with task_db:
+            rows = await task_db.claim_tasks(batch_size, statuses, after)
+            if not rows:
+                return replayed
+            after = (rows[-1]["submitted_at"], rows[-1]["id"])
+
+            messages, dispatched, failed = [], [], []
+            for row in rows:
+                try:
+                    messages.append(_dlq_task_message(row, broker.id_generator()))
+                except Exception:
+                    logger.warning(
+                        "Cannot decode dead letter queue task %d",
+                        row["id"],
+                        exc_info=True,
+                    )
+                    failed.append(row["id"])
+                else:
+                    dispatched.append(row["id"])
+
+            await broker.enqueue_many(messages)
+            await task_db.mark_dispatched_many(dispatched)
+            await task_db.mark_failed_many(
+                failed, "Cannot decode the arguments of the task"
+            )
+        replayed += len(dispatched)
+        logger.info("Replayed %d dead letter queue tasks", replayed)
@@ -1,22 +1,29 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import logging
+from collections.abc import Iterable
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING, Any
 from uuid import uuid4
 
 from opentelemetry import metrics
 from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from diracx.core.sources import DEFAULT_CS_REV_CACHE_SOFT_TTL
 
 from .._redis_types import MessageTransport
 from ..base_task import BaseTask, PeriodicBaseTask, PeriodicVoAwareBaseTask
 from ..broker._types import _BlockingConnectionPool
-from ..broker.models import TaskMessage, submit_task
+from ..broker.models import TaskMessage, _build_task_message
 from ..broker.redis_streams import RedisStreamBroker
+from ..config_notifications import publish_config_revision
+from ..locks import lock_waiters_key
 
 if TYPE_CHECKING:
-    from diracx.core.config import Config
+    from diracx.core.config import Config, ConfigSource
 
 logger = logging.getLogger(__name__)
 _meter = metrics.get_meter(__name__)
@@ -63,6 +70,18 @@ end
 return promoted
 """
 
+# Lua script adding a task both to the delayed ZSET and to the ZSET of the
+# tasks waiting for a lock, which expires a minute after the last of them is
+# due (and so never before a task parked earlier for a longer time)
+_PARK_SCRIPT = """
+redis.call("zadd", KEYS[1], ARGV[2], ARGV[1])
+redis.call("zadd", KEYS[2], ARGV[2], ARGV[1])
+local last = redis.call("zrange", KEYS[2], -1, -1)[1]
+local last_run_at = tonumber(redis.call("zscore", KEYS[2], last))
+redis.call("expireat", KEYS[2], tostring(math.floor(last_run_at) + 60))
+return 1
+"""
+
 DELAYED_ZSET_KEY = "diracx:tasks:delayed"
 SCHEDULE_DUMP_INTERVAL_SECONDS = 600
 SCHEDULE_DUMP_MAX_ENTRIES = 20
@@ -80,6 +99,28 @@ async def schedule_delayed(
     )
 
 
+async def park_until_released(
+    redis: MessageTransport,
+    message: TaskMessage,
+    lock_key: str,
+    run_at: datetime,
+) -> None:
+    """Delay a task which couldn't acquire the lock ``lock_key``.
+
+    The task is scheduled for ``run_at`` like with ``schedule_delayed``, and
+    also added to the waiters of the lock, so that it is made due as soon as
+    the lock is released (see ``release_locks``).
+    """
+    await redis.eval(  # type: ignore[arg-type]
+        _PARK_SCRIPT,
+        2,
+        DELAYED_ZSET_KEY,
+        lock_waiters_key(lock_key),
+        message.dumpb(),
+        str(run_at.timestamp()),
+    )
+
+
 class TaskScheduler:
     """Scheduler managing periodic tasks and delayed ZSET polling.
 
@@ -88,9 +129,11 @@ class TaskScheduler:
 
     Responsibilities:
       1. Load periodic task definitions from entry points + config
-      2. Track next occurrence for each periodic task; submit when due
+      2. Track next occurrence for each periodic task in a heap; submit
+         the tasks due in a tick as one pipelined batch
       3. Poll the delayed ZSET for tasks whose time has come
-      4. Watch config for schedule changes
+      4. Watch config for schedule changes, and announce new config
+         revisions to the other processes (see config_notifications)
     """
 
     def __init__(
@@ -100,10 +143,12 @@ class TaskScheduler:
         *,
         task_registry: dict[str, type[BaseTask]] | None = None,
         config: Config | None = None,
+        config_source: ConfigSource | None = None,
         prefix: str = "diracx:scheduler",
         check_interval: float = 10.0,
         delayed_poll_interval: float = 1.0,
-        config_watch_interval: float = 60.0,
+        # Cheap as it only looks at the revision cached by the config source
+        config_watch_interval: float = DEFAULT_CS_REV_CACHE_SOFT_TTL,
         delayed_batch_size: int = 100,
         max_connection_pool_size: int | None = None,
         **connection_kwargs: Any,
@@ -116,6 +161,7 @@ class TaskScheduler:
         self.delayed_batch_size = delayed_batch_size
         self.task_registry = task_registry or {}
         self._config = config
+        self._config_source = config_source
         self._instance_id = uuid4().hex
         self.connection_pool: _BlockingConnectionPool = BlockingConnectionPool.from_url(
             url=redis_url,
@@ -124,6 +170,10 @@ class TaskScheduler:
         )
         # Mapping of (task_class_name, vo_or_empty) -> next_scheduled_time
         self._next_runs: dict[tuple[str, str], datetime] = {}
+        # Min-heap of (next_scheduled_time, task_class_name, vo_or_empty), so
+        # that a tick only looks at the due entries. Entries which no longer
+        # match _next_runs (rescheduled or removed) are skipped when popped.
+        self._run_heap: list[tuple[datetime, str, str]] = []
         self._schedule_dump_interval_seconds = SCHEDULE_DUMP_INTERVAL_SECONDS
         self._last_schedule_dump_at: datetime | None = None
         # Cached ZSET size for OTel observable gauge
@@ -188,22 +238,7 @@ class TaskScheduler:
 
         while not finish_event.is_set():
             now = datetime.now(tz=UTC)
-
-            coros = []
-            due_updates: dict[tuple[str, str], datetime] = {}
-            for (task_name, vo), next_run in list(self._next_runs.items()):
-                if now >= next_run:
-                    coros.append(self._submit_periodic_task(task_name, vo))
-                    task_cls = self.task_registry.get(task_name)
-                    if task_cls and hasattr(task_cls, "default_schedule"):
-                        due_updates[(task_name, vo)] = (
-                            task_cls.default_schedule.next_occurrence()
-                        )
-
-            if coros:
-                await asyncio.gather(*coros)
-
-            self._next_runs.update(due_updates)
+            await self._run_due_periodic_tasks(now)
             if self._should_dump_schedule_snapshot(now):
                 self._log_next_schedules_snapshot("periodic")
                 self._last_schedule_dump_at = now
@@ -214,6 +249,46 @@ class TaskScheduler:
             except asyncio.TimeoutError:
                 pass
 
+    async def _run_due_periodic_tasks(self, now: datetime) -> int:
+        """Submit the periodic tasks due at ``now`` and compute their next run.
+
+        Returns the number of due schedules.
+        """
+        due = self._pop_due(now)
+        if not due:
+            return 0
+        try:
+            await self._submit_periodic_tasks(due)
+        finally:
+            # The due schedules were popped from the heap, they must be pushed
+            # back even if the submission failed
+            for task_name, vo in due:
+                if (task_name, vo) not in self._next_runs:
+                    continue  # Removed by the config watch meanwhile
+                task_cls = self.task_registry.get(task_name)
+                if task_cls and hasattr(task_cls, "default_schedule"):
+                    self._set_next_run(
+                        task_name, vo, task_cls.default_schedule.next_occurrence()
+                    )
+                else:
+                    # Not a periodic task, there is no next run
+                    del self._next_runs[(task_name, vo)]
+        return len(due)
+
+    def _pop_due(self, now: datetime) -> list[tuple[str, str]]:
+        """Remove the schedules due at ``now`` from the heap and return them."""
+        due = []
+        while self._run_heap and self._run_heap[0][0] <= now:
+            next_run, task_name, vo = heapq.heappop(self._run_heap)
+            if self._next_runs.get((task_name, vo)) == next_run:
+                due.append((task_name, vo))
+        # A schedule removed and added again may have duplicate entries
+        return list(dict.fromkeys(due))
+
+    def _set_next_run(self, task_name: str, vo: str, next_run: datetime) -> None:
+        self._next_runs[(task_name, vo)] = next_run
+        heapq.heappush(self._run_heap, (next_run, task_name, vo))
+
     async def _delayed_poll_loop(self, finish_event: asyncio.Event) -> None:
         """Poll the delayed ZSET and promote due tasks to streams.
 
@@ -290,7 +365,7 @@ class TaskScheduler:
                     self.add_vo_schedule(task_name, vo, schedule.next_occurrence())
                     scheduled_entries += 1
             else:
-                self._next_runs[(task_name, "")] = schedule.next_occurrence()
+                self._set_next_run(task_name, "", schedule.next_occurrence())
                 scheduled_entries += 1
 
         logger.info(
@@ -307,14 +382,46 @@ class TaskScheduler:
 
     def add_vo_schedule(self, task_name: str, vo: str, next_run: datetime) -> None:
         """Register a VO-specific periodic task schedule."""
-        self._next_runs[(task_name, vo)] = next_run
+        self._set_next_run(task_name, vo, next_run)
 
     async def _submit_periodic_task(self, task_name: str, vo: str) -> None:
         """Submit a periodic task to the broker."""
+        await self._submit_periodic_tasks([(task_name, vo)])
+
+    async def _submit_periodic_tasks(self, due: Iterable[tuple[str, str]]) -> None:
+        """Submit periodic tasks to the broker in one pipelined round trip."""
+        messages = []
+        for task_name, vo in due:
+            try:
+                message = self._periodic_task_message(task_name, vo)
+            except Exception:
+                logger.exception(
+                    "Failed to build periodic task %s (vo=%s)", task_name, vo
+                )
+                continue
+            if message is not None:
+                messages.append(message)
+        if not messages:
+            return
+
+        try:
+            await self.broker.enqueue_many(messages)
+        except Exception:
+            logger.exception("Failed to submit %d periodic tasks", len(messages))
+            return
+        for message in messages:
+            logger.info(
+                "Submitted periodic task %s (vo=%s)",
+                message.task_name,
+                message.labels.get("vo", "N/A"),
+            )
+
+    def _periodic_task_message(self, task_name: str, vo: str) -> TaskMessage | None:
+        """Build the message submitting a periodic task, if it is known."""
         task_cls = self._find_task_class(task_name)
         if task_cls is None:
             logger.warning("Task class %r not found", task_name)
-            return
+            return None
 
         labels: dict[str, Any] = {
             "priority": task_cls.priority,
@@ -328,18 +435,14 @@ class TaskScheduler:
             # VO is the first constructor argument for VO-aware tasks
             args.append(vo)
 
-        try:
-            await submit_task(
-                broker=self.broker,
-                task_name=task_name,
-                task_args=args,
-                labels=labels,
-            )
-            logger.info("Submitted periodic task %s (vo=%s)", task_name, vo or "N/A")
-        except Exception:
-            logger.exception(
-                "Failed to submit periodic task %s (vo=%s)", task_name, vo or "N/A"
-            )
+        return _build_task_message(
+            broker=self.broker,
+            task_name=task_name,
+            task_args=args,
+            task_kwargs={},
+            labels=labels,
+            task_id=None,
+        )
 
     def _find_task_class(self, task_name: str) -> type[BaseTask] | None:
         return self.task_registry.get(task_name)
@@ -414,6 +517,9 @@ class TaskScheduler:
             except asyncio.TimeoutError:
                 pass
 
+            if self._config_source is not None:
+                await self._update_config()
+
             current_vos = set(self.load_vos())
             if current_vos == known_vos:
                 continue
@@ -451,6 +557,23 @@ class TaskScheduler:
             )
             self._log_next_schedules_snapshot("config_reconcile")
 
+    async def _update_config(self) -> None:
+        """Load the latest config and announce it if it's a new revision."""
+        assert self._config_source is not None
+        try:
+            config = await self._config_source.read_non_blocking()
+        except Exception:
+            logger.exception("Error reading config")
+            return
+        if self._config is not None and config._hexsha == self._config._hexsha:
+            return
+        self._config = config
+        try:
+            async with Redis(connection_pool=self.connection_pool) as redis:
+                await publish_config_revision(redis, config._hexsha)
+        except RedisError:
+            logger.exception("Error announcing config revision %s", config._hexsha)
+
     def _log_task_registry_awareness(self) -> None:
         """Log which tasks are known to the scheduler."""
         periodic_enabled: list[str] = []
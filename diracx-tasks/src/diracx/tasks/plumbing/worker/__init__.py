@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from .di_resolver import solve_task_dependencies
+from .di_resolver import LongLived, ResolutionPlan, solve_task_dependencies
 from .worker import Worker
 
-__all__ = ["Worker", "solve_task_dependencies"]
+__all__ = ["LongLived", "ResolutionPlan", "Worker", "solve_task_dependencies"]
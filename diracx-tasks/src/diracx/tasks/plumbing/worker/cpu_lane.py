@@ -0,0 +1,89 @@
+"""Process pool used by the worker to run CPU-bound tasks."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import time
+from typing import Callable, TypeVar
+
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_meter = metrics.get_meter(__name__)
+_cpu_tasks_running = _meter.create_up_down_counter(
+    "tasks_cpu_bound_running",
+    description="Number of CPU-bound tasks running in the process pool",
+)
+_cpu_task_wait = _meter.create_histogram(
+    "tasks_cpu_bound_wait_seconds",
+    description="Time CPU-bound tasks waited for a free process",
+    unit="s",
+)
+_cpu_task_duration = _meter.create_histogram(
+    "tasks_cpu_bound_duration_seconds",
+    description="Time CPU-bound tasks spent running in the process pool",
+    unit="s",
+)
+
+
+class CpuBoundLane:
+    """Run the CPU-bound part of tasks in a bounded pool of processes.
+
+    At most ``max_workers`` calls run at once, independently of the worker's
+    ``max_concurrent_tasks``, and the others wait for a free process in the
+    event loop so that they can still be cancelled. The processes are started
+    with "spawn" on first use: forking the worker would copy its event loop
+    and Redis connections into them.
+
+    If a process dies, the pool is replaced for the next calls and the calls
+    which were running fail like any other task.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+        self.max_workers = max_workers
+        self._sem = asyncio.Semaphore(max_workers)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, task_name: str, func: Callable[[], T]) -> T:
+        """Call ``func`` in one of the processes and return its result."""
+        attrs = {"task_name": task_name}
+        wait_start = time()
+        async with self._sem:
+            start = time()
+            _cpu_task_wait.record(start - wait_start, attributes=attrs)
+            _cpu_tasks_running.add(1, attributes=attrs)
+            executor = self._get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, func)
+            except BrokenProcessPool:
+                logger.error("CPU-bound task %s killed its process", task_name)
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                _cpu_tasks_running.add(-1, attributes=attrs)
+                _cpu_task_duration.record(time() - start, attributes=attrs)
+
+    def shutdown(self) -> None:
+        """Stop the processes, waiting for the running calls to complete."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
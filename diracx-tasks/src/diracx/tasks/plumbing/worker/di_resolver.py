@@ -1,13 +1,156 @@
 from __future__ import annotations
 
+import dataclasses
 from contextlib import AsyncExitStack, asynccontextmanager
-from typing import Any, Callable
+from enum import Enum
+from typing import Any, Callable, Generic, TypeVar
 
 from fastapi.concurrency import contextmanager_in_threadpool
 from fastapi.dependencies.models import Dependant
 from fastapi.dependencies.utils import get_dependant
 from starlette.concurrency import run_in_threadpool
 
+T = TypeVar("T")
+
+
+class LongLived(Generic[T]):
+    """Dependency override returning a value shared by all task executions.
+
+    ``ResolutionPlan`` resolves it once, when the plan is built, rather than
+    for every execution. Use it for objects which live as long as the worker,
+    e.g. settings instances, not for per-execution resources.
+    """
+
+    def __init__(self, value: T) -> None:
+        self.value = value
+
+    def __call__(self) -> T:
+        return self.value
+
+
+class _Kind(Enum):
+    VALUE = "value"
+    ASYNC_GEN = "async_gen"
+    GEN = "gen"
+    COROUTINE = "coroutine"
+    SYNC = "sync"
+
+
+@dataclasses.dataclass(frozen=True)
+class _Step:
+    call: Callable[..., Any]
+    kind: _Kind
+    #: Keyword argument names and the index of the step providing them
+    arguments: tuple[tuple[str, int], ...]
+
+
+class ResolutionPlan:
+    """Flattened resolution of the dependencies of a task.
+
+    Walking the ``Dependant`` tree, looking up the overrides and building the
+    dependants of the overriding callables is done once, when the plan is
+    built. The plan is a list of steps, each calling one dependency with the
+    values of the steps it depends on, ordered such that dependencies come
+    before their dependents. Cached dependencies (``use_cache``) are a single
+    step shared by all their dependents, like FastAPI's per-request cache.
+
+    ``LongLived`` overrides are resolved when the plan is built, the other
+    dependencies for each execution by ``solve``. The plan must therefore be
+    rebuilt if the dependency overrides change.
+    """
+
+    def __init__(
+        self,
+        dependant: Dependant,
+        dependency_overrides: dict[Callable[..., Any], Callable[..., Any]]
+        | None = None,
+    ) -> None:
+        self._overrides = dependency_overrides or {}
+        self._steps: list[_Step] = []
+        self._initial_values: list[Any] = []
+        self._cached_steps: dict[Any, int] = {}
+        self._values = self._plan_dependencies(dependant)
+
+    def _plan_dependencies(self, dependant: Dependant) -> tuple[tuple[str, int], ...]:
+        """Add the steps resolving the sub-dependencies of ``dependant``."""
+        arguments = []
+        for sub_dependant in dependant.dependencies:
+            call = sub_dependant.call
+            assert call is not None
+            use_sub_dependant = sub_dependant
+            if call in self._overrides:
+                call = self._overrides[call]
+                use_sub_dependant = get_dependant(
+                    path=sub_dependant.path or "/",
+                    call=call,
+                    name=sub_dependant.name,
+                    scope=sub_dependant.scope,
+                )
+
+            cache_key = use_sub_dependant.cache_key
+            if use_sub_dependant.use_cache and cache_key in self._cached_steps:
+                index = self._cached_steps[cache_key]
+            else:
+                index = self._add_step(call, use_sub_dependant)
+                if use_sub_dependant.use_cache:
+                    self._cached_steps[cache_key] = index
+
+            if sub_dependant.name is not None:
+                arguments.append((sub_dependant.name, index))
+        return tuple(arguments)
+
+    def _add_step(self, call: Callable[..., Any], dependant: Dependant) -> int:
+        arguments = self._plan_dependencies(dependant)
+        value = None
+        if isinstance(call, LongLived):
+            kind = _Kind.VALUE
+            value = call.value
+        elif dependant.is_async_gen_callable:
+            kind = _Kind.ASYNC_GEN
+        elif dependant.is_gen_callable:
+            kind = _Kind.GEN
+        elif dependant.is_coroutine_callable:
+            kind = _Kind.COROUTINE
+        else:
+            kind = _Kind.SYNC
+        self._steps.append(_Step(call, kind, arguments))
+        self._initial_values.append(value)
+        return len(self._steps) - 1
+
+    async def solve(self) -> tuple[dict[str, Any], AsyncExitStack]:
+        """Resolve the dependencies for one execution.
+
+        Returns:
+            Tuple of (resolved kwargs dict, async exit stack). The exit stack
+            holds the per-execution resources (e.g. DB transactions) and must
+            be closed once the task has run. If a dependency fails, those
+            already entered are closed before the exception propagates.
+
+        """
+        values = list(self._initial_values)
+        async_exit_stack = AsyncExitStack()
+        try:
+            for index, step in enumerate(self._steps):
+                if step.kind is _Kind.VALUE:
+                    continue
+                kwargs = {name: values[i] for name, i in step.arguments}
+                if step.kind is _Kind.ASYNC_GEN:
+                    values[index] = await async_exit_stack.enter_async_context(
+                        asynccontextmanager(step.call)(**kwargs)
+                    )
+                elif step.kind is _Kind.GEN:
+                    values[index] = await async_exit_stack.enter_async_context(
+                        contextmanager_in_threadpool(step.call(**kwargs))
+                    )
+                elif step.kind is _Kind.COROUTINE:
+                    values[index] = await step.call(**kwargs)
+                else:
+                    values[index] = await run_in_threadpool(step.call, **kwargs)
+        except BaseException:
+            await async_exit_stack.aclose()
+            raise
+        return {name: values[i] for name, i in self._values}, async_exit_stack
+
 
 async def solve_task_dependencies(
     *,
@@ -20,83 +163,13 @@ async def solve_task_dependencies(
     objects since we're running in a background worker.
 
     If the callable has a pre-computed ``_dependant`` attribute (set by
-    ``wrap_task``), it is reused to avoid repeated reflection.
+    ``wrap_task``), it is reused to avoid repeated reflection. Callers
+    resolving the dependencies of the same task repeatedly should keep a
+    ``ResolutionPlan`` instead, as the worker does.
 
     Returns:
         Tuple of (resolved kwargs dict, async exit stack).
 
     """
     dependant = getattr(call, "_dependant", None) or get_dependant(path="/", call=call)
-
-    dependency_cache: dict[Any, Any] = {}
-    async_exit_stack = AsyncExitStack()
-
-    values = await _resolve_dependant(
-        dependant=dependant,
-        dependency_overrides=dependency_overrides or {},
-        dependency_cache=dependency_cache,
-        async_exit_stack=async_exit_stack,
-    )
-
-    return values, async_exit_stack
-
-
-async def _resolve_dependant(
-    *,
-    dependant: Dependant,
-    dependency_overrides: dict[Callable[..., Any], Callable[..., Any]],
-    dependency_cache: dict[Any, Any],
-    async_exit_stack: AsyncExitStack,
-) -> dict[str, Any]:
-    """Recursively resolve a dependant and its sub-dependencies."""
-    values: dict[str, Any] = {}
-
-    for sub_dependant in dependant.dependencies:
-        call = sub_dependant.call
-        use_sub_dependant = sub_dependant
-
-        if call in dependency_overrides:
-            override_call = dependency_overrides[call]
-            use_path = sub_dependant.path or "/"
-            use_sub_dependant = get_dependant(
-                path=use_path,
-                call=override_call,
-                name=sub_dependant.name,
-                scope=sub_dependant.scope,
-            )
-            call = override_call
-
-        # Check cache
-        if (
-            use_sub_dependant.use_cache
-            and use_sub_dependant.cache_key in dependency_cache
-        ):
-            solved = dependency_cache[use_sub_dependant.cache_key]
-        else:
-            # Recursively resolve sub-dependencies
-            sub_values = await _resolve_dependant(
-                dependant=use_sub_dependant,
-                dependency_overrides=dependency_overrides,
-                dependency_cache=dependency_cache,
-                async_exit_stack=async_exit_stack,
-            )
-
-            if use_sub_dependant.is_async_gen_callable:
-                cm = asynccontextmanager(call)(**sub_values)
-                solved = await async_exit_stack.enter_async_context(cm)
-            elif use_sub_dependant.is_gen_callable:
-                solved = await async_exit_stack.enter_async_context(
-                    contextmanager_in_threadpool(call(**sub_values))
-                )
-            elif use_sub_dependant.is_coroutine_callable:
-                solved = await call(**sub_values)
-            else:
-                solved = await run_in_threadpool(call, **sub_values)
-
-            if use_sub_dependant.use_cache:
-                dependency_cache[use_sub_dependant.cache_key] = solved
-
-        if sub_dependant.name is not None:
-            values[sub_dependant.name] = solved
-
-    return values
+    return await ResolutionPlan(dependant, dependency_overrides).solve()
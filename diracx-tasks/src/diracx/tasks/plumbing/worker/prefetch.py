@@ -0,0 +1,87 @@
+"""Sizing of the reads made by the worker prefetcher."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Callable
+
+from ..enums import Size
+
+#: Upper bound on the number of messages read at once, per worker size. Small
+#: tasks are cheap, so reading many of them at once saves round trips, while
+#: large tasks would otherwise be owned by a worker long before it can start
+#: them, instead of being picked up by another idle worker.
+MAX_READ_COUNT = {
+    Size.SMALL: 100,
+    Size.MEDIUM: 20,
+    Size.LARGE: 2,
+}
+
+
+class AdaptivePrefetch:
+    """Pick how many messages the prefetcher reads from the broker at once.
+
+    A read asks for as many messages as there are free runner slots, less the
+    messages already waiting for one, plus the number of tasks the runner is
+    expected to complete in the next ``window`` seconds according to the
+    moving average of the execution time of each stream. The slowest stream
+    is used so that slow tasks are never over-prefetched, and the count is
+    capped by ``MAX_READ_COUNT`` for the worker's size. When there is no room
+    for any message, ``next_read_count`` waits until a task finishes.
+
+    With ``capacity`` set to None (unbounded concurrency) every read uses the
+    cap.
+    """
+
+    def __init__(
+        self,
+        capacity: int | None,
+        worker_size: Size,
+        *,
+        window: float = 0.1,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.capacity = capacity
+        self.max_count = MAX_READ_COUNT[worker_size]
+        self.window = window
+        self.smoothing = smoothing
+        self.running = 0
+        self._execution_times: dict[str, float] = {}
+        self._task_finished = asyncio.Event()
+
+    def started(self) -> None:
+        """Record that a task started running."""
+        self.running += 1
+
+    def finished(self, stream: str, execution_time: float) -> None:
+        """Record that a task of ``stream`` ran for ``execution_time`` seconds."""
+        self.running -= 1
+        previous = self._execution_times.get(stream)
+        if previous is None:
+            self._execution_times[stream] = execution_time
+        else:
+            self._execution_times[stream] = previous + self.smoothing * (
+                execution_time - previous
+            )
+        self._task_finished.set()
+
+    def read_count(self, queued: int = 0) -> int:
+        """Return how many messages to read, given ``queued`` ones not started.
+
+        Zero means that no message should be read for now.
+        """
+        if self.capacity is None:
+            return self.max_count
+        count = self.capacity - self.running - queued
+        if self._execution_times:
+            slowest = max(self._execution_times.values())
+            # Tasks completing within the window free their slots for more
+            count += int(self.capacity * self.window / max(slowest, 1e-3))
+        return min(max(count, 0), self.max_count)
+
+    async def next_read_count(self, queued: Callable[[], int]) -> int:
+        """Wait until there is room for messages and return how many to read."""
+        while (count := self.read_count(queued())) == 0:
+            self._task_finished.clear()
+            await self._task_finished.wait()
+        return count
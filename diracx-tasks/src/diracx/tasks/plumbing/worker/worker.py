@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import os
+import random
 from datetime import UTC, datetime, timedelta
 from time import time
 from typing import Any, Awaitable, Callable
@@ -13,12 +16,15 @@ from redis.asyncio import Redis
 from .._redis_types import CallbackRegistry, LockCoordinator
 from ..base_task import BaseTask
 from ..broker.models import ReceivedMessage, TaskMessage, TaskResult
-from ..broker.redis_streams import RedisStreamBroker
+from ..broker.redis_streams import RedisStreamBroker, stream_name_for
 from ..callbacks import fire_callback, on_child_complete
+from ..enums import Priority, Size
 from ..exceptions import UnableToAcquireLockError
 from ..persistence.dlq import TaskDB
-from ..scheduler.scheduler import schedule_delayed
-from .di_resolver import solve_task_dependencies
+from ..scheduler.scheduler import park_until_released, schedule_delayed
+from .cpu_lane import CpuBoundLane
+from .di_resolver import ResolutionPlan
+from .prefetch import AdaptivePrefetch
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +43,37 @@ _task_duration = _meter.create_histogram(
     description="Duration of task execution in seconds",
     unit="s",
 )
+_lock_contention = _meter.create_counter(
+    "tasks_lock_contention_total",
+    description="Number of dequeued tasks which couldn't acquire one of their locks",
+)
+_lock_wasted_dequeues = _meter.create_counter(
+    "tasks_lock_wasted_dequeues_total",
+    description=(
+        "Number of tasks dequeued after waiting for a lock which "
+        "they still couldn't acquire"
+    ),
+)
 
 # Sentinel value to signal queue completion
 QUEUE_DONE = b"-1"
 
-# Default backoff for lock contention retries
-_LOCK_RETRY_DELAY_SECONDS = 5
+# Backoff for lock contention retries, when the lock isn't released before
+_LOCK_RETRY_BASE_DELAY_SECONDS = 1
+_LOCK_RETRY_MAX_DELAY_SECONDS = 60
+
+
+def lock_retry_delay(attempt: int) -> float:
+    """Return how long to wait before retrying to acquire a lock.
+
+    The delay doubles with each ``attempt`` (starting from 0) up to a
+    maximum, and is jittered so that tasks refused at the same time don't
+    all come back together.
+    """
+    delay = min(
+        _LOCK_RETRY_MAX_DELAY_SECONDS, _LOCK_RETRY_BASE_DELAY_SECONDS * 2**attempt
+    )
+    return delay * random.uniform(0.5, 1)  # noqa: S311
 
 
 async def _message_heartbeat(
@@ -76,13 +107,24 @@ class Worker:
     places them into an internal ``asyncio.Queue``.  When ``max_prefetch``
     is set, a semaphore limits how far ahead the prefetcher can read,
     providing backpressure so we don't buffer unbounded messages in memory.
+    Unless ``adaptive_prefetch`` is disabled, the number of messages read
+    from Redis at once follows the free runner slots and the observed
+    execution time of the tasks, see ``AdaptivePrefetch``.
 
     **runner** — pulls messages from the queue, resolves FastAPI-style
-    dependencies via ``solve_task_dependencies``, executes the task
+    dependencies with the task's ``ResolutionPlan``, executes the task
     function, persists the result to the result backend, and finally
     acknowledges the message.  ``max_concurrent_tasks`` controls how
     many tasks execute in parallel (also semaphore-gated).
 
+    Tasks declared ``cpu_bound`` execute in a ``CpuBoundLane``, a pool of
+    ``max_cpu_bound_tasks`` processes (by default one per CPU), so that they
+    don't block the event loop, and with it the prefetcher, the heartbeats
+    and the other tasks.
+
+    The resolution plans are built when the worker starts listening, from
+    the broker's ``dependency_overrides`` which must be complete by then.
+
     On failure, the worker consults the task's ``retry_policy`` to decide
     whether to reschedule via the delayed ZSET or persist to the dead letter queue.
 
@@ -104,6 +146,8 @@ class Worker:
         max_concurrent_tasks: int = 10,
         max_prefetch: int = 0,
         task_db: TaskDB | None = None,
+        adaptive_prefetch: bool = True,
+        max_cpu_bound_tasks: int | None = None,
     ) -> None:
         self.broker = broker
         self.task_registry = task_registry
@@ -131,9 +175,24 @@ class Worker:
         if max_prefetch > 0:
             self.sem_prefetch = asyncio.Semaphore(max_prefetch)
 
+        self.prefetch: AdaptivePrefetch | None = None
+        if adaptive_prefetch:
+            self.prefetch = AdaptivePrefetch(
+                max_concurrent_tasks if max_concurrent_tasks > 0 else None,
+                broker.worker_size,
+            )
+
+        self.cpu_lane: CpuBoundLane | None = None
+        if any(cls.cpu_bound for cls in task_class_registry.values()):
+            self.cpu_lane = CpuBoundLane(max_cpu_bound_tasks or os.cpu_count() or 1)
+
+        self._resolution_plans: dict[str, ResolutionPlan] = {}
+
     async def listen(self, finish_event: asyncio.Event) -> None:
         """Start the prefetcher and runner tasks."""
         await self.broker.startup()
+        for task_name, task_func in self.task_registry.items():
+            self._resolution_plan(task_name, task_func)
 
         logger.info("Worker started listening for tasks")
 
@@ -145,6 +204,10 @@ class Worker:
         await asyncio.gather(prefetcher_task, runner_task)
 
         logger.info("Worker shutting down")
+        # Send the acknowledgements of the last tasks, which are batched
+        await self.broker.acks.drain()
+        if self.cpu_lane is not None:
+            self.cpu_lane.shutdown()
 
     async def prefetcher(
         self,
@@ -158,7 +221,12 @@ class Worker:
         in a task so we can poll it with a timeout — otherwise we'd
         block forever and never notice finish_event.
         """
-        iterator = self.broker.listen()
+        read_count: Callable[[], Awaitable[int]] | None = None
+        if self.prefetch is not None:
+            # Messages waiting in the queue will take the free slots first
+            read_count = functools.partial(self.prefetch.next_read_count, queue.qsize)
+
+        iterator = self.broker.listen(read_count)
         # Kick off the first read from the broker as a background task
         current_message_task = asyncio.create_task(iterator.__anext__())  # type: ignore[arg-type]
 
@@ -246,6 +314,19 @@ class Worker:
 
         logger.info("Runner stopped")
 
+    def _resolution_plan(
+        self, task_name: str, task_func: Callable[..., Any]
+    ) -> ResolutionPlan | None:
+        """Return the cached dependency resolution plan of a task, if any."""
+        plan = self._resolution_plans.get(task_name)
+        if plan is None and hasattr(task_func, "_dependant"):
+            plan = ResolutionPlan(
+                task_func._dependant,
+                self.broker.dependency_overrides,
+            )
+            self._resolution_plans[task_name] = plan
+        return plan
+
     async def _get_redis(self) -> LockCoordinator:
         """Get a Redis connection from the broker's connection pool."""
         return Redis(connection_pool=self.broker.connection_pool)
@@ -291,6 +372,9 @@ class Worker:
                 _message_heartbeat(message.renew, heartbeat_stop, heartbeat_interval)
             )
 
+        start_time = time()
+        if self.prefetch is not None:
+            self.prefetch.started()
         try:
             result = await self.run_task(task_func, task_message)
 
@@ -300,12 +384,8 @@ class Worker:
             else:
                 await self._handle_success(task_message, result)
 
-            # Always persist the result to the backend
             try:
-                if self.broker.result_backend:
-                    await self.broker.result_backend.set_result(
-                        task_message.task_id, result
-                    )
+                await self._save_result(message, task_message, result)
             except Exception:
                 logger.exception("Failed to save result")
 
@@ -317,10 +397,40 @@ class Worker:
                     await heartbeat_task
                 except asyncio.CancelledError:
                     pass
+            if self.prefetch is not None:
+                stream = stream_name_for(
+                    task_message.labels.get("priority", Priority.NORMAL),
+                    task_message.labels.get("size", Size.MEDIUM),
+                )
+                self.prefetch.finished(stream, time() - start_time)
 
         if isinstance(message, ReceivedMessage):
             await message.ack()
 
+    async def _save_result(
+        self,
+        message: bytes | ReceivedMessage,
+        task_message: TaskMessage,
+        result: TaskResult[Any],
+    ) -> None:
+        """Save the result of a task to the result backend, if any.
+
+        The results of received messages are written along with their
+        acknowledgement. Successful results of None are skipped for the task
+        classes which don't store them.
+        """
+        backend = self.broker.result_backend
+        if backend is None:
+            return
+        if not result.is_err and result.return_value is None:
+            task_cls = self.task_class_registry.get(task_message.task_name)
+            if task_cls is not None and not task_cls.store_void_results:
+                return
+        if isinstance(message, ReceivedMessage):
+            backend.buffer_result(task_message.task_id, result)
+        else:
+            await backend.set_result(task_message.task_id, result)
+
     async def _handle_failure(
         self,
         task_message: TaskMessage,
@@ -364,8 +474,12 @@ class Worker:
         attempt: int,
     ) -> None:
         """Reschedule a failed task via the delayed ZSET."""
-        # Build a new TaskMessage with incremented retry attempt
-        retry_labels = {**task_message.labels, "_retry_attempt": attempt}
+        # Build a new TaskMessage with incremented retry attempt. Waiting for
+        # locks starts again from the shortest delay.
+        retry_labels = {
+            **{k: v for k, v in task_message.labels.items() if k != "_lock_attempt"},
+            "_retry_attempt": attempt,
+        }
         retry_task_message = TaskMessage(
             task_id=self.broker.id_generator(),
             task_name=task_message.task_name,
@@ -462,11 +576,49 @@ class Worker:
     async def _handle_lock_retry(
         self,
         task_message: TaskMessage,
+        lock_key: str | None,
     ) -> None:
-        """Reschedule a task that couldn't acquire a lock."""
-        retry_at = datetime.now(tz=UTC) + timedelta(seconds=_LOCK_RETRY_DELAY_SECONDS)
-        attempt = task_message.labels.get("_retry_attempt", 0)
-        await self._schedule_retry(task_message, retry_at, attempt)
+        """Reschedule a task that couldn't acquire the lock ``lock_key``.
+
+        The task waits for the lock to be released, or for a delay which
+        grows with the number of times it was refused the lock, whichever
+        comes first. Its retry budget isn't used.
+        """
+        attempt = task_message.labels.get("_lock_attempt", 0)
+        attrs = {"task_name": task_message.task_name, "lock_key": str(lock_key)}
+        _lock_contention.add(1, attributes=attrs)
+        if attempt:
+            _lock_wasted_dequeues.add(1, attributes=attrs)
+
+        delay = lock_retry_delay(attempt)
+        retry_at = datetime.now(tz=UTC) + timedelta(seconds=delay)
+        retry_task_message = TaskMessage(
+            task_id=self.broker.id_generator(),
+            task_name=task_message.task_name,
+            labels={**task_message.labels, "_lock_attempt": attempt + 1},
+            task_args=task_message.task_args,
+            task_kwargs=task_message.task_kwargs,
+        )
+        try:
+            redis = await self._get_redis()
+            async with redis:
+                if lock_key is None:
+                    await schedule_delayed(redis, retry_task_message, retry_at)
+                else:
+                    await park_until_released(
+                        redis, retry_task_message, lock_key, retry_at
+                    )
+            logger.info(
+                "Task %s waits for lock %s, at most %.1fs",
+                task_message.task_name,
+                lock_key,
+                delay,
+            )
+        except Exception:
+            logger.exception(
+                "Failed to reschedule task %s waiting for a lock",
+                task_message.task_name,
+            )
 
     async def run_task(
         self,
@@ -476,7 +628,7 @@ class Worker:
         """Execute a task function with dependency resolution.
 
         Resolves FastAPI-style dependencies (declared via ``Depends``)
-        through ``solve_task_dependencies``, merges them with the
+        with the task's cached ``ResolutionPlan``, merges them with the
         kwargs from the message, and calls the task.  Returns a
         ``TaskResult`` wrapping either the return value or the
         exception.
@@ -532,11 +684,9 @@ class Worker:
         async_exit_stack = None
 
         try:
-            if hasattr(task_func, "_dependant"):
-                dep_kwargs, async_exit_stack = await solve_task_dependencies(
-                    call=task_func,
-                    dependency_overrides=self.broker.dependency_overrides,
-                )
+            plan = self._resolution_plan(task_message.task_name, task_func)
+            if plan is not None:
+                dep_kwargs, async_exit_stack = await plan.solve()
 
             # Obtain a Redis connection for lock acquisition
             redis = await self._get_redis()
@@ -545,16 +695,19 @@ class Worker:
                     **dep_kwargs,
                     **task_message.task_kwargs,
                 }
+                task_cls = self.task_class_registry.get(task_message.task_name)
+                if self.cpu_lane is not None and task_cls and task_cls.cpu_bound:
+                    all_kwargs["_cpu_lane"] = self.cpu_lane
                 returned = await task_func(
                     *task_message.task_args, _redis=redis, **all_kwargs
                 )
 
-        except UnableToAcquireLockError:
+        except UnableToAcquireLockError as exc:
             logger.info(
                 "Lock contention for task %s, rescheduling",
                 task_message.task_name,
             )
-            await self._handle_lock_retry(task_message)
+            await self._handle_lock_retry(task_message, exc.lock_key)
             # Return a non-error result so process_message doesn't
             # double-handle this as a failure
             return TaskResult.from_value(
@@ -132,6 +132,12 @@ def main() -> None:
         required=True,
         help="Maximum number of tasks to run concurrently (default: 10)",
     )
+    worker_parser.add_argument(
+        "--max-cpu-bound-tasks",
+        type=int,
+        default=None,
+        help="Number of processes running CPU-bound tasks (default: one per CPU)",
+    )
     worker_parser.add_argument(
         "--redis-url",
         type=str,
@@ -151,6 +157,7 @@ def main() -> None:
                 redis_url=_get_redis_url(args),
                 max_concurrent_tasks=args.max_concurrent_tasks,
                 worker_size=args.worker_size,
+                max_cpu_bound_tasks=args.max_cpu_bound_tasks,
             )
         )
     )
@@ -177,6 +184,7 @@ async def start_worker(
     redis_url: str,
     max_concurrent_tasks: int,
     worker_size: str,
+    max_cpu_bound_tasks: int | None = None,
 ) -> None:
     """Start a worker to execute tasks from the broker."""
     from .plumbing.broker import RedisStreamBroker
@@ -190,7 +198,13 @@ async def start_worker(
     from .plumbing.worker import Worker
 
     size = Size(worker_size)
-    broker = RedisStreamBroker(url=redis_url, worker_size=size)
+    broker = RedisStreamBroker(
+        url=redis_url,
+        worker_size=size,
+        stream_weights=_factory_settings.tasks_stream_weights,
+        strict_priority=_factory_settings.tasks_strict_priority,
+        work_stealing=_factory_settings.tasks_work_stealing,
+    )
     task_classes = load_task_registry()
     task_bindings, wrapped_registry = create_task_bindings(broker, task_classes)
     BaseTask.bind_broker(task_bindings)
@@ -222,6 +236,7 @@ async def start_worker(
                     task_registry=wrapped_registry,
                     task_class_registry=task_classes,
                     max_concurrent_tasks=max_concurrent_tasks,
+                    max_cpu_bound_tasks=max_cpu_bound_tasks,
                     task_db=task_db,
                 )
                 await worker.listen(finish_event)
@@ -231,6 +246,7 @@ async def start_worker(
                 task_registry=wrapped_registry,
                 task_class_registry=task_classes,
                 max_concurrent_tasks=max_concurrent_tasks,
+                max_cpu_bound_tasks=max_cpu_bound_tasks,
             )
             await worker.listen(finish_event)
 
@@ -245,11 +261,15 @@ async def start_scheduler(redis_url: str) -> None:
     task_classes = load_task_registry()
 
     config = None
+    config_source = None
     config_url = _factory_settings.config_backend_url
     if config_url:
         from diracx.core.config import ConfigSource
 
-        config_source = ConfigSource.create_from_url(backend_url=config_url)
+        config_source = ConfigSource.create_from_url(
+            backend_url=config_url,
+            snapshot_dir=_factory_settings.config_snapshot_dir,
+        )
         config = config_source.read()
 
     scheduler = TaskScheduler(
@@ -257,6 +277,7 @@ async def start_scheduler(redis_url: str) -> None:
         redis_url=redis_url,
         task_registry=task_classes,
         config=config,
+        config_source=config_source,
     )
 
     await scheduler.startup()
@@ -0,0 +1,97 @@
+"""Tests for the config revision announcements over Redis pub/sub."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from diracx.core.sources import DEFAULT_CS_REV_CACHE_SOFT_TTL, CacheableSource
+from diracx.tasks.plumbing.config_notifications import (
+    CONFIG_REVISION_CHANNEL,
+    NOTIFIED_POLL_INTERVAL_SECONDS,
+    listen_for_config_revisions,
+)
+from diracx.tasks.plumbing.scheduler import TaskScheduler
+
+
+class FakeSource(CacheableSource[SimpleNamespace]):
+    def __init__(self):
+        super().__init__()
+        self.revision = "rev-1"
+
+    def latest_revision(self) -> tuple[str, datetime]:
+        return self.revision, datetime.now(tz=UTC)
+
+    def read_raw(self, hexsha: str, modified: datetime) -> SimpleNamespace:
+        return SimpleNamespace(_hexsha=hexsha)
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def poll_interval(source: CacheableSource) -> float:
+    return source._revision_cache.soft_cache.ttl
+
+
+async def test_listen_for_config_revisions():
+    redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+    source = FakeSource()
+    assert source.read()._hexsha == "rev-1"
+    assert poll_interval(source) == DEFAULT_CS_REV_CACHE_SOFT_TTL
+
+    task = asyncio.create_task(listen_for_config_revisions(redis, source))
+    try:
+        await wait_for(lambda: poll_interval(source) == NOTIFIED_POLL_INTERVAL_SECONDS)
+        await wait_for(lambda: not source._revision_cache.futures)
+
+        # Without an announcement the new revision isn't seen for a long time
+        source.revision = "rev-2"
+        assert source.read()._hexsha == "rev-1"
+
+        assert await redis.publish(CONFIG_REVISION_CHANNEL, "rev-2") == 1
+        await wait_for(lambda: source.read()._hexsha == "rev-2")
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await redis.aclose()
+
+
+async def test_scheduler_announces_new_revisions(broker):
+    server = fakeredis.FakeServer()
+    redis = fakeredis.aioredis.FakeRedis(server=server)
+    source = FakeSource()
+    source.read()
+    scheduler = TaskScheduler(
+        broker=broker,
+        redis_url="redis://fake",
+        config=SimpleNamespace(_hexsha="rev-1"),
+        config_source=source,
+        connection_class=fakeredis.aioredis.FakeConnection,
+        server=server,
+    )
+    async with redis.pubsub() as pubsub:
+        await pubsub.subscribe(CONFIG_REVISION_CHANNEL)
+        await pubsub.get_message(timeout=1)
+
+        # Nothing is announced while the revision doesn't change
+        await scheduler._update_config()
+        assert await pubsub.get_message(timeout=0.1) is None
+
+        source.revision = "rev-2"
+        source.refresh()
+        await wait_for(lambda: not source._revision_cache.futures)
+        await scheduler._update_config()
+        message = await pubsub.get_message(timeout=1)
+        assert message["data"] == b"rev-2"
+        assert scheduler._config._hexsha == "rev-2"
+    await scheduler.connection_pool.disconnect()
+    await redis.aclose()
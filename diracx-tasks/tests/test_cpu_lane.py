@@ -0,0 +1,151 @@
+"""Tests for the execution of CPU-bound tasks in a process pool."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+
+from diracx.tasks.plumbing.base_task import BaseTask
+from diracx.tasks.plumbing.depends import Config
+from diracx.tasks.plumbing.factory import task_wrapper, wrap_task
+from diracx.tasks.plumbing.lock_registry import TASK
+from diracx.tasks.plumbing.locks import BaseLock, MutexLock
+from diracx.tasks.plumbing.worker.cpu_lane import CpuBoundLane
+from diracx.tasks.plumbing.worker.worker import Worker
+
+from .conftest import SuccessTask
+
+
+class CpuTask(BaseTask):
+    cpu_bound = True
+
+    @property
+    def execution_locks(self) -> list[BaseLock]:
+        return [MutexLock(TASK, "CpuTask")]
+
+    def execute(self, **kwargs: Any) -> int:
+        return threading.get_ident()
+
+
+class FakeLane:
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, task_name, func):
+        self.calls.append(task_name)
+        return func()
+
+
+@pytest.fixture
+def lane():
+    lane = CpuBoundLane(1)
+    yield lane
+    lane.shutdown()
+
+
+async def test_lane_runs_in_another_process(lane):
+    assert await lane.run("test", os.getpid) != os.getpid()
+
+
+async def test_lane_does_not_block_the_event_loop(lane):
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    # Start the process first so that spawning it isn't part of the test
+    await lane.run("test", os.getpid)
+    ticker = asyncio.create_task(tick())
+    start = time.monotonic()
+    await lane.run("test", functools.partial(sum, range(20_000_000)))
+    elapsed = time.monotonic() - start
+    ticker.cancel()
+    assert ticks >= elapsed / 0.01 / 2
+
+
+async def test_lane_bounds_concurrency(lane):
+    await lane.run("test", os.getpid)
+    start = time.monotonic()
+    await asyncio.gather(
+        *(lane.run("test", functools.partial(time.sleep, 0.2)) for _ in range(2))
+    )
+    assert time.monotonic() - start >= 0.4
+
+
+def test_lane_needs_a_process():
+    with pytest.raises(ValueError, match="at least 1"):
+        CpuBoundLane(0)
+
+
+def test_cpu_bound_execute_cannot_be_async():
+    class AsyncCpuTask(BaseTask):
+        cpu_bound = True
+
+        async def execute(self, **kwargs: Any) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="can't be async"):
+        wrap_task(AsyncCpuTask)
+    wrap_task(CpuTask)
+
+
+class DependentCpuTask(BaseTask):
+    cpu_bound = True
+
+    def execute(self, config: Config, **kwargs: Any) -> Any:
+        return config
+
+
+async def test_cpu_bound_dependencies_are_sent_to_the_lane():
+    wrap_task(DependentCpuTask)
+    mock_redis = AsyncMock()
+    fake_lane = FakeLane()
+
+    result = await task_wrapper(
+        DependentCpuTask, _redis=mock_redis, _cpu_lane=fake_lane, config={"a": 1}
+    )
+    assert result == {"a": 1}
+
+    # Values which can't be pickled, e.g. DB connections, are refused
+    with pytest.raises(TypeError, match="dependency 'config' \\(lock\\)"):
+        await task_wrapper(
+            DependentCpuTask,
+            _redis=mock_redis,
+            _cpu_lane=fake_lane,
+            config=threading.Lock(),
+        )
+    assert fake_lane.calls == ["DependentCpuTask"]
+
+
+async def test_task_wrapper_sends_cpu_bound_tasks_to_the_lane():
+    mock_redis = AsyncMock()
+    mock_redis.eval = AsyncMock(return_value=0)
+    fake_lane = FakeLane()
+
+    await task_wrapper(CpuTask, _redis=mock_redis, _cpu_lane=fake_lane)
+    assert fake_lane.calls == ["CpuTask"]
+    # Locks are acquired and released by the calling process
+    assert mock_redis.eval.call_count == 2
+
+    # Without a lane (e.g. interactively) execute() runs in a thread
+    thread_id = await task_wrapper(CpuTask, _redis=mock_redis)
+    assert thread_id != threading.get_ident()
+
+
+async def test_worker_creates_a_lane_for_cpu_bound_tasks(broker):
+    worker = Worker(broker, {}, {"test:SuccessTask": SuccessTask})
+    assert worker.cpu_lane is None
+
+    worker = Worker(broker, {}, {"test:CpuTask": CpuTask}, max_cpu_bound_tasks=3)
+    assert worker.cpu_lane is not None
+    assert worker.cpu_lane.max_workers == 3
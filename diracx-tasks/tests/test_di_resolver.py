@@ -0,0 +1,209 @@
+"""Tests for the resolution of task dependencies."""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import time
+from typing import Annotated, Any
+
+import pytest
+from fastapi import Depends
+
+from diracx.tasks.plumbing.base_task import BaseTask
+from diracx.tasks.plumbing.enums import Priority, Size
+from diracx.tasks.plumbing.factory import wrap_task
+from diracx.tasks.plumbing.worker import di_resolver
+from diracx.tasks.plumbing.worker.di_resolver import (
+    LongLived,
+    ResolutionPlan,
+    solve_task_dependencies,
+)
+
+events: list[str] = []
+
+
+class Settings:
+    pass
+
+
+def get_settings() -> Settings:
+    raise NotImplementedError("Must be overridden")
+
+
+async def get_counter() -> list[int]:
+    return []
+
+
+async def get_transaction(counter: Annotated[list[int], Depends(get_counter)]):
+    events.append("enter")
+    counter.append(1)
+    try:
+        yield counter
+    finally:
+        events.append("exit")
+
+
+def get_other_settings() -> Settings:
+    return Settings()
+
+
+def get_sync_value(counter: Annotated[list[int], Depends(get_counter)]) -> int:
+    counter.append(2)
+    return len(counter)
+
+
+async def get_failing() -> None:
+    raise RuntimeError("Dependency failed")
+
+
+@dataclasses.dataclass
+class DependentTask(BaseTask):
+    priority = Priority.NORMAL
+    size = Size.SMALL
+
+    async def execute(
+        self,
+        settings: Annotated[Settings, Depends(get_settings)],
+        transaction: Annotated[list[int], Depends(get_transaction)],
+        sync_value: Annotated[int, Depends(get_sync_value)],
+        counter: Annotated[list[int], Depends(get_counter)],
+        **kwargs: Any,
+    ) -> Any:
+        return settings, transaction, sync_value, counter
+
+
+@dataclasses.dataclass
+class FailingDependencyTask(BaseTask):
+    priority = Priority.NORMAL
+    size = Size.SMALL
+
+    async def execute(
+        self,
+        transaction: Annotated[list[int], Depends(get_transaction)],
+        failing: Annotated[None, Depends(get_failing)],
+        **kwargs: Any,
+    ) -> Any:
+        return None
+
+
+@pytest.fixture(autouse=True)
+def clear_events():
+    events.clear()
+    yield
+    events.clear()
+
+
+async def test_plan_resolves_like_solve_task_dependencies():
+    wrapped = wrap_task(DependentTask)
+    overrides = {get_settings: LongLived(Settings())}
+    plan = ResolutionPlan(wrapped._dependant, overrides)
+
+    for solve in (
+        plan.solve,
+        lambda: solve_task_dependencies(call=wrapped, dependency_overrides=overrides),
+    ):
+        values, stack = await solve()
+        assert values["settings"] is overrides[get_settings].value
+        # get_counter is cached, so all the dependencies share one list
+        assert values["transaction"] is values["counter"]
+        assert values["counter"] == [1, 2]
+        assert values["sync_value"] == 2
+        assert events == ["enter"]
+        await stack.aclose()
+        assert events == ["enter", "exit"]
+        events.clear()
+
+
+async def test_plan_resolves_per_execution_dependencies_each_time():
+    calls = 0
+
+    def get_fresh_settings() -> Settings:
+        nonlocal calls
+        calls += 1
+        return Settings()
+
+    wrapped = wrap_task(DependentTask)
+    long_lived = ResolutionPlan(
+        wrapped._dependant, {get_settings: LongLived(Settings())}
+    )
+    per_execution = ResolutionPlan(
+        wrapped._dependant, {get_settings: get_fresh_settings}
+    )
+
+    first, first_stack = await long_lived.solve()
+    second, second_stack = await long_lived.solve()
+    assert first["settings"] is second["settings"]
+    # Other dependencies aren't shared between executions
+    assert first["counter"] is not second["counter"]
+    assert events == ["enter", "enter"]
+    await second_stack.aclose()
+    await first_stack.aclose()
+    assert events == ["enter", "enter", "exit", "exit"]
+
+    for _ in range(2):
+        _, stack = await per_execution.solve()
+        await stack.aclose()
+    assert calls == 2
+
+
+async def test_plan_closes_resources_when_a_dependency_fails():
+    plan = ResolutionPlan(wrap_task(FailingDependencyTask)._dependant)
+    with pytest.raises(RuntimeError, match="Dependency failed"):
+        await plan.solve()
+    assert events == ["enter", "exit"]
+
+
+async def test_plan_doesnt_inspect_the_dependencies_again(monkeypatch):
+    wrapped = wrap_task(DependentTask)
+    plan = ResolutionPlan(wrapped._dependant, {get_settings: get_other_settings})
+
+    calls = 0
+    real_get_dependant = di_resolver.get_dependant
+
+    def counted_get_dependant(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return real_get_dependant(*args, **kwargs)
+
+    monkeypatch.setattr(di_resolver, "get_dependant", counted_get_dependant)
+    for _ in range(3):
+        _, stack = await plan.solve()
+        await stack.aclose()
+    assert calls == 0
+
+    # Without a plan, the overrides are inspected for every execution
+    _, stack = await solve_task_dependencies(
+        call=wrapped, dependency_overrides={get_settings: get_other_settings}
+    )
+    await stack.aclose()
+    assert calls == 1
+
+
+@pytest.mark.benchmark
+async def test_resolution_plan_benchmark():
+    """Compare the per-task cost of resolving the dependencies of a task."""
+    wrapped = wrap_task(DependentTask)
+    overrides = {get_settings: LongLived(Settings())}
+    n_executions = 500
+
+    async def run(solve):
+        start = time.perf_counter()
+        for _ in range(n_executions):
+            _, stack = await solve()
+            await stack.aclose()
+        return (time.perf_counter() - start) / n_executions
+
+    plan = ResolutionPlan(wrapped._dependant, overrides)
+    results = {
+        "per message": await run(
+            lambda: solve_task_dependencies(
+                call=wrapped, dependency_overrides=overrides
+            )
+        ),
+        "cached plan": await run(plan.solve),
+    }
+    for name, seconds in results.items():
+        logging.getLogger(__name__).info(
+            "Dependency resolution with a %s: %.1f µs per task", name, seconds * 1e6
+        )
@@ -0,0 +1,151 @@
+"""Tests for the dead letter queue replay."""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import UTC, datetime
+
+import msgpack
+import pytest
+from sqlalchemy import func, insert, select
+
+from diracx.tasks.plumbing.persistence.dlq import (
+    DeadLetterQueue,
+    DLQStatus,
+    TaskDB,
+    _dlq_task_message,
+    replay_dlq_tasks,
+)
+
+from .conftest import get_enqueued_messages
+
+
+@pytest.fixture
+async def task_db():
+    task_db = TaskDB("sqlite+aiosqlite:///:memory:")
+    async with task_db.engine_context():
+        async with task_db.engine.begin() as conn:
+            await conn.run_sync(task_db.metadata.create_all)
+        yield task_db
+
+
+def _task_args(i: int) -> bytes:
+    return msgpack.packb(
+        {
+            "task_args": [i],
+            "task_kwargs": {"vo": "lhcb"},
+            "labels": {"priority": "normal", "size": "small", "_retry_attempt": 3},
+        }
+    )
+
+
+async def _insert_tasks(task_db: TaskDB, count: int) -> None:
+    now = datetime.now(UTC)
+    async with task_db:
+        await task_db.conn.execute(
+            insert(DeadLetterQueue),
+            [
+                {
+                    "task_class": "test:SuccessTask",
+                    "task_args": _task_args(i),
+                    "submitted_at": now,
+                    "status": DLQStatus.PENDING,
+                    "retry_count": 0,
+                    "max_retries": 3,
+                }
+                for i in range(count)
+            ],
+        )
+
+
+async def _statuses(task_db: TaskDB) -> dict[str, int]:
+    async with task_db:
+        result = await task_db.conn.execute(
+            select(DeadLetterQueue.status, func.count()).group_by(
+                DeadLetterQueue.status
+            )
+        )
+        return {status: count for status, count in result}
+
+
+async def test_replay(task_db, broker, monkeypatch):
+    await _insert_tasks(task_db, 5)
+    async with task_db:
+        bad_id = await task_db.insert_dlq_task("test:SuccessTask", b"\xc1", 3)
+
+    batches = []
+    enqueue_many = broker.enqueue_many
+
+    async def counted_enqueue_many(messages):
+        batches.append(len(messages))
+        await enqueue_many(messages)
+
+    monkeypatch.setattr(broker, "enqueue_many", counted_enqueue_many)
+    assert await replay_dlq_tasks(task_db, broker, batch_size=2) == 5
+    # One pipeline per batch of 2, the undecodable task isn't enqueued
+    assert len(batches) == 3
+    assert sum(batches) == 5
+    assert await _statuses(task_db) == {
+        DLQStatus.DISPATCHED: 5,
+        DLQStatus.FAILED: 1,
+    }
+    messages = await get_enqueued_messages(broker)
+    assert sorted(m.task_args[0] for m in messages) == list(range(5))
+    assert messages[0].labels == {"priority": "normal", "size": "small"}
+    assert messages[0].task_kwargs == {"vo": "lhcb"}
+    assert len({m.task_id for m in messages}) == 5
+
+    # Nothing is left to replay, but DISPATCHED tasks can be replayed again
+    assert await replay_dlq_tasks(task_db, broker) == 0
+    assert (
+        await replay_dlq_tasks(
+            task_db, broker, batch_size=2, statuses=[DLQStatus.DISPATCHED]
+        )
+        == 5
+    )
+    async with task_db:
+        (bad,) = await task_db.claim_tasks(statuses=[DLQStatus.FAILED])
+    assert bad["id"] == bad_id
+    assert bad["last_error"] == "Cannot decode the arguments of the task"
+
+
+async def test_failed_enqueue_rolls_back_the_batch(task_db, broker, monkeypatch):
+    await _insert_tasks(task_db, 3)
+
+    async def failing_enqueue_many(messages):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(broker, "enqueue_many", failing_enqueue_many)
+    with pytest.raises(ConnectionError):
+        await replay_dlq_tasks(task_db, broker)
+    assert await _statuses(task_db) == {DLQStatus.PENDING: 3}
+
+
+@pytest.mark.benchmark
+async def test_replay_benchmark(task_db, broker):
+    """Compare replaying 100k dead-lettered tasks one by one and in batches."""
+    n_tasks = 100_000
+    n_one_by_one = 2_000
+    await _insert_tasks(task_db, n_tasks)
+
+    start = time.perf_counter()
+    async with task_db:
+        rows = await task_db.claim_tasks(batch_size=n_one_by_one)
+    for row in rows:
+        await broker.enqueue(_dlq_task_message(row, broker.id_generator()))
+        async with task_db:
+            await task_db.mark_dispatched(row["id"])
+    one_by_one = (time.perf_counter() - start) / n_one_by_one
+
+    start = time.perf_counter()
+    replayed = await replay_dlq_tasks(task_db, broker)
+    batched = (time.perf_counter() - start) / replayed
+
+    assert replayed == n_tasks - n_one_by_one
+    assert await _statuses(task_db) == {DLQStatus.DISPATCHED: n_tasks}
+    assert len(await get_enqueued_messages(broker)) == n_tasks
+    for name, seconds in {"one by one": one_by_one, "in batches": batched}.items():
+        logging.getLogger(__name__).info(
+            "Dead letter queue replay %s: %.1f µs per task", name, seconds * 1e6
+        )
@@ -0,0 +1,172 @@
+"""Tests for acquiring, extending and releasing several locks at once."""
+
+from __future__ import annotations
+
+import time
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from diracx.tasks.plumbing.lock_registry import TASK, TRANSFORMATION
+from diracx.tasks.plumbing.locks import (
+    BaseLock,
+    ConcurrencyLimiter,
+    ExclusiveRWLock,
+    MutexLock,
+    RateLimiter,
+    SharedRWLock,
+    acquire_locks,
+    extend_locks,
+    lock_waiters_key,
+    release_locks,
+)
+
+
+class LimitedRate(RateLimiter):
+    limit = 2
+    window_seconds = 60
+
+
+class LimitedConcurrency(ConcurrencyLimiter):
+    limit = 1
+
+
+class RefusingLock(BaseLock):
+    """A lock type unknown to the batch scripts."""
+
+    def __init__(self):
+        super().__init__(TASK, "refusing")
+        self.released = False
+
+    async def acquire(self, redis) -> bool:
+        return False
+
+    async def release(self, redis) -> None:
+        self.released = True
+
+
+@pytest.fixture
+async def redis():
+    async with fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()) as redis:
+        calls = 0
+        eval_ = redis.eval
+
+        async def counted_eval(*args):
+            nonlocal calls
+            calls += 1
+            return await eval_(*args)
+
+        redis.eval = counted_eval
+        redis.eval_calls = lambda: calls
+        yield redis
+
+
+def all_locks() -> list[BaseLock]:
+    return [
+        MutexLock(TASK, "mutex"),
+        ExclusiveRWLock(TRANSFORMATION, 1),
+        SharedRWLock(TRANSFORMATION, 2),
+        LimitedRate(TASK, "rate"),
+        LimitedConcurrency(TASK, "concurrency"),
+    ]
+
+
+async def test_acquire_extend_release_in_one_call(redis):
+    locks = all_locks()
+    assert await acquire_locks(redis, locks) is None
+    assert redis.eval_calls() == 1
+    assert await redis.get("lock:mutex:task:mutex") == locks[0]._owner_id.encode()
+    assert await redis.hget("lock:rw:transformation:2", "readers") == b"1"
+    assert await redis.zcard("limiter:conc:task:concurrency") == 1
+
+    # Shared locks and rate limiters have no TTL to extend
+    await redis.pexpire("lock:mutex:task:mutex", 10)
+    assert await extend_locks(redis, locks) == [True, True, False, False, True]
+    assert redis.eval_calls() == 2
+    assert await redis.pttl("lock:mutex:task:mutex") > 10
+
+    await release_locks(redis, locks)
+    assert redis.eval_calls() == 3
+    assert not await redis.exists(
+        "lock:mutex:task:mutex",
+        "lock:rw:transformation:1",
+        "lock:rw:transformation:2",
+    )
+    assert await redis.zcard("limiter:conc:task:concurrency") == 0
+
+    # The locks can be acquired again, but the rate quota isn't given back
+    locks = all_locks()
+    assert await acquire_locks(redis, locks) is None
+    await release_locks(redis, locks)
+    assert isinstance(await acquire_locks(redis, all_locks()), LimitedRate)
+
+
+async def test_acquire_is_all_or_nothing(redis):
+    other = MutexLock(TASK, "mutex")
+    assert await acquire_locks(redis, [other]) is None
+
+    # The mutex comes last, so the other locks are acquired before it fails
+    locks = all_locks()
+    locks.append(locks.pop(0))
+    assert await acquire_locks(redis, locks) is locks[-1]
+
+    # Those locks were given back, including the rate limiter quota
+    assert not await redis.exists(
+        "lock:rw:transformation:1", "lock:rw:transformation:2"
+    )
+    assert await redis.zcard("limiter:conc:task:concurrency") == 0
+    (rate_key,) = await redis.keys("limiter:rate:*")
+    assert await redis.get(rate_key) == b"0"
+    assert await redis.get("lock:mutex:task:mutex") == other._owner_id.encode()
+
+
+async def test_other_locks_are_acquired_after_the_batch(redis):
+    refusing = RefusingLock()
+    locks = [MutexLock(TASK, "mutex"), refusing]
+    assert await acquire_locks(redis, locks) is refusing
+    # The batched locks were released, the refused one wasn't acquired
+    assert not await redis.exists("lock:mutex:task:mutex")
+    assert not refusing.released
+    assert redis.eval_calls() == 2
+
+    # Disabled limiters don't need a script at all
+    assert await acquire_locks(redis, [RateLimiter(TASK, "disabled")]) is None
+    assert redis.eval_calls() == 2
+
+
+async def test_release_wakes_waiters_of_declared_keys(redis, monkeypatch):
+    locks = [MutexLock(TASK, "mutex"), SharedRWLock(TRANSFORMATION, 2)]
+    assert await acquire_locks(redis, locks) is None
+    assert await acquire_locks(redis, [SharedRWLock(TRANSFORMATION, 2)]) is None
+    for lock in locks:
+        waiters = lock_waiters_key(lock.redis_key)
+        await redis.zadd(waiters, {"first": 1, "second": 2})
+    later = time.time() + 60
+    await redis.zadd("delayed", {"first": later, "second": later})
+
+    calls = []
+    eval_ = redis.eval
+
+    async def recorded_eval(script, numkeys, *args):
+        calls.append(args[:numkeys])
+        return await eval_(script, numkeys, *args)
+
+    monkeypatch.setattr(redis, "eval", recorded_eval)
+    await release_locks(redis, locks, wake_into="delayed")
+
+    # Every key used by the script is declared, as required by Redis Cluster
+    assert calls == [
+        (
+            "lock:mutex:task:mutex",
+            "lock:rw:transformation:2",
+            "waiters:lock:mutex:task:mutex",
+            "waiters:lock:rw:transformation:2",
+            "delayed",
+        )
+    ]
+    # Only the mutex became free, the other reader still holds the shared lock
+    assert await redis.zrange("waiters:lock:mutex:task:mutex", 0, -1) == [b"second"]
+    assert await redis.zcard("waiters:lock:rw:transformation:2") == 2
+    assert await redis.zscore("delayed", "first") <= time.time()
+    assert await redis.zscore("delayed", "second") == later
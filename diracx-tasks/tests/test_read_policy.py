@@ -0,0 +1,76 @@
+"""Tests for the sharing of reads between task streams."""
+
+from __future__ import annotations
+
+from collections import Counter
+
+import pytest
+
+from diracx.tasks.plumbing.broker.read_policy import (
+    STEALABLE_SIZES,
+    DeficitRoundRobin,
+    stream_weight,
+)
+from diracx.tasks.plumbing.enums import Priority, Size
+
+
+def test_stream_weight():
+    weights = {"realtime": 8, "normal": 3, "normal:large": 5}
+    assert stream_weight(weights, Priority.REALTIME, Size.SMALL) == 8
+    assert stream_weight(weights, Priority.NORMAL, Size.SMALL) == 3
+    assert stream_weight(weights, Priority.NORMAL, Size.LARGE) == 5
+    assert stream_weight(weights, Priority.BACKGROUND, Size.SMALL) == 1
+
+
+def test_stealable_sizes_are_smaller():
+    order = [Size.SMALL, Size.MEDIUM, Size.LARGE]
+    for size, stealable in STEALABLE_SIZES.items():
+        assert all(order.index(other) < order.index(size) for other in stealable)
+
+
+@pytest.mark.parametrize("weights", [{}, {"a": 1, "b": 0}, {"a": -1}])
+def test_invalid_weights(weights):
+    with pytest.raises(ValueError, match="must be positive"):
+        DeficitRoundRobin(weights, quantum=10)
+
+
+def test_backlogged_streams_share_reads_by_weight():
+    drr = DeficitRoundRobin({"realtime": 8, "normal": 3, "background": 1}, 10)
+    served: Counter[str] = Counter()
+    for _ in range(120):
+        for stream, allowance in drr.next_round().items():
+            served[stream] += allowance
+            drr.consumed(stream, allowance, exhausted=False)
+
+    total = sum(served.values())
+    assert total == pytest.approx(1200, abs=3)
+    assert served["realtime"] / total == pytest.approx(8 / 12, abs=0.01)
+    assert served["normal"] / total == pytest.approx(3 / 12, abs=0.01)
+    # Less than one read per round, but credit accumulates until it's served
+    assert served["background"] / total == pytest.approx(1 / 12, abs=0.01)
+
+
+def test_exhausted_streams_lose_their_credit():
+    drr = DeficitRoundRobin({"busy": 1, "idle": 1}, 10)
+    for _ in range(10):
+        allowances = drr.next_round()
+        drr.consumed("busy", allowances["busy"], exhausted=False)
+        drr.consumed("idle", 0, exhausted=True)
+    # The idle stream didn't build up a burst while it was empty
+    assert drr.next_round() == {"busy": 5, "idle": 5}
+
+
+def test_partially_consumed_credit_is_kept():
+    drr = DeficitRoundRobin({"a": 1, "b": 1}, 10)
+    drr.next_round()
+    drr.consumed("a", 2, exhausted=False)
+    drr.consumed("b", 5, exhausted=False)
+    assert drr.next_round() == {"a": 8, "b": 5}
+
+
+def test_quantum_can_change_between_rounds():
+    drr = DeficitRoundRobin({"a": 3, "b": 1}, 4)
+    assert drr.next_round() == {"a": 3, "b": 1}
+    drr.consumed("a", 3, exhausted=False)
+    drr.consumed("b", 1, exhausted=False)
+    assert drr.next_round(40) == {"a": 30, "b": 10}
@@ -2,8 +2,19 @@
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+import logging
+import time
+from collections import Counter
 
+import fakeredis
+import fakeredis.aioredis
+import pytest
+import redis.exceptions
+from redis.asyncio import Redis
+
+from diracx.tasks.plumbing.broker import redis_streams
+from diracx.tasks.plumbing.broker.models import ReceivedMessage
 from diracx.tasks.plumbing.broker.redis_streams import (
     ALL_STREAM_NAMES,
     RedisStreamBroker,
@@ -30,27 +41,296 @@ def test_all_stream_names():
     assert "diracx:tasks:background:large" in ALL_STREAM_NAMES
 
 
-async def test_renew_generator_calls_xclaim() -> None:
-    broker = RedisStreamBroker("redis://example.invalid")
+class CountingConnection(fakeredis.aioredis.FakeAsyncRedisConnection):
+    """Count the requests sent to Redis, a pipeline being a single one."""
+
+    round_trips = 0
+    last_sent: bytes = b""
+
+    async def send_packed_command(self, command, check_health=True):
+        type(self).round_trips += 1
+        type(self).last_sent = b"".join(
+            [command] if isinstance(command, bytes) else command
+        )
+        await super().send_packed_command(command, check_health)
+
+
+@pytest.fixture
+async def counting_broker_factory():
+    server = fakeredis.FakeServer()
+    brokers = []
+
+    async def factory(**kwargs):
+        broker = RedisStreamBroker(
+            "redis://fake",
+            connection_class=CountingConnection,
+            server=server,
+            **kwargs,
+        )
+        await broker.startup()
+        brokers.append(broker)
+        return broker
+
+    yield factory
+    for broker in brokers:
+        await broker.shutdown()
 
-    redis_cm = AsyncMock()
-    redis = AsyncMock()
-    redis_cm.__aenter__.return_value = redis
-    redis_cm.__aexit__.return_value = False
 
-    with patch(
-        "diracx.tasks.plumbing.broker.redis_streams.Redis", return_value=redis_cm
-    ):
-        renew = broker._renew_generator(
-            msg_id="1234-0",
-            queue_name="diracx:tasks:normal:medium",
+async def _receive(broker, count):
+    """Enqueue and receive ``count`` messages on one of the broker's streams."""
+    stream = stream_name_for(Priority.REALTIME, broker.worker_size)
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        async with redis.pipeline(transaction=False) as pipe:
+            for i in range(count):
+                pipe.xadd(stream, {b"data": str(i).encode()})
+            await pipe.execute()
+        [(_, fetched)] = await redis.xreadgroup(
+            broker.consumer_group_name, broker.consumer_name, {stream: ">"}
         )
-        await renew()
-
-    redis.xclaim.assert_awaited_once_with(
-        "diracx:tasks:normal:medium",
-        broker.consumer_group_name,
-        broker.consumer_name,
-        min_idle_time=0,
-        message_ids=["1234-0"],
+    messages = [
+        ReceivedMessage(
+            data=msg[b"data"],
+            ack=broker._ack_generator(msg_id=msg_id, queue_name=stream),
+            renew=broker._renew_generator(msg_id=msg_id, queue_name=stream),
+        )
+        for msg_id, msg in fetched
+    ]
+    return stream, messages
+
+
+async def _pending(broker, stream):
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        return await redis.xpending_range(
+            stream, broker.consumer_group_name, min="-", max="+", count=100_000
+        )
+
+
+async def test_acks_are_batched(counting_broker_factory):
+    broker = await counting_broker_factory()
+    stream, messages = await _receive(broker, 100)
+    assert len(await _pending(broker, stream)) == 100
+
+    CountingConnection.round_trips = 0
+    await asyncio.gather(*(message.ack() for message in messages))
+    # Nothing is sent until the flush interval has elapsed
+    assert CountingConnection.round_trips == 0
+    await asyncio.sleep(broker.acks.flush_interval * 2)
+    assert CountingConnection.round_trips == 1
+    assert await _pending(broker, stream) == []
+
+
+async def test_renew(counting_broker_factory):
+    """Renewals keep the message pending for this consumer."""
+    broker = await counting_broker_factory(ack_flush_interval=0)
+    stream, [message] = await _receive(broker, 1)
+
+    await message.renew()
+    # JUSTID avoids counting renewals as deliveries (fakeredis still does)
+    assert b"XCLAIM" in CountingConnection.last_sent
+    assert b"JUSTID" in CountingConnection.last_sent
+    [pending] = await _pending(broker, stream)
+    assert pending["consumer"] == broker.consumer_name.encode()
+
+
+async def test_full_batch_is_sent_immediately(counting_broker_factory):
+    broker = await counting_broker_factory(ack_flush_interval=60, ack_batch_size=10)
+    stream, messages = await _receive(broker, 15)
+
+    await asyncio.gather(*(message.ack() for message in messages))
+    assert len(await _pending(broker, stream)) == 5
+
+
+async def test_drain_on_shutdown(counting_broker_factory):
+    """Acknowledgements buffered when shutting down are still sent."""
+    broker = await counting_broker_factory(ack_flush_interval=60)
+    stream, messages = await _receive(broker, 3)
+
+    for message in messages:
+        await message.ack()
+    assert len(await _pending(broker, stream)) == 3
+    await broker.acks.drain()
+    assert await _pending(broker, stream) == []
+
+
+async def test_failed_flush_is_retried(counting_broker_factory, monkeypatch, caplog):
+    broker = await counting_broker_factory(ack_flush_interval=60)
+    stream, [first, second] = await _receive(broker, 2)
+    await first.ack()
+
+    async def fail(self, command, check_health=True):
+        raise redis.exceptions.ConnectionError("Redis went away")
+
+    with monkeypatch.context() as m:
+        m.setattr(CountingConnection, "send_packed_command", fail)
+        await broker.acks.flush()
+    assert "keeping them for the next batch" in caplog.text
+    assert len(await _pending(broker, stream)) == 2
+
+    await second.ack()
+    await broker.acks.flush()
+    assert await _pending(broker, stream) == []
+
+
+async def test_failed_flush_is_retried_on_its_own(counting_broker_factory, monkeypatch):
+    broker = await counting_broker_factory(ack_flush_interval=0)
+    stream, [message] = await _receive(broker, 1)
+
+    async def fail(self, command, check_health=True):
+        raise redis.exceptions.ConnectionError("Redis went away")
+
+    with monkeypatch.context() as m:
+        m.setattr(CountingConnection, "send_packed_command", fail)
+        await message.ack()
+        # Redis is still unavailable for the first retry
+        await asyncio.sleep(0.15)
+    assert len(await _pending(broker, stream)) == 1
+    # Nothing else happens on the worker, yet the acknowledgement is sent
+    await asyncio.sleep(0.3)
+    assert await _pending(broker, stream) == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("ack_flush_interval", [0, 0.05])
+async def test_ack_round_trips_benchmark(counting_broker_factory, ack_flush_interval):
+    """Round trips to Redis needed to acknowledge 10k completed tasks.
+
+    With a flush interval of 0 every acknowledgement is sent on its own, as
+    the broker used to do. The counts include the handshakes of the
+    connections opened to send concurrent batches.
+    """
+    n_tasks = 10_000
+    # Enough connections for unbatched acknowledgements not to time out
+    # waiting for one, which would get them batched on the next attempt
+    broker = await counting_broker_factory(
+        ack_flush_interval=ack_flush_interval, max_connection_pool_size=n_tasks
+    )
+    stream, messages = await _receive(broker, n_tasks)
+
+    CountingConnection.round_trips = 0
+    start = time.perf_counter()
+    # The tasks of a busy worker complete concurrently
+    await asyncio.gather(*(message.ack() for message in messages))
+    await broker.acks.drain()
+    elapsed = time.perf_counter() - start
+    logging.getLogger(__name__).info(
+        "flush interval %ss: %d round trips for %d acknowledgements in %.2fs",
+        ack_flush_interval,
+        CountingConnection.round_trips,
+        n_tasks,
+        elapsed,
+    )
+    assert await _pending(broker, stream) == []
+    if ack_flush_interval:
+        assert CountingConnection.round_trips < n_tasks / 100
+    else:
+        assert CountingConnection.round_trips >= n_tasks
+
+
+async def _fill(broker, counts):
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        async with redis.pipeline(transaction=False) as pipe:
+            for stream, count in counts.items():
+                for i in range(count):
+                    pipe.xadd(stream, {b"data": str(i).encode()})
+            await pipe.execute()
+
+
+async def _read_counts(broker, reads):
+    """Count the messages read per stream in ``reads`` reads of the broker."""
+    counts: Counter[str] = Counter()
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        for _ in range(reads):
+            for stream, msg_list in await broker._read(redis):
+                counts[stream.decode() if isinstance(stream, bytes) else stream] += len(
+                    msg_list
+                )
+    return counts
+
+
+WEIGHTS = {"realtime": 8, "normal": 3, "background": 1}
+REALTIME = stream_name_for(Priority.REALTIME, Size.MEDIUM)
+BACKGROUND = stream_name_for(Priority.BACKGROUND, Size.MEDIUM)
+
+
+async def test_unweighted_reads_ignore_priorities(counting_broker_factory):
+    broker = await counting_broker_factory()
+    await _fill(broker, {REALTIME: 500, BACKGROUND: 50})
+    # XREADGROUP's count applies to each stream
+    assert await _read_counts(broker, 20) == {REALTIME: 200, BACKGROUND: 50}
+
+
+async def test_strict_priority_reads(counting_broker_factory):
+    with pytest.raises(ValueError, match="exclusive"):
+        await counting_broker_factory(strict_priority=True, stream_weights=WEIGHTS)
+
+    broker = await counting_broker_factory(strict_priority=True, xread_block=10)
+    normal = stream_name_for(Priority.NORMAL, Size.MEDIUM)
+    await _fill(broker, {REALTIME: 25, normal: 15, BACKGROUND: 5})
+    # Lower priorities are only read once the higher ones are empty
+    assert await _read_counts(broker, 2) == {REALTIME: 20}
+    assert await _read_counts(broker, 1) == {REALTIME: 5}
+    assert await _read_counts(broker, 2) == {normal: 15}
+    await _fill(broker, {REALTIME: 1})
+    assert await _read_counts(broker, 1) == {REALTIME: 1}
+    assert await _read_counts(broker, 2) == {BACKGROUND: 5}
+    assert await _read_counts(broker, 1) == {}
+
+
+async def test_weighted_reads_serve_every_stream(counting_broker_factory):
+    broker = await counting_broker_factory(stream_weights=WEIGHTS)
+    await _fill(broker, {REALTIME: 500, BACKGROUND: 50})
+    counts = await _read_counts(broker, 24)
+    assert counts[REALTIME] == pytest.approx(24 * 10 * 8 / 12, abs=1)
+    assert counts[BACKGROUND] == pytest.approx(24 * 10 * 1 / 12, abs=1)
+
+
+async def test_weighted_reads_fall_back_to_waiting(counting_broker_factory):
+    broker = await counting_broker_factory(stream_weights=WEIGHTS, xread_block=10)
+    # A stream without credit this round is still read if it's the only one
+    # with messages
+    await _fill(broker, {BACKGROUND: 3})
+    assert await _read_counts(broker, 1) == {BACKGROUND: 3}
+    assert await _read_counts(broker, 1) == {}
+
+
+async def test_work_stealing(counting_broker_factory):
+    with pytest.raises(ValueError, match="requires stream weights"):
+        await counting_broker_factory(work_stealing=True)
+
+    broker = await counting_broker_factory(
+        stream_weights=WEIGHTS, work_stealing=True, xread_block=10
     )
+    small = stream_name_for(Priority.NORMAL, Size.SMALL)
+    large = stream_name_for(Priority.NORMAL, Size.LARGE)
+    await _fill(broker, {REALTIME: 5, small: 20, large: 20})
+    # The worker's own streams come first
+    assert await _read_counts(broker, 1) == {REALTIME: 5}
+    # Then smaller tasks, but never bigger ones
+    assert await _read_counts(broker, 10) == {small: 20}
+
+
+async def test_dequeue_metrics(counting_broker_factory, monkeypatch):
+    dequeued: Counter[str] = Counter()
+    ages = []
+
+    class FakeCounter:
+        def add(self, amount, attributes):
+            dequeued[attributes["stream"]] += amount
+
+    class FakeHistogram:
+        def record(self, value, attributes):
+            ages.append((attributes["stream"], value))
+
+    monkeypatch.setattr(redis_streams, "_messages_dequeued", FakeCounter())
+    monkeypatch.setattr(redis_streams, "_queue_age", FakeHistogram())
+
+    broker = await counting_broker_factory(stream_weights=WEIGHTS)
+    await _fill(broker, {REALTIME: 3})
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        [(stream, msg_list)] = await broker._read(redis)
+    now = time.time()
+    redis_streams._record_dequeued(stream, msg_list, now + 5)
+
+    assert dequeued == {REALTIME: 3}
+    assert len(ages) == 3
+    assert all(s == REALTIME and 5 <= age < 6 for s, age in ages)
@@ -0,0 +1,174 @@
+"""Tests for the Redis result backend."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import fakeredis
+import fakeredis.aioredis
+import msgpack
+import pytest
+from redis.asyncio import Redis
+
+from diracx.tasks.plumbing.base_task import BaseTask
+from diracx.tasks.plumbing.broker.models import ReceivedMessage, TaskMessage, TaskResult
+from diracx.tasks.plumbing.broker.redis_streams import (
+    RedisStreamBroker,
+    stream_name_for,
+)
+from diracx.tasks.plumbing.broker.result_backend import (
+    RedisResultBackend,
+    decode_result,
+    encode_result,
+)
+from diracx.tasks.plumbing.enums import Priority, Size
+from diracx.tasks.plumbing.exceptions import ResultIsMissingError
+from diracx.tasks.plumbing.factory import wrap_task
+from diracx.tasks.plumbing.retry_policies import NoRetry
+from diracx.tasks.plumbing.worker.worker import Worker
+
+
+class VoidTask(BaseTask):
+    priority = Priority.NORMAL
+    size = Size.SMALL
+    retry_policy = NoRetry()
+
+    async def execute(self, **kwargs: Any) -> None:
+        return None
+
+
+class UnstoredVoidTask(VoidTask):
+    store_void_results = False
+
+
+class UnstoredFailingTask(UnstoredVoidTask):
+    async def execute(self, **kwargs: Any) -> None:
+        raise RuntimeError("Always fails")
+
+
+@pytest.fixture
+async def broker():
+    server = fakeredis.FakeServer()
+    backend = RedisResultBackend(
+        "redis://fake",
+        connection_class=fakeredis.aioredis.FakeConnection,
+        server=server,
+    )
+    broker = RedisStreamBroker(
+        "redis://fake",
+        connection_class=fakeredis.aioredis.FakeConnection,
+        server=server,
+        result_backend=backend,
+    )
+    await broker.startup()
+    yield broker
+    await broker.shutdown()
+    await backend.shutdown()
+
+
+def test_encode_decode_round_trip():
+    void = TaskResult[None](
+        is_err=False, return_value=None, execution_time=0.5, labels={"a": 1}
+    )
+    value = TaskResult[Any](is_err=False, return_value=[1, "x"], execution_time=1.0)
+    error = TaskResult.from_exception(RuntimeError("boom"), 2.0, {"b": "c"})
+    for result in (void, value, error):
+        assert decode_result(encode_result(result)).model_dump() == result.model_dump()
+
+    # Void results are stored without the keys of the pydantic dump
+    assert len(encode_result(void)) < len(msgpack.packb(void.model_dump()))
+
+
+async def test_get_results(broker):
+    backend = broker.result_backend
+    for i in range(3):
+        await backend.set_result(
+            f"t{i}",
+            TaskResult[Any](is_err=False, return_value=i, execution_time=0.1),
+        )
+    results = await backend.get_results(["t0", "missing", "t2"])
+    assert {k: v.return_value for k, v in results.items()} == {"t0": 0, "t2": 2}
+    assert await backend.get_results([]) == {}
+    with pytest.raises(ResultIsMissingError):
+        await backend.get_result("missing")
+
+
+async def _process(broker, task_cls, task_id):
+    """Process one received message of ``task_cls`` and return its stream."""
+    worker = Worker(
+        broker=broker,
+        task_registry={task_cls.__name__: wrap_task(task_cls)},
+        task_class_registry={task_cls.__name__: task_cls},
+    )
+    message = TaskMessage(
+        task_id=task_id,
+        task_name=task_cls.__name__,
+        labels={"priority": "normal", "size": "small"},
+        task_args=[],
+        task_kwargs={},
+    )
+    stream = stream_name_for(Priority.NORMAL, Size.SMALL)
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        await redis.xadd(stream, {b"data": message.dumpb()})
+        [(_, [(msg_id, _)])] = await redis.xreadgroup(
+            broker.consumer_group_name, broker.consumer_name, {stream: ">"}
+        )
+    await worker.process_message(
+        ReceivedMessage(
+            data=message.dumpb(),
+            ack=broker._ack_generator(msg_id=msg_id, queue_name=stream),
+            renew=broker._renew_generator(msg_id=msg_id, queue_name=stream),
+        )
+    )
+    return stream
+
+
+async def test_results_are_written_with_the_acks(broker):
+    backend = broker.result_backend
+    stream = await _process(broker, VoidTask, "void")
+
+    # Neither the result nor the ack has been sent yet
+    assert not await backend.is_result_ready("void")
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        pending = await redis.xpending(stream, broker.consumer_group_name)
+        assert pending["pending"] == 1
+
+        await asyncio.sleep(broker.acks.flush_interval * 2)
+        pending = await redis.xpending(stream, broker.consumer_group_name)
+        assert pending["pending"] == 0
+    result = await backend.get_result("void")
+    assert not result.is_err
+    assert result.return_value is None
+
+
+async def test_void_results_can_be_skipped(broker):
+    backend = broker.result_backend
+    await _process(broker, UnstoredVoidTask, "void")
+    await _process(broker, UnstoredFailingTask, "failing")
+    await broker.acks.flush()
+    # Only the failure is stored
+    assert set(await backend.get_results(["void", "failing"])) == {"failing"}
+
+
+async def test_acks_are_kept_if_the_results_cannot_be_written(broker, monkeypatch):
+    backend = broker.result_backend
+    broker.acks.flush_interval = 60
+    stream = await _process(broker, VoidTask, "void")
+
+    async def failing_flush():
+        raise RuntimeError("Cannot write the results")
+
+    with monkeypatch.context() as m:
+        m.setattr(broker.acks, "before_flush", failing_flush)
+        with pytest.raises(RuntimeError):
+            await broker.acks.flush()
+
+    # The message is still pending and gets acknowledged by the next flush
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        pending = await redis.xpending(stream, broker.consumer_group_name)
+        assert pending["pending"] == 1
+        await broker.acks.flush()
+        pending = await redis.xpending(stream, broker.consumer_group_name)
+        assert pending["pending"] == 0
+    assert (await backend.get_result("void")).return_value is None
@@ -13,6 +13,7 @@ from diracx.tasks.plumbing.exceptions import UnableToAcquireLockError
 from diracx.tasks.plumbing.factory import task_wrapper
 from diracx.tasks.plumbing.lock_registry import TASK
 from diracx.tasks.plumbing.locks import BaseLock, MutexLock, RateLimiter
+from diracx.tasks.plumbing.scheduler.scheduler import DELAYED_ZSET_KEY
 
 from .conftest import LockedTask
 
@@ -26,24 +27,32 @@ async def test_task_wrapper_requires_redis():
 async def test_task_wrapper_with_redis_acquires_locks():
     """When _redis is provided, locks should be acquired."""
     mock_redis = AsyncMock()
-    mock_redis.set = AsyncMock(return_value=True)  # MutexLock.acquire
-    mock_redis.eval = AsyncMock(return_value=1)  # MutexLock.release
+    mock_redis.eval = AsyncMock(return_value=0)  # All locks acquired
 
     result = await task_wrapper(LockedTask, _redis=mock_redis)
     assert result == "locked_ok"
 
-    # Should have called set (acquire) and eval (release)
-    mock_redis.set.assert_called_once()
-    mock_redis.eval.assert_called_once()
+    # One script call acquires the locks and another one releases them
+    assert mock_redis.eval.call_count == 2
+    acquire, release = mock_redis.eval.call_args_list
+    assert acquire.args[1:3] == (1, "lock:mutex:task:LockedTask")
+    assert release.args[1:5] == (
+        3,
+        "lock:mutex:task:LockedTask",
+        "waiters:lock:mutex:task:LockedTask",
+        DELAYED_ZSET_KEY,
+    )
 
 
 async def test_task_wrapper_lock_failure_raises():
     """When a lock can't be acquired, UnableToAcquireLockError should be raised."""
     mock_redis = AsyncMock()
-    mock_redis.set = AsyncMock(return_value=None)  # Lock not acquired
+    mock_redis.eval = AsyncMock(return_value=1)  # First lock not acquired
 
-    with pytest.raises(UnableToAcquireLockError):
+    with pytest.raises(UnableToAcquireLockError, match="lock:mutex:task:LockedTask"):
         await task_wrapper(LockedTask, _redis=mock_redis)
+    # Nothing was acquired, so there is nothing to release
+    mock_redis.eval.assert_called_once()
 
 
 async def test_task_wrapper_interactive_skips_limiters():
@@ -67,15 +76,15 @@ async def test_task_wrapper_interactive_skips_limiters():
             return "with_limiter"
 
     mock_redis = AsyncMock()
-    mock_redis.set = AsyncMock(return_value=True)  # Mutex succeeds
-    mock_redis.eval = AsyncMock(return_value=1)  # Release
+    mock_redis.eval = AsyncMock(return_value=0)
 
     # In interactive mode, the RateLimiter should be skipped
     result = await task_wrapper(TaskWithLimiter, _redis=mock_redis, _interactive=True)
     assert result == "with_limiter"
 
-    # Only mutex should have been acquired (set call), not the rate limiter
-    assert mock_redis.set.call_count == 1
+    # Only the mutex should have been acquired, not the rate limiter
+    acquire = mock_redis.eval.call_args_list[0]
+    assert acquire.args[1:3] == (1, "lock:mutex:task:TaskWithLimiter")
 
 
 async def test_task_wrapper_non_interactive_acquires_limiters():
@@ -96,14 +105,15 @@ async def test_task_wrapper_non_interactive_acquires_limiters():
             return "with_limiter"
 
     mock_redis = AsyncMock()
-    # RateLimiter uses eval for its Lua script
-    mock_redis.eval = AsyncMock(return_value=1)
+    mock_redis.eval = AsyncMock(return_value=0)
 
     result = await task_wrapper(TaskWithLimiter, _redis=mock_redis, _interactive=False)
     assert result == "with_limiter"
 
-    # Rate limiter should have been acquired via eval
-    mock_redis.eval.assert_called()
+    # Rate limiter should have been acquired by the script
+    acquire = mock_redis.eval.call_args_list[0]
+    assert acquire.args[1] == 1
+    assert acquire.args[2].startswith("limiter:rate:task:TaskWithLimiter2:")
 
 
 async def test_task_wrapper_releases_on_exception():
@@ -121,11 +131,10 @@ async def test_task_wrapper_releases_on_exception():
             raise ValueError("task failed")
 
     mock_redis = AsyncMock()
-    mock_redis.set = AsyncMock(return_value=True)
-    mock_redis.eval = AsyncMock(return_value=1)
+    mock_redis.eval = AsyncMock(return_value=0)
 
     with pytest.raises(ValueError, match="task failed"):
         await task_wrapper(FailingLockedTask, _redis=mock_redis)
 
-    # Release should still have been called
-    mock_redis.eval.assert_called_once()
+    # Release should still have been called after the acquisition
+    assert mock_redis.eval.call_count == 2
@@ -3,14 +3,34 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, patch
 
+from redis.asyncio import Redis
+
 from diracx.tasks.plumbing.base_task import BaseTask
 from diracx.tasks.plumbing.broker.models import ReceivedMessage, TaskMessage, TaskResult
 from diracx.tasks.plumbing.depends import CallbackSpawner
 from diracx.tasks.plumbing.enums import Priority, Size
 from diracx.tasks.plumbing.factory import wrap_task
-from diracx.tasks.plumbing.worker.worker import Worker
+from diracx.tasks.plumbing.lock_registry import TASK
+from diracx.tasks.plumbing.locks import (
+    MutexLock,
+    acquire_locks,
+    lock_waiters_key,
+    release_locks,
+)
+from diracx.tasks.plumbing.scheduler.scheduler import (
+    DELAYED_ZSET_KEY,
+    park_until_released,
+)
+from diracx.tasks.plumbing.worker.worker import (
+    _LOCK_RETRY_BASE_DELAY_SECONDS,
+    _LOCK_RETRY_MAX_DELAY_SECONDS,
+    Worker,
+    lock_retry_delay,
+)
 
 from .conftest import FailOnceTask
 
@@ -170,9 +190,8 @@ async def test_worker_reschedules_on_lock_contention(
     mock_redis = AsyncMock()
     mock_redis.__aenter__ = AsyncMock(return_value=mock_redis)
     mock_redis.__aexit__ = AsyncMock(return_value=False)
-    # Simulate lock acquisition failure
-    mock_redis.set = AsyncMock(return_value=None)
-    mock_redis.zadd = AsyncMock()
+    # Simulate lock acquisition failure: the script returns the failed lock
+    mock_redis.eval = AsyncMock(return_value=1)
 
     with patch.object(worker, "_get_redis", return_value=mock_redis):
         result = await worker.run_task(wrapped_registry["test:LockedTask"], task_msg)
@@ -181,8 +200,95 @@ async def test_worker_reschedules_on_lock_contention(
     assert not result.is_err
     assert result.labels.get("_lock_retry") is True
 
-    # Should have scheduled a retry via zadd
-    mock_redis.zadd.assert_called_once()
+    # Should have parked the task until the lock is released
+    assert mock_redis.eval.call_count == 2
+    park = mock_redis.eval.call_args_list[1]
+    assert park.args[1:4] == (
+        2,
+        DELAYED_ZSET_KEY,
+        "waiters:lock:mutex:task:LockedTask",
+    )
+
+
+async def test_worker_wakes_tasks_waiting_for_a_lock(
+    broker, task_class_registry, wrapped_registry
+):
+    """A task refused a lock runs again as soon as the lock is released."""
+    worker = Worker(
+        broker=broker,
+        task_registry=wrapped_registry,
+        task_class_registry=task_class_registry,
+    )
+    task_msg = TaskMessage(
+        task_id="t5",
+        task_name="test:LockedTask",
+        labels={"priority": "normal", "size": "small"},
+        task_args=[],
+        task_kwargs={},
+    )
+    holder = MutexLock(TASK, "LockedTask")
+    waiters_key = lock_waiters_key(holder.redis_key)
+
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        assert await acquire_locks(redis, [holder]) is None
+        for attempt in range(1, 3):
+            start = time.time()
+            result = await worker.run_task(
+                wrapped_registry["test:LockedTask"], task_msg
+            )
+            assert result.labels.get("_lock_retry") is True
+
+            # The task waits in the delayed ZSET, for a longer time on each
+            # attempt, and in the waiters of the lock
+            ((member, run_at),) = await redis.zrange(
+                DELAYED_ZSET_KEY, 0, -1, withscores=True
+            )
+            assert await redis.zrange(waiters_key, 0, -1) == [member]
+            min_delay = _LOCK_RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1) / 2
+            assert run_at >= start + min_delay
+            task_msg = TaskMessage.loadb(member)
+            assert task_msg.labels["_lock_attempt"] == attempt
+            # Run the task again as if it had been promoted
+            if attempt == 1:
+                await redis.delete(DELAYED_ZSET_KEY, waiters_key)
+
+        # Releasing the lock makes the waiting task due now
+        await release_locks(redis, [holder], wake_into=DELAYED_ZSET_KEY)
+        ((_, woken_at),) = await redis.zrange(DELAYED_ZSET_KEY, 0, -1, withscores=True)
+        assert woken_at <= time.time()
+        assert not await redis.exists(waiters_key)
+
+
+async def test_parking_never_shortens_the_waiters_expiry(broker):
+    waiters_key = lock_waiters_key("lock:mutex:task:LockedTask")
+    now = datetime.now(UTC)
+    messages = [
+        TaskMessage(
+            task_id=f"t{i}",
+            task_name="test:LockedTask",
+            labels={"priority": "normal", "size": "small"},
+            task_args=[],
+            task_kwargs={},
+        )
+        for i in range(2)
+    ]
+    async with Redis(connection_pool=broker.connection_pool) as redis:
+        await park_until_released(
+            redis, messages[0], "lock:mutex:task:LockedTask", now + timedelta(hours=1)
+        )
+        await park_until_released(redis, messages[1], "lock:mutex:task:LockedTask", now)
+        # The waiters outlive the task parked for the longest time
+        assert await redis.ttl(waiters_key) > 3600
+        assert await redis.zcard(waiters_key) == 2
+
+
+def test_lock_retry_delay():
+    for attempt in range(10):
+        delay = lock_retry_delay(attempt)
+        expected = min(
+            _LOCK_RETRY_MAX_DELAY_SECONDS, _LOCK_RETRY_BASE_DELAY_SECONDS * 2**attempt
+        )
+        assert expected / 2 <= delay <= expected
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,183 @@
+"""Tests for the adaptive sizing of the worker prefetcher reads."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from diracx.tasks.plumbing.broker.models import TaskMessage, TaskResult
+from diracx.tasks.plumbing.broker.redis_streams import RedisStreamBroker
+from diracx.tasks.plumbing.enums import Priority, Size
+from diracx.tasks.plumbing.worker.prefetch import MAX_READ_COUNT, AdaptivePrefetch
+from diracx.tasks.plumbing.worker.worker import Worker
+
+
+def test_read_count_follows_free_slots():
+    prefetch = AdaptivePrefetch(4, Size.MEDIUM)
+    assert prefetch.read_count() == 4
+    prefetch.started()
+    assert prefetch.read_count() == 3
+    assert prefetch.read_count(queued=2) == 1
+    assert prefetch.read_count(queued=3) == 0
+
+
+def test_read_count_follows_execution_time():
+    prefetch = AdaptivePrefetch(4, Size.SMALL, window=1)
+    for _ in range(4):
+        prefetch.started()
+    # Fast tasks free their slots quickly, so more are read ahead
+    prefetch.finished("fast", 0.1)
+    prefetch.started()
+    assert prefetch.read_count() == 40
+    # The slowest stream bounds the read ahead
+    prefetch.finished("slow", 2)
+    prefetch.started()
+    assert prefetch.read_count() == 2
+    # The execution time is a moving average
+    prefetch.finished("slow", 0.1)
+    assert prefetch.read_count() == 1 + int(4 / (2 - 0.2 * 1.9))
+
+
+@pytest.mark.parametrize("size", list(Size))
+def test_read_count_is_capped_by_size(size):
+    prefetch = AdaptivePrefetch(1000, size)
+    assert prefetch.read_count() == MAX_READ_COUNT[size]
+    assert AdaptivePrefetch(None, size).read_count() == MAX_READ_COUNT[size]
+
+
+async def test_next_read_count_waits_for_a_free_slot():
+    prefetch = AdaptivePrefetch(1, Size.LARGE)
+    prefetch.started()
+    waiter = asyncio.create_task(prefetch.next_read_count(lambda: 0))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    prefetch.finished("stream", 10)
+    assert await asyncio.wait_for(waiter, 1) == 1
+
+
+async def _run_workers(adaptive, size, n_tasks, duration, n_workers, slots):
+    """Run ``n_tasks`` tasks taking ``duration`` seconds on several workers.
+
+    Returns the elapsed time, the number of reads from Redis which returned
+    messages and the longest time a message was owned by a worker before it
+    started running. Reads of empty streams aren't counted as fakeredis
+    doesn't block on them.
+    """
+    server = fakeredis.FakeServer()
+    brokers = [
+        RedisStreamBroker(
+            "redis://fake",
+            connection_class=fakeredis.aioredis.FakeConnection,
+            server=server,
+            worker_size=size,
+            xread_block=50,
+            ack_flush_interval=0,
+        )
+        for _ in range(n_workers)
+    ]
+    # The consumer group must exist before the tasks are sent for them to
+    # be delivered
+    for broker in brokers:
+        await broker.startup()
+    for i in range(n_tasks):
+        await brokers[0].enqueue(
+            TaskMessage(
+                task_id=str(i),
+                task_name="bench",
+                labels={"priority": Priority.NORMAL, "size": size},
+                task_args=[],
+                task_kwargs={},
+            )
+        )
+
+    read_at: dict[str, float] = {}
+    pending_ages: list[float] = []
+    reads = 0
+    all_done = asyncio.Event()
+
+    async def run_task(task_func, task_message):
+        pending_ages.append(time.monotonic() - read_at[task_message.task_id])
+        await asyncio.sleep(duration)
+        if len(pending_ages) == n_tasks:
+            all_done.set()
+        return TaskResult.from_value(
+            value=None, execution_time=duration, labels=task_message.labels
+        )
+
+    def instrument(broker):
+        listen, read = broker.listen, broker._read
+
+        async def timed_listen(read_count=None):
+            async for message in listen(read_count):
+                read_at[TaskMessage.loadb(message.data).task_id] = time.monotonic()
+                yield message
+
+        async def counted_read(redis, count=None):
+            nonlocal reads
+            fetched = await read(redis, count)
+            reads += bool(fetched)
+            return fetched
+
+        broker.listen, broker._read = timed_listen, counted_read
+
+    workers = []
+    for broker in brokers:
+        instrument(broker)
+        worker = Worker(
+            broker=broker,
+            task_registry={"bench": run_task},
+            task_class_registry={},
+            max_concurrent_tasks=slots,
+            adaptive_prefetch=adaptive,
+        )
+        worker.run_task = run_task
+        workers.append(worker)
+
+    finish_event = asyncio.Event()
+    start = time.monotonic()
+    listeners = asyncio.gather(*(w.listen(finish_event) for w in workers))
+    try:
+        await asyncio.wait_for(all_done.wait(), 30)
+        elapsed = time.monotonic() - start
+        finish_event.set()
+        await asyncio.wait_for(listeners, 5)
+    finally:
+        listeners.cancel()
+        for broker in brokers:
+            await broker.shutdown()
+    return elapsed, reads, max(pending_ages)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "size,n_tasks,duration,slots",
+    [(Size.LARGE, 12, 0.2, 2), (Size.SMALL, 500, 0.001, 10)],
+)
+async def test_prefetch_benchmark(size, n_tasks, duration, slots):
+    """Compare the fixed read count with the adaptive one on two workers."""
+    results = {}
+    for adaptive in (False, True):
+        results[adaptive] = await _run_workers(
+            adaptive, size, n_tasks, duration, n_workers=2, slots=slots
+        )
+        elapsed, reads, max_pending_age = results[adaptive]
+        logging.getLogger(__name__).info(
+            "%s prefetch of %d %s tasks: %.3fs (%.0f tasks/s), %d reads, "
+            "messages owned up to %.3fs before starting",
+            "adaptive" if adaptive else "fixed",
+            n_tasks,
+            size,
+            elapsed,
+            n_tasks / elapsed,
+            reads,
+            max_pending_age,
+        )
+
+    if size == Size.SMALL:
+        # Small tasks are read in bigger batches
+        assert results[True][1] < results[False][1]